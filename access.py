@@ -0,0 +1,84 @@
+"""
+Índice de acesso pré-computado (usuário -> departamentos)
+
+Cada entrada é montada com uma única consulta e guardada em memória, de forma
+que as verificações de departamento em utils.py viram um simples teste de
+pertinência em set. As rotas que alteram usuários, departamentos ou dashboards
+invalidam o índice.
+
+Dashboards não entram no índice: um dashboard movido ou excluído em outro
+worker não invalida a entrada, então o acesso a um dashboard é sempre
+verificado no banco (department_scope) por check_dashboard_access.
+"""
+import threading
+import time
+from collections import namedtuple
+from flask import current_app, g
+from sqlalchemy import select
+from app import db
+from models import Department, UserRole, user_department
+from queries import company_department_ids
+
+# Entrada do índice para um usuário
+UserAccess = namedtuple('UserAccess', ['department_ids'])
+
+def department_scope(user):
+    """Subquery with the ids of the departments an admin or common user can reach"""
+    if user.role == UserRole.ADMIN:
+        # Regra de papel: administradores alcançam todos os departamentos da empresa
+        # (não há vínculos gravados para eles em user_department)
+        return company_department_ids(user.company_id)
+    return select(user_department.c.department_id).where(user_department.c.user_id == user.id)
+
+class AccessIndex:
+    """In-process cache of the departments each user can reach"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user):
+        """Return the UserAccess entry for a user, building it if needed"""
+        # Memoizar no request evita até a consulta ao cache compartilhado
+        request_cache = g.setdefault('_access_index', {})
+        if user.id in request_cache:
+            return request_cache[user.id]
+
+        ttl = current_app.config.get('ACCESS_INDEX_TTL', 30)
+        now = time.monotonic()
+        # Versão da linha do usuário (user_cache): papel, empresa ou vínculos alterados em
+        # outro worker descartam a entrada sem esperar o TTL
+        version = getattr(user, 'version', None)
+        with self._lock:
+            cached = self._entries.get(user.id)
+        if cached and ttl and cached[0] > now and cached[1] == version:
+            entry = cached[2]
+        else:
+            entry = self._build(user)
+            if ttl:
+                with self._lock:
+                    self._entries[user.id] = (now + ttl, version, entry)
+
+        request_cache[user.id] = entry
+        return entry
+
+    def _build(self, user):
+        """Load the department ids of a user in one query"""
+        department_ids = db.session.execute(
+            select(Department.id).where(Department.id.in_(department_scope(user)))
+        ).scalars()
+        return UserAccess(frozenset(department_ids))
+
+    def invalidate_user(self, user_id):
+        """Drop the cached entry of a single user"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+        g.pop('_access_index', None)
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+        g.pop('_access_index', None)
+
+access_index = AccessIndex()
@@ -10,86 +10,136 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from config import Config
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
-
 # Create base class for SQLAlchemy models
 class Base(DeclarativeBase):
     pass
 
-# Initialize Flask app
 # Configurar caminhos absolutos para templates e static files (necessário para serverless)
 template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
 static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
 
-app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
-app.config.from_object(Config)
-app.secret_key = os.environ.get("SESSION_SECRET", "hidash_secure_key")
-app.permanent_session_lifetime = timedelta(hours=12)
-
 # Detectar ambiente Vercel
 IS_VERCEL = os.environ.get('VERCEL') or os.environ.get('VERCEL_ENV')
 
-# ProxyFix apenas se não estiver na Vercel (a Vercel já faz proxy reverso)
-if not IS_VERCEL:
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
-
-# Initialize database with improved connection handling for serverless
-# Ajustar pool size para ambiente serverless (menos conexões simultâneas)
-pool_size = 1 if IS_VERCEL else 10
-max_overflow = 0 if IS_VERCEL else 15
-
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_pre_ping": True,
-    "pool_recycle": 280,
-    "pool_size": pool_size,
-    "max_overflow": max_overflow,
-    "connect_args": {
-        "connect_timeout": 10
-    }
-}
-db = SQLAlchemy(model_class=Base)
-db.init_app(app)
+class RouteRegistry:
+    """Collects routes and handlers at import time and applies them in create_app.
 
-# Initialize login manager
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-login_manager.login_message = 'Please log in to access this page.'
-login_manager.login_message_category = 'danger'
+    Unlike a Blueprint, endpoints keep their plain names (url_for('dashboard')).
+    """
+
+    def __init__(self):
+        self._deferred = []
+
+    def _defer(self, func):
+        self._deferred.append(func)
 
-# Initialize rate limiter for brute force protection
+    def route(self, rule, **options):
+        def decorator(f):
+            endpoint = options.pop('endpoint', None) or f.__name__
+            self._defer(lambda app: app.add_url_rule(rule, endpoint, f, **options))
+            return f
+        return decorator
+
+    def errorhandler(self, code):
+        def decorator(f):
+            self._defer(lambda app: app.register_error_handler(code, f))
+            return f
+        return decorator
+
+    def before_request(self, f):
+        self._defer(lambda app: app.before_request(f))
+        return f
+
+    def after_request(self, f):
+        self._defer(lambda app: app.after_request(f))
+        return f
+
+    def template_global(self, name=None):
+        def decorator(f):
+            self._defer(lambda app: app.add_template_global(f, name))
+            return f
+        return decorator
+
+    def init_app(self, app):
+        for func in self._deferred:
+            func(app)
+
+# Extensões sem aplicação; ligadas em create_app
+db = SQLAlchemy(model_class=Base)
+login_manager = LoginManager()
 limiter = Limiter(
     get_remote_address,
-    app=app,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://",
 )
+registry = RouteRegistry()
 
-# Import models here to avoid circular imports
-# Em ambiente serverless, não criar tabelas automaticamente (usar migrations)
-try:
-    with app.app_context():
-        from models import User, Company, Department, Dashboard
-        # Apenas criar tabelas se não estiver em produção ou se DATABASE_URL estiver definido
-        if not IS_VERCEL or os.environ.get('DATABASE_URL'):
-            try:
-                db.create_all()
-                logging.info("Database tables created/verified")
-            except Exception as e:
-                logging.warning(f"Database initialization warning: {str(e)}")
-                # Não falhar se o banco não estiver disponível ainda
-except Exception as e:
-    logging.error(f"Error importing models: {str(e)}")
-    # Continuar mesmo se houver erro na importação dos models (pode ser problema de DB)
-    pass
+def engine_options(database_uri):
+    """Connection pool options for the configured database"""
+    # Ajustar pool size para ambiente serverless (menos conexões simultâneas)
+    if not database_uri or not database_uri.startswith(('postgresql', 'postgres')):
+        return {"pool_pre_ping": True}
+    return {
+        "pool_pre_ping": True,
+        "pool_recycle": 280,
+        "pool_size": 1 if IS_VERCEL else 10,
+        "max_overflow": 0 if IS_VERCEL else 15,
+        "connect_args": {
+            "connect_timeout": 10
+        }
+    }
+
+def create_app(config_object=Config, **overrides):
+    """Build the Flask application.
+
+    Nenhuma I/O de banco acontece aqui: o schema é criado/atualizado por um passo
+    explícito de migração (init_db.py), nunca na importação ou no cold start.
+    """
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'WARNING' if IS_VERCEL else 'INFO'))
+
+    app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
+    app.config.from_object(config_object)
+    app.config.update(overrides)
+    app.secret_key = os.environ.get("SESSION_SECRET", "hidash_secure_key")
+    app.permanent_session_lifetime = timedelta(hours=12)
+
+    # ProxyFix apenas se não estiver na Vercel (a Vercel já faz proxy reverso)
+    if not IS_VERCEL:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+
+    # Compressão gzip/brotli das respostas e variantes .br/.gz dos arquivos estáticos
+    if app.config.get('COMPRESSION_ENABLED'):
+        from compression import CompressionMiddleware
+        app.wsgi_app = CompressionMiddleware(app.wsgi_app, app.config, app.static_folder, app.static_url_path)
+
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config.get("SQLALCHEMY_DATABASE_URI")))
+    db.init_app(app)
+
+    # Initialize login manager
+    login_manager.init_app(app)
+    login_manager.login_view = 'login'
+    login_manager.login_message = 'Please log in to access this page.'
+    login_manager.login_message_category = 'danger'
+
+    # Initialize rate limiter for brute force protection
+    # Armazenamento definido por RATELIMIT_STORAGE_URI (memory://, redis://... ou sqlalchemy+<url do banco>)
+    import ratelimit_storage  # registra o esquema sqlalchemy+ na biblioteca limits
+    limiter.init_app(app)
+
+    # Rotas importadas apenas aqui, ao montar a aplicação
+    import models
+    import routes
+    import security_headers  # cabeçalhos de segurança por política (SECURITY_HEADERS_ROUTES)
+    import assets  # asset_url() e cache imutável dos arquivos com impressão digital
+    registry.init_app(app)
+
+    # Métricas por request e /metrics apenas se ligadas (sem custo quando desligadas)
+    if app.config.get('INSTRUMENTATION_ENABLED'):
+        import instrumentation
+        instrumentation.init_app(app)
+
+    # Verificação periódica dos links do Power BI numa thread do processo (opcional)
+    if app.config.get('DASHBOARD_HEALTH_INTERVAL'):
+        from dashboard_health import background_sweeper
+        background_sweeper.start(app)
 
-# Import routes after database initialization
-try:
-    from routes import *
-except Exception as e:
-    logging.error(f"Error importing routes: {str(e)}", exc_info=True)
-    # Criar uma rota de fallback para debug
-    @app.route('/')
-    def fallback():
-        return f"Error loading routes: {str(e)}", 500
+    return app
@@ -0,0 +1,90 @@
+"""
+URLs de arquivos estáticos com impressão digital
+
+asset_url('js/scripts.js') resolve o nome pelo manifest gerado por
+build_assets.py (static/dist/manifest.json) e devolve o arquivo minificado com
+o hash no nome, ex.: /static/dist/js/scripts.941a824c9731.min.js. Sem o build,
+devolve o arquivo original com o hash do conteúdo na query
+(/static/js/scripts.js?v=<hash>). Nos dois casos a URL muda sempre que o
+arquivo muda, então a resposta pode ficar em cache por um ano (immutable) no
+navegador e na CDN.
+
+O manifest e os hashes são lidos uma única vez por processo (em modo debug,
+sempre que o arquivo for alterado).
+"""
+import hashlib
+import json
+import os
+import threading
+from flask import current_app, request, url_for
+from markupsafe import Markup, escape
+from app import registry
+
+MANIFEST_PATH = os.path.join('dist', 'manifest.json')
+
+_fingerprints = {}
+_manifest = {}
+_lock = threading.Lock()
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def fingerprint(filename):
+    """Short content hash of a file under the static folder"""
+    path = os.path.join(current_app.static_folder, filename)
+    mtime = os.path.getmtime(path) if current_app.debug else None
+    cached = _fingerprints.get(filename)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    with _lock:
+        _fingerprints[filename] = (mtime, digest)
+    return digest
+
+def manifest():
+    """Contents of static/dist/manifest.json ({'files': {}, 'images': {}} without a build)"""
+    path = os.path.join(current_app.static_folder, MANIFEST_PATH)
+    cached = _manifest.get(path)
+    if cached is not None and (not current_app.debug or cached[0] == _mtime(path)):
+        return cached[1]
+    mtime = _mtime(path)
+    data = {'files': {}, 'images': {}}
+    if mtime is not None:
+        with open(path) as f:
+            data = json.load(f)
+    with _lock:
+        _manifest[path] = (mtime, data)
+    return data
+
+@registry.template_global()
+def asset_url(filename):
+    """url_for('static') resolved through the build manifest, safe to cache forever"""
+    built = manifest()['files'].get(filename)
+    if built:
+        return url_for('static', filename=built)
+    return url_for('static', filename=filename, v=fingerprint(filename))
+
+@registry.template_global()
+def picture_sources(filename, sizes='100vw'):
+    """<source> tags with the AVIF/WebP variants of an image, for use inside <picture>"""
+    tags = []
+    for format, variants in manifest()['images'].get(filename, {}).items():
+        srcset = ', '.join(f"{url_for('static', filename=path)} {width}w" for width, path in variants)
+        tags.append(f'<source type="image/{format}" srcset="{escape(srcset)}" sizes="{escape(sizes)}">')
+    # AVIF antes de WebP: o navegador usa o primeiro formato que suportar
+    tags.sort(key=lambda tag: 'image/avif' not in tag)
+    return Markup(''.join(tags))
+
+@registry.after_request
+def cache_fingerprinted_assets(response):
+    if request.endpoint == 'static' and response.status_code == 200 and (
+            'v' in request.args or request.view_args.get('filename', '').startswith('dist/')):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,63 @@
+"""
+Benchmark de cold start do ponto de entrada serverless (api/index.py)
+
+Cada rodada inicia um processo Python novo, importa api/index.py e faz a
+primeira requisição pelo test client, medindo o tempo de importação e o
+tempo até a primeira resposta.
+
+Uso:
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --runs 20 --path /login
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {api!r})
+import index
+imported = time.perf_counter()
+response = index.app.test_client().get({path!r})
+responded = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (responded - start) * 1000,
+    "status": response.status_code,
+}}))
+"""
+
+def run_once(path, env):
+    code = CHILD.format(root=ROOT_DIR, api=os.path.join(ROOT_DIR, 'api'), path=path)
+    output = subprocess.run(
+        [sys.executable, '-c', code], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/login')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Sem DATABASE_URL usa um SQLite temporário (a primeira resposta não deve tocar no banco)
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'hidash-cold-start.db'))
+
+    results = [run_once(args.path, env) for _ in range(args.runs)]
+    statuses = sorted({r['status'] for r in results})
+    for key in ('import_ms', 'first_response_ms'):
+        samples = [r[key] for r in results]
+        print(f"{key:<18} median {statistics.median(samples):8.1f}  min {min(samples):8.1f}  max {max(samples):8.1f}")
+    print(f"status codes: {statuses}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark da compressão das respostas (compression.py)
+
+Monta um banco (mesma carga de benchmarks/indexes.py, em escala menor) e, para
+algumas páginas e APIs vistas pelo usuário master, mede:
+
+- bytes sem compressão, com gzip (COMPRESSION_GZIP_LEVEL) e com brotli
+  (COMPRESSION_BROTLI_QUALITY, se o pacote estiver instalado);
+- custo de CPU de comprimir cada corpo (mediana de várias rodadas);
+- latência do request completo pelo test client com o middleware desligado
+  e ligado.
+
+Uso:
+    python benchmarks/compression.py
+    python benchmarks/compression.py --dashboards 5000 --rounds 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from app import create_app, db
+import migrate
+from compression import brotli, compress
+from seed_data import generate
+
+PATHS = ['/dashboard', '/dashboards/manage', '/users', '/departments', '/api/users', '/api/dashboards']
+
+def client_for(app):
+    client = app.test_client()
+    # Usuário 1 é o master criado por seed_data.generate()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    return client
+
+def median_time(func, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--dashboards', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'compression.db')
+    plain = create_app(SQLALCHEMY_DATABASE_URI=url, RATELIMIT_ENABLED=False, COMPRESSION_ENABLED=False)
+    compressed = create_app(SQLALCHEMY_DATABASE_URI=url, RATELIMIT_ENABLED=False, COMPRESSION_ENABLED=True)
+    with plain.app_context():
+        migrate.upgrade(db.engine, log=lambda message: None)
+        generate(db.engine, companies=20, departments=200, users=args.users, dashboards=args.dashboards,
+                 log=lambda message: None)
+
+    config = compressed.config
+    gzip_level, brotli_quality = config['COMPRESSION_GZIP_LEVEL'], config['COMPRESSION_BROTLI_QUALITY']
+    encodings = ['gzip'] + (['br'] if brotli is not None else [])
+    plain_client, compressed_client = client_for(plain), client_for(compressed)
+    accept = {'Accept-Encoding': ', '.join(encodings)}
+
+    print(f"{args.users} users, {args.dashboards} dashboards; gzip level {gzip_level}, brotli quality {brotli_quality}"
+          + ('' if brotli is not None else ' (brotli not installed)'))
+    header = f"{'path':<20} {'raw KB':>8}"
+    for encoding in encodings:
+        header += f" {encoding + ' KB':>8} {encoding + ' us':>8}"
+    header += f" {'req off ms':>10} {'req on ms':>10}"
+    print(header)
+
+    totals = {'raw': 0, **{encoding: 0 for encoding in encodings}}
+    for path in PATHS:
+        body = plain_client.get(path).data
+        line = f"{path:<20} {len(body) / 1024:>8.1f}"
+        totals['raw'] += len(body)
+        for encoding in encodings:
+            data = compress(body, encoding, gzip_level, brotli_quality)
+            cpu = median_time(lambda: compress(body, encoding, gzip_level, brotli_quality), args.rounds)
+            totals[encoding] += len(data)
+            line += f" {len(data) / 1024:>8.1f} {cpu * 1e6:>8.0f}"
+        off = median_time(lambda: plain_client.get(path), args.rounds)
+        on = median_time(lambda: compressed_client.get(path, headers=accept), args.rounds)
+        print(line + f" {off * 1000:>10.2f} {on * 1000:>10.2f}")
+
+    for encoding in encodings:
+        saved = 1 - totals[encoding] / totals['raw']
+        print(f"{encoding}: {totals['raw'] / 1024:.0f} KB -> {totals[encoding] / 1024:.0f} KB ({saved:.0%} saved)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark de /dashboard/view/<id> (visualização do Power BI)
+
+Monta um banco (seed_data.py) com um dashboard e um usuário comum com acesso
+a ele e mede, pelo test client, a latência da rota:
+
+- render: página renderizada a cada request (DASHBOARD_PAGE_CACHE_SIZE = 0),
+  como antes do cache;
+- cold: primeira visualização após limpar o cache de páginas;
+- warm: visualizações seguintes, servidas do cache por (id, updated_at).
+
+Os tempos incluem a sessão, o carregamento do usuário, o índice de acesso e
+os cabeçalhos de segurança, ou seja, o custo completo de um request.
+
+Uso:
+    python benchmarks/dashboard_view.py
+    python benchmarks/dashboard_view.py --requests 5000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from app import create_app, db
+import migrate
+from fragments import dashboard_pages
+from seed_data import generate
+
+# Usuário comum de seed_data.generate(): o único departamento (com todos os dashboards) é o dele
+USER_ID = 2
+
+def logged_in_client(app):
+    client = app.test_client()
+    # Sessão do Flask-Login montada diretamente, sem passar pelo hash da senha
+    with client.session_transaction() as session:
+        session['_user_id'] = str(USER_ID)
+        session['_fresh'] = True
+    return client
+
+def timed_get(client, path):
+    start = time.perf_counter()
+    response = client.get(path)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.status_code
+    return elapsed
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]
+    print(f"{label:<8} {len(samples):>7} {statistics.median(samples) * 1e6:>10.0f} {p95 * 1e6:>10.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--cold', type=int, default=200, help='cold views (cache cleared before each one)')
+    args = parser.parse_args()
+
+    url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'dashboard_view.db')
+    path = '/dashboard/view/1'
+    app = create_app(SQLALCHEMY_DATABASE_URI=url, RATELIMIT_ENABLED=False)
+    with app.app_context():
+        migrate.upgrade(db.engine, log=lambda message: None)
+        generate(db.engine, companies=1, departments=1, users=USER_ID, dashboards=1, admin_ratio=0,
+                 log=lambda message: None)
+
+    client = logged_in_client(app)
+    timed_get(client, path)  # aquecer templates, índice de acesso e cache de usuário
+
+    print(f"{'case':<8} {'requests':>7} {'p50 us':>10} {'p95 us':>10}")
+    app.config['DASHBOARD_PAGE_CACHE_SIZE'] = 0
+    dashboard_pages.clear()
+    report('render', [timed_get(client, path) for _ in range(args.requests)])
+
+    app.config['DASHBOARD_PAGE_CACHE_SIZE'] = 2000
+    cold = []
+    for _ in range(args.cold):
+        dashboard_pages.clear()
+        cold.append(timed_get(client, path))
+    report('cold', cold)
+    report('warm', [timed_get(client, path) for _ in range(args.requests)])
+
+if __name__ == '__main__':
+    main()
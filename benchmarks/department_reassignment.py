@@ -0,0 +1,108 @@
+"""
+Benchmark da troca de empresa de um departamento (edit_department)
+
+Monta um banco (seed_data.py) com N usuários (padrão 10 mil) em duas empresas
+e mede a passagem do departamento com mais vínculos para a outra empresa com a
+implementação anterior (laço no ORM sobre user.departments) e com
+memberships.reassign_department (um único DELETE), contando as instruções
+SQL executadas por cada uma. A implementação anterior também gravava vínculos
+para os administradores da nova empresa; hoje eles acessam o departamento
+pela regra de papel (access.py), sem linhas em user_department.
+
+Uso:
+    python benchmarks/department_reassignment.py
+    python benchmarks/department_reassignment.py --users 50000 --database-url postgresql://localhost/hidash_bench
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from sqlalchemy import event, func, select
+from app import create_app, db
+import migrate
+from memberships import reassign_department
+from models import User, Company, Department, UserRole, user_department
+from seed_data import generate
+
+def prepare(users, admin_ratio):
+    """Empty the tables and generate two companies; returns (department, old company, new company)"""
+    db.session.execute(user_department.delete())
+    db.session.execute(User.__table__.delete())
+    db.session.execute(Department.__table__.delete())
+    db.session.execute(Company.__table__.delete())
+    db.session.commit()
+    generate(db.engine, companies=2, departments=10, users=users, dashboards=0, admin_ratio=admin_ratio,
+             log=lambda message: None)
+    # O departamento com mais vínculos passa para a outra empresa
+    department_id, old_company = db.session.execute(
+        select(Department.id, Department.company_id)
+        .join(user_department, user_department.c.department_id == Department.id)
+        .group_by(Department.id, Department.company_id)
+        .order_by(func.count().desc(), Department.id).limit(1)
+    ).one()
+    db.session.expunge_all()
+    return department_id, old_company, 3 - old_company
+
+def legacy(department, old_company, new_company):
+    """Implementação anterior de edit_department"""
+    old_users = User.query.filter_by(company_id=old_company).all()
+    for user in old_users:
+        if department in user.departments:
+            user.departments.remove(department)
+    new_admin_users = User.query.filter(
+        (User.company_id == new_company) &
+        ((User.role == UserRole.ADMIN) | (User.role == UserRole.MASTER))
+    ).all()
+    for admin_user in new_admin_users:
+        if department not in admin_user.departments:
+            admin_user.departments.append(department)
+
+def set_based(department, old_company, new_company):
+    reassign_department(department.id, old_company)
+
+def run(label, implementation, users, admin_ratio):
+    department_id, old_company, new_company = prepare(users, admin_ratio)
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        start = time.perf_counter()
+        department = db.session.get(Department, department_id)
+        department.company_id = new_company
+        implementation(department, old_company, new_company)
+        db.session.commit()
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    members = db.session.execute(
+        select(User.company_id, func.count()).select_from(user_department)
+        .join(User, User.id == user_department.c.user_id)
+        .where(user_department.c.department_id == department_id)
+        .group_by(User.company_id)
+    ).all()
+    db.session.expunge_all()
+    print(f"{label:<12} {elapsed * 1000:>10.1f} ms {len(statements):>8} statements   members by company: {dict(members)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--admin-ratio', type=float, default=0.02)
+    args = parser.parse_args()
+
+    url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'reassignment.db')
+    app = create_app(SQLALCHEMY_DATABASE_URI=url)
+    with app.app_context():
+        migrate.upgrade(db.engine, log=lambda message: None)
+        print(f"{args.users} users in two companies ({url})")
+        run('legacy ORM', legacy, args.users, args.admin_ratio)
+        run('set-based', set_based, args.users, args.admin_ratio)
+
+if __name__ == '__main__':
+    main()
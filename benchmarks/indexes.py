@@ -0,0 +1,132 @@
+"""
+Benchmark dos índices de consulta (migração 0003)
+
+Cria um banco com dados sintéticos de seed_data.py (por padrão 100 mil
+usuários e 50 mil dashboards), aplica as migrações até 0002, mede as
+consultas quentes das rotas e mostra o plano de execução de cada uma; depois
+aplica 0003 (índices) e repete. O banco informado precisa estar vazio.
+
+Uso:
+    python benchmarks/indexes.py
+    python benchmarks/indexes.py --database-url postgresql://localhost/hidash_bench --rounds 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from sqlalchemy import and_, func, or_, select, text
+from app import create_app, db
+import migrate
+from models import User, Company, Department, Dashboard, UserRole, user_department
+from queries import company_listing, department_listing
+from seed_data import generate
+
+def hot_queries(engine, companies):
+    """Query shapes used by routes.py, utils.py, access.py and listings.py"""
+    # Ids de uma empresa do meio: o primeiro departamento, usuário comum e administrador dela
+    company_id = companies // 2 or 1
+    with engine.connect() as conn:
+        department_id = conn.execute(select(func.min(Department.id))
+            .where(Department.company_id == company_id)).scalar()
+        first_user = lambda role: conn.execute(select(func.min(User.id)).where(
+            User.company_id == company_id, User.role == role)).scalar()
+        user_id, admin_id = first_user(UserRole.USER), first_user(UserRole.ADMIN)
+    member_of = select(user_department.c.department_id).where(user_department.c.user_id == user_id)
+    return [
+        ('departments of a company', select(Department).where(Department.company_id == company_id)
+            .order_by(Department.name, Department.id)),
+        ('active dashboards of a department', select(Dashboard).where(
+            Dashboard.department_id == department_id, Dashboard.is_active == True)),
+        ('admins of a company', select(User).where(
+            User.company_id == company_id, User.role.in_([UserRole.ADMIN, UserRole.MASTER]))),
+        ('master user lookup', select(User).where(User.role == UserRole.MASTER).limit(1)),
+        ('users of a department', select(user_department.c.user_id)
+            .where(user_department.c.department_id == department_id)),
+        ('access index (common user)', select(Department.id, Department.company_id, Dashboard.id)
+            .outerjoin(Dashboard, Dashboard.department_id == Department.id)
+            .where(Department.id.in_(member_of))),
+        ('access index (admin)', select(Department.id, Department.company_id, Dashboard.id)
+            .outerjoin(Dashboard, Dashboard.department_id == Department.id)
+            .where(or_(Department.company_id == company_id, Department.id.in_(
+                select(user_department.c.department_id).where(user_department.c.user_id == admin_id))))),
+        ('department listing of a company', department_listing(company_id)
+            .order_by(Department.name, Department.id).limit(50).statement),
+        ('company listing page', company_listing().order_by(Company.name, Company.id).limit(50).statement),
+        ('users listing page (keyset)', select(User).where(or_(
+            User.name > 'Marcos Lima', and_(User.name == 'Marcos Lima', User.id > 0)))
+            .order_by(User.name, User.id).limit(50)),
+        ('dashboards listing page', select(Dashboard).order_by(Dashboard.name, Dashboard.id).limit(50)),
+    ]
+
+def explain(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True})
+    if conn.dialect.name == 'postgresql':
+        rows = conn.execute(text(f'EXPLAIN {compiled}')).scalars()
+        return list(rows)
+    return [row[-1] for row in conn.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))]
+
+def measure(engine, queries, rounds):
+    results = {}
+    with engine.connect() as conn:
+        for label, stmt in queries:
+            conn.execute(stmt).all()  # aquecer o cache de páginas
+            samples = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                conn.execute(stmt).all()
+                samples.append((time.perf_counter() - start) * 1000)
+            results[label] = (statistics.median(samples), explain(conn, stmt))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--dashboards', type=int, default=50000)
+    parser.add_argument('--companies', type=int, default=500)
+    parser.add_argument('--departments-per-company', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--plans', action='store_true', help='print the full query plans')
+    args = parser.parse_args()
+
+    url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'indexes.db')
+    app = create_app(SQLALCHEMY_DATABASE_URI=url)
+    with app.app_context():
+        engine = db.engine
+        migrate.upgrade(engine, target='0002', log=lambda message: None)
+
+        start = time.perf_counter()
+        generate(engine, companies=args.companies, departments=args.companies * args.departments_per_company,
+                 users=args.users, dashboards=args.dashboards, log=lambda message: None)
+        print(f"Seeded {args.users} users, {args.dashboards} dashboards in {time.perf_counter() - start:.1f}s ({url})")
+
+        queries = hot_queries(engine, args.companies)
+        with engine.begin() as conn:
+            conn.execute(text('ANALYZE'))
+        before = measure(engine, queries, args.rounds)
+
+        start = time.perf_counter()
+        migrate.upgrade(engine, log=lambda message: None)
+        print(f"Migration 0003 applied in {time.perf_counter() - start:.1f}s")
+        after = measure(engine, queries, args.rounds)
+
+    print()
+    print(f"{'query':<36} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for label, _ in queries:
+        before_ms, before_plan = before[label]
+        after_ms, after_plan = after[label]
+        print(f"{label:<36} {before_ms:>10.2f} {after_ms:>10.2f} {before_ms / after_ms:>7.1f}x")
+        if args.plans:
+            for line in before_plan:
+                print(f"    before: {line}")
+            for line in after_plan:
+                print(f"    after:  {line}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Custo da instrumentação (instrumentation.py) por request
+
+Mede a mediana da latência de algumas rotas pelo test client, como usuário
+master, com a aplicação montada de três formas:
+
+- off: INSTRUMENTATION_ENABLED desligado (nenhum hook nem listener);
+- on: histogramas de latência, SQL e templates;
+- on + profile: todos os requests sob cProfile (INSTRUMENTATION_PROFILE_RATE=1;
+  nenhum perfil é gravado, o limite de lentidão fica acima dos tempos medidos).
+
+Uso:
+    python benchmarks/instrumentation.py
+    python benchmarks/instrumentation.py --dashboards 5000 --rounds 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from app import create_app, db
+import migrate
+from seed_data import generate
+
+PATHS = ['/dashboard', '/dashboards/manage', '/api/users', '/dashboard/view/1']
+
+MODES = [
+    ('off', {'INSTRUMENTATION_ENABLED': False}),
+    ('on', {'INSTRUMENTATION_ENABLED': True}),
+    ('on + profile', {'INSTRUMENTATION_ENABLED': True, 'INSTRUMENTATION_PROFILE_RATE': 1.0}),
+]
+
+def client_for(app):
+    client = app.test_client()
+    # Usuário 1 é o master criado por seed_data.generate()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    return client
+
+def timed_get(client, path):
+    start = time.perf_counter()
+    response = client.get(path)
+    response.get_data()
+    # Fechar a resposta dispara o registro das métricas, como faz o servidor WSGI
+    response.close()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--dashboards', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=100)
+    args = parser.parse_args()
+
+    url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'instrumentation.db')
+    clients = []
+    for label, overrides in MODES:
+        app = create_app(SQLALCHEMY_DATABASE_URI=url, RATELIMIT_ENABLED=False, INSTRUMENTATION_SLOW_MS=60000,
+                         **overrides)
+        if not clients:
+            with app.app_context():
+                migrate.upgrade(db.engine, log=lambda message: None)
+                generate(db.engine, companies=20, departments=200, users=args.users, dashboards=args.dashboards,
+                         log=lambda message: None)
+        clients.append((label, client_for(app)))
+
+    print(f"{'path':<22}" + ''.join(f" {label + ' ms':>17}" for label, _ in clients))
+    for path in PATHS:
+        samples = {label: [] for label, _ in clients}
+        for _, client in clients:
+            client.get(path).close()
+        # Modos intercalados a cada rodada, para o ruído da máquina afetar todos igualmente
+        for _ in range(args.rounds):
+            for label, client in clients:
+                samples[label].append(timed_get(client, path))
+        print(f"{path:<22}" + ''.join(f" {statistics.median(samples[label]) * 1000:>17.2f}" for label, _ in clients))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Verificação dos links dos dashboards (dashboard_health.py) contra um servidor local
+
+Sobe um servidor HTTP local que imita os links do Power BI (keep-alive,
+latência configurável) e aponta os dashboards de um banco sintético para ele,
+com uma mistura de links saudáveis, 404, 500, redirecionamentos, respostas
+chunked e links que não respondem dentro do timeout. Para cada nível de
+concorrência roda uma varredura completa e mostra:
+
+- tempo total e verificações por segundo;
+- conexões abertas no servidor (o pool reaproveita conexões por host);
+- se o resultado gravado de cada dashboard bate com o esperado.
+
+No fim, roda uma segunda varredura sem --all para mostrar que resultados
+dentro de DASHBOARD_HEALTH_TTL não geram requisições.
+
+Uso:
+    python benchmarks/link_health.py
+    python benchmarks/link_health.py --dashboards 2000 --latency 0.05 --concurrency 5 20 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from sqlalchemy import case, select, update
+from app import create_app, db
+import migrate
+from dashboard_health import HealthChecker, sweep
+from models import Dashboard, DashboardHealth
+from seed_data import generate
+
+# (caminho, status esperado) distribuídos entre os dashboards pelo id
+KINDS = [
+    ('ok', 200), ('ok', 200), ('ok', 200), ('ok', 200), ('ok', 200), ('ok', 200),
+    ('chunked', 200), ('redirect', 302), ('missing', 404), ('error', 500), ('hang', None),
+]
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalhos e corpo saem em writes separados: sem isso cada resposta espera o ACK atrasado do cliente
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+
+    def do_GET(self):
+        server = self.server
+        server.count('requests')
+        kind = self.path.strip('/').split('/')[0]
+        if kind == 'hang':
+            time.sleep(server.hang)
+        elif server.latency:
+            time.sleep(server.latency)
+        if kind == 'chunked':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for part in (b'<html>', b'report', b'</html>'):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(part), part))
+            self.wfile.write(b'0\r\n\r\n')
+            return
+        status = {'ok': 200, 'redirect': 302, 'missing': 404, 'hang': 200}.get(kind, 500)
+        body = b'<html>' + b'x' * 2000 + b'</html>'
+        self.send_response(status)
+        if status == 302:
+            self.send_header('Location', '/ok/login')
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency, hang):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.latency = latency
+        self.hang = hang
+        self.counts = {'connections': 0, 'requests': 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def handle_error(self, request, client_address):
+        # Conexões de links "hang" são fechadas pelo cliente no timeout
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def reset(self):
+        with self._lock:
+            self.counts = {'connections': 0, 'requests': 0}
+
+def point_dashboards_at(engine, base_url, distinct):
+    """power_bi_link of each dashboard: KINDS by id, `distinct` different URLs per kind"""
+    with engine.begin() as conn:
+        kind = case(*[(Dashboard.id % len(KINDS) == i, name) for i, (name, _) in enumerate(KINDS)])
+        conn.execute(update(Dashboard).values(
+            power_bi_link=base_url + '/' + kind + '/' + (Dashboard.id % distinct).cast(db.String)
+        ))
+
+def mismatches():
+    """Dashboards whose stored result differs from what the stub answers"""
+    expected = {name: status for name, status in KINDS}
+    wrong = 0
+    for link, ok, status_code in db.session.execute(
+            select(Dashboard.power_bi_link, DashboardHealth.ok, DashboardHealth.status_code)
+            .join(DashboardHealth, DashboardHealth.dashboard_id == Dashboard.id)):
+        status = expected[link.rsplit('/', 2)[1]]
+        if status_code != status or ok != (status is not None and status < 400):
+            wrong += 1
+    return wrong
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dashboards', type=int, default=1000)
+    parser.add_argument('--distinct', type=int, default=200, help='distinct URLs per kind of link')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds the stub takes per response')
+    parser.add_argument('--timeout', type=float, default=0.5)
+    parser.add_argument('--per-host', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[5, 20, 50])
+    args = parser.parse_args()
+
+    server = StubServer(args.latency, hang=args.timeout * 2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'link_health.db')
+    app = create_app(SQLALCHEMY_DATABASE_URI=url, RATELIMIT_ENABLED=False)
+    with app.app_context():
+        migrate.upgrade(db.engine, log=lambda message: None)
+        generate(db.engine, companies=5, departments=20, users=10, dashboards=args.dashboards, log=lambda message: None)
+        point_dashboards_at(db.engine, base_url, args.distinct)
+
+        print(f"{args.dashboards} dashboards, stub latency {args.latency * 1000:.0f} ms, "
+              f"timeout {args.timeout}s, {args.per_host} connections per host")
+        print(f"{'concurrency':>11} {'links':>6} {'seconds':>8} {'links/s':>8} {'failing':>8} "
+              f"{'connections':>11} {'requests':>9} {'mismatches':>10}")
+        for concurrency in args.concurrency:
+            server.reset()
+            checker = HealthChecker(concurrency=concurrency, per_host=args.per_host, timeout=args.timeout)
+            summary = sweep(force=True, checker=checker)
+            print(f"{concurrency:>11} {summary['urls']:>6} {summary['seconds']:>8.2f} "
+                  f"{summary['urls'] / summary['seconds']:>8.0f} {summary['failed']:>8} "
+                  f"{server.counts['connections']:>11} {server.counts['requests']:>9} {mismatches():>10}")
+
+        server.reset()
+        summary = sweep(checker=checker)
+        print(f"sweep within the TTL: {summary['checked']} checked, {server.counts['requests']} requests")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark da política de hash de senhas
+
+Mede o tempo de geração e de verificação de hash para cada configuração,
+para escolher PASSWORD_HASH_METHOD de acordo com a CPU do ambiente (o
+login em serverless precisa caber no tempo limite da função).
+
+Uso:
+    python benchmarks/password_hashing.py
+    python benchmarks/password_hashing.py --rounds 20 scrypt:16384:8:1 pbkdf2:sha256:600000
+"""
+import argparse
+import statistics
+import time
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHODS = [
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:100000',
+]
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def bench(method, rounds, password='Benchmark@2025'):
+    start = time.perf_counter()
+    pwhash = generate_password_hash(password, method=method)
+    hash_ms = (time.perf_counter() - start) * 1000
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        check_password_hash(pwhash, password)
+        samples.append((time.perf_counter() - start) * 1000)
+    return hash_ms, statistics.median(samples), percentile(samples, 95)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('methods', nargs='*', default=DEFAULT_METHODS)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'method':<26} {'hash ms':>9} {'verify p50':>11} {'verify p95':>11}")
+    for method in args.methods:
+        hash_ms, p50, p95 = bench(method, args.rounds)
+        print(f"{method:<26} {hash_ms:>9.1f} {p50:>11.1f} {p95:>11.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Memória e tempo até o primeiro byte das listagens completas (?all=1)
+
+Para cada tamanho de banco (padrão 10 mil e 100 mil linhas), renderiza a
+listagem completa de usuários e de dashboards como usuário master de duas
+formas e mede o pico de memória com tracemalloc:
+
+- materialized: query.all() + render_template (a página inteira em uma string);
+- streamed: Listing.stream() (yield_per) + utils.stream_template, como em
+  /users?all=1 e /dashboards/manage?all=1.
+
+No modo streamed o pico deve ficar praticamente constante com o número de
+linhas; no materializado cresce junto com o resultado e o HTML.
+
+Uso:
+    python benchmarks/streaming_listings.py
+    python benchmarks/streaming_listings.py --rows 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from flask import render_template, request
+from flask_login import login_user
+from app import create_app, db
+import migrate
+from listings import users_listing, dashboards_listing
+from models import User
+from utils import stream_template
+from seed_data import generate
+
+LISTINGS = [
+    ('users', users_listing, 'admin/users.html'),
+    ('dashboards', dashboards_listing, 'admin/dashboards.html'),
+]
+
+def materialized(listing, template, name):
+    query, _ = listing._query(request.args)
+    html = render_template(template, **{name: query.all(), 'next_cursor': None})
+    return len(html), None
+
+def streamed(listing, template, name):
+    size = 0
+    first = None
+    start = time.perf_counter()
+    for chunk in stream_template(template, **{name: listing.stream(request.args), 'next_cursor': None}):
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return size, first
+
+def measure(app, mode, listing, template, name):
+    with app.test_request_context('/?all=1'):
+        login_user(db.session.get(User, 1))
+        tracemalloc.start()
+        start = time.perf_counter()
+        size, first = mode(listing, template, name)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        db.session.remove()
+    return size, peak, elapsed, first if first is not None else elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>7} {'listing':<11} {'mode':<13} {'HTML MB':>8} {'peak MB':>8} {'total s':>8} {'first byte s':>12}")
+    for rows in args.rows:
+        url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), f'streaming_{rows}.db')
+        app = create_app(SQLALCHEMY_DATABASE_URI=url, RATELIMIT_ENABLED=False)
+        with app.app_context():
+            migrate.upgrade(db.engine, log=lambda message: None)
+            generate(db.engine, companies=50, departments=1000, users=rows, dashboards=rows, log=lambda message: None)
+
+        for name, listing, template in LISTINGS:
+            for label, mode in [('materialized', materialized), ('streamed', streamed)]:
+                size, peak, elapsed, first = measure(app, mode, listing, template, name)
+                print(f"{rows:>7} {name:<11} {label:<13} {size / 1e6:>8.1f} {peak / 1e6:>8.1f} {elapsed:>8.2f} {first:>12.3f}")
+
+if __name__ == '__main__':
+    main()
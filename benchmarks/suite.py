@@ -0,0 +1,386 @@
+"""
+Benchmark de carga das rotas principais (login, dashboards e páginas de admin)
+
+Monta um banco (SQLite temporário ou o informado em --database-url, que
+precisa estar vazio) com a escala pedida de empresas × departamentos ×
+usuários × dashboards, gerados por seed_data.py (sempre os mesmos dados), e
+exercita as rotas:
+
+- login (POST /login, sem sessão);
+- dashboard e view_dashboard como usuário comum;
+- users, departments e /api/departments como usuário master.
+
+Em dois modos:
+
+- client: requests em sequência pelo test client do Flask (custo da
+  aplicação, sem rede);
+- server: servidor WSGI com threads (werkzeug) e --threads clientes HTTP
+  com keep-alive em paralelo.
+
+Para cada rota mostra p50/p95/p99, vazão (requests por segundo), erros e
+consultas SQL por request (total de consultas no engine dividido pelos
+requests; gravações em lote de threads em segundo plano entram na conta).
+
+--compare REV_A REV_B roda o mesmo benchmark (este arquivo) em um git
+worktree de cada revisão, cada uma com um banco novo semeado igual, e mostra
+as diferenças. Revisões anteriores ao create_app/migrate.py também são
+suportadas. Com PostgreSQL, use {rev} na URL para um banco vazio por revisão.
+
+Uso:
+    python benchmarks/suite.py
+    python benchmarks/suite.py --mode server --threads 16 --requests 1000
+    python benchmarks/suite.py --users 50000 --dashboards 20000 --json results.json
+    python benchmarks/suite.py --compare HEAD~5 HEAD
+    python benchmarks/suite.py --compare main HEAD --database-url postgresql://localhost/bench_{rev}
+"""
+import argparse
+import http.client
+import http.cookies
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = 'Bench@1234'
+
+# (nome, método, caminho, perfil); o caminho é formatado com os ids do usuário do perfil
+SCENARIOS = [
+    ('login', 'POST', '/login', None),
+    ('dashboard', 'GET', '/dashboard', 'user'),
+    ('view_dashboard', 'GET', '/dashboard/view/{dashboard_id}', 'user'),
+    ('users', 'GET', '/users', 'master'),
+    ('departments', 'GET', '/departments', 'master'),
+    ('api_departments', 'GET', '/api/departments?company_id={company_id}', 'master'),
+]
+
+def load_app(app_dir, url):
+    """Flask app of the revision in app_dir, with CSRF and rate limits off"""
+    sys.path.insert(0, app_dir)
+    os.environ['DATABASE_URL'] = url
+    # Revisões antigas passam connect_timeout (só do PostgreSQL) também para o SQLite
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'do_connect')
+    def drop_postgres_arguments(dialect, connection_record, cargs, cparams):
+        if dialect.name == 'sqlite':
+            cparams.pop('connect_timeout', None)
+
+    import app as app_module
+    overrides = {'WTF_CSRF_ENABLED': False, 'RATELIMIT_ENABLED': False}
+    if hasattr(app_module, 'create_app'):
+        return app_module.create_app(SQLALCHEMY_DATABASE_URI=url, **overrides)
+    # Revisões anteriores ao create_app: aplicação global montada na importação
+    application = app_module.app
+    application.config.update(overrides)
+    if getattr(app_module, 'limiter', None) is not None:
+        app_module.limiter.enabled = False
+    return application
+
+def create_schema(db):
+    try:
+        import migrate
+    except ImportError:
+        db.create_all()
+    else:
+        migrate.upgrade(db.engine, log=lambda message: None)
+
+def seed(db, companies, departments_per_company, users, dashboards):
+    """Data from seed_data.generate; returns the ids used by SCENARIOS per role"""
+    from sqlalchemy import select
+    # O gerador desta revisão (não o da revisão testada): as duas revisões do --compare
+    # recebem os mesmos dados
+    spec = importlib.util.spec_from_file_location('seed_data', os.path.join(ROOT_DIR, 'seed_data.py'))
+    seed_data = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(seed_data)
+    seed_data.generate(db.engine, companies=companies, departments=companies * departments_per_company,
+                       users=users, dashboards=dashboards, password=PASSWORD, log=lambda message: None)
+
+    # Usuário comum dos cenários: o primeiro com vínculo a um departamento com dashboards ativos
+    tables = db.metadata.tables
+    users_table, members, dashboards_table = tables['users'], tables['user_department'], tables['dashboards']
+    visible = (select(members.c.user_id, dashboards_table.c.id)
+               .join(dashboards_table, dashboards_table.c.department_id == members.c.department_id)
+               .where(dashboards_table.c.is_active == True).subquery())
+    with db.engine.connect() as conn:
+        user_id = conn.execute(select(visible.c.user_id).order_by(visible.c.user_id).limit(1)).scalar()
+        user = conn.execute(select(users_table.c.email, users_table.c.company_id)
+                            .where(users_table.c.id == user_id)).one()
+        dashboard_ids = conn.execute(select(visible.c.id).where(visible.c.user_id == user_id)
+                                     .order_by(visible.c.id)).scalars().all()
+    return {
+        'user': {'email': user.email, 'dashboard_ids': dashboard_ids, 'company_id': user.company_id},
+        'master': {'email': 'master@example.com', 'dashboard_ids': [1], 'company_id': companies // 2 or 1},
+    }
+
+def paths_for(path, identity, count):
+    """`count` request paths, cycling through the identity's dashboards"""
+    ids = identity['dashboard_ids'] if identity else [1]
+    company_id = identity['company_id'] if identity else 1
+    return [path.format(dashboard_id=ids[i % len(ids)], company_id=company_id) for i in range(count)]
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        with self._lock:
+            self.count += 1
+
+def summarize(name, mode, latencies, errors, elapsed, queries):
+    ordered = sorted(latencies)
+    if len(ordered) > 1:
+        cuts = statistics.quantiles(ordered, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ordered[0] if ordered else 0.0
+    return {
+        'mode': mode,
+        'scenario': name,
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': p50 * 1000,
+        'p95_ms': p95 * 1000,
+        'p99_ms': p99 * 1000,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'queries': queries / len(latencies) if latencies else 0.0,
+    }
+
+def ok(name, status):
+    # Login bem-sucedido redireciona; as demais rotas respondem 200 (um 302 seria a tela de login)
+    return status == (302 if name == 'login' else 200)
+
+def run_client(app, counter, identities, requests, login_requests):
+    results = []
+    for name, method, path, role in SCENARIOS:
+        identity = identities.get(role)
+        count = login_requests if name == 'login' else requests
+        paths = paths_for(path, identity, count)
+        client = app.test_client()
+        if identity:
+            response = client.post('/login', data={'email': identity['email'], 'password': PASSWORD})
+            if response.status_code != 302:
+                raise SystemExit(f"login as {identity['email']} failed ({response.status_code})")
+            client.get(paths[0]).close()
+        latencies, errors = [], 0
+        queries = counter.count
+        started = time.perf_counter()
+        for request_path in paths:
+            start = time.perf_counter()
+            if name == 'login':
+                response = app.test_client().post(request_path, data={'email': identities['user']['email'], 'password': PASSWORD})
+            else:
+                response = client.get(request_path)
+            response.get_data()
+            response.close()
+            latencies.append(time.perf_counter() - start)
+            errors += not ok(name, response.status_code)
+        elapsed = time.perf_counter() - started
+        results.append(summarize(name, 'client', latencies, errors, elapsed, counter.count - queries))
+    return results
+
+class HttpSession:
+    """Keep-alive connection with the session cookie of one logged-in user"""
+
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        self.cookie = None
+
+    def request(self, method, path, form=None):
+        headers = {'Cookie': self.cookie} if self.cookie else {}
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            parsed = http.cookies.SimpleCookie(cookie)
+            self.cookie = '; '.join(f'{key}={morsel.value}' for key, morsel in parsed.items())
+        return response.status
+
+    def login(self, email):
+        return self.request('POST', '/login', {'email': email, 'password': PASSWORD})
+
+    def close(self):
+        self.connection.close()
+
+def run_server(app, counter, identities, requests, login_requests, threads):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class Handler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    results = []
+    try:
+        for name, method, path, role in SCENARIOS:
+            identity = identities.get(role)
+            count = login_requests if name == 'login' else requests
+            paths = paths_for(path, identity, count)
+            sessions = []
+            for _ in range(threads):
+                session = HttpSession(port)
+                if identity:
+                    if session.login(identity['email']) != 302:
+                        raise SystemExit(f"login as {identity['email']} failed")
+                    session.request('GET', paths[0])
+                sessions.append(session)
+
+            latencies, errors = [], [0]
+            lock = threading.Lock()
+
+            def worker(session, share):
+                local, failed = [], 0
+                for request_path in share:
+                    start = time.perf_counter()
+                    if name == 'login':
+                        session.cookie = None
+                        status = session.request('POST', request_path,
+                                                 {'email': identities['user']['email'], 'password': PASSWORD})
+                    else:
+                        status = session.request(method, request_path)
+                    local.append(time.perf_counter() - start)
+                    failed += not ok(name, status)
+                with lock:
+                    latencies.extend(local)
+                    errors[0] += failed
+
+            workers = [threading.Thread(target=worker, args=(session, paths[i::threads]))
+                       for i, session in enumerate(sessions)]
+            queries = counter.count
+            started = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            for session in sessions:
+                session.close()
+            results.append(summarize(name, 'server', latencies, errors[0], elapsed, counter.count - queries))
+    finally:
+        server.shutdown()
+    return results
+
+def print_results(results):
+    print(f"{'mode':<7} {'scenario':<16} {'reqs':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'req/s':>8} {'queries':>8}")
+    for r in results:
+        print(f"{r['mode']:<7} {r['scenario']:<16} {r['requests']:>5} {r['errors']:>4} {r['p50_ms']:>8.2f} "
+              f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['throughput']:>8.1f} {r['queries']:>8.1f}")
+
+def git(*args, cwd=ROOT_DIR):
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+def benchmark_args(args):
+    """Command-line options passed on to each revision's run"""
+    options = ['--companies', args.companies, '--departments-per-company', args.departments_per_company,
+               '--users', args.users, '--dashboards', args.dashboards, '--requests', args.requests,
+               '--login-requests', args.login_requests, '--threads', args.threads, '--mode', args.mode]
+    return [str(option) for option in options]
+
+def compare(args):
+    workdir = tempfile.mkdtemp(prefix='hidash-bench-')
+    runs = []
+    try:
+        for revision in args.compare:
+            sha = git('rev-parse', '--short', revision)
+            checkout = os.path.join(workdir, sha)
+            git('worktree', 'add', '--detach', checkout, sha)
+            output = os.path.join(workdir, f'{sha}.json')
+            command = [sys.executable, os.path.abspath(__file__), '--app-dir', checkout, '--json', output]
+            if args.database_url:
+                command += ['--database-url', args.database_url.format(rev=sha)]
+            print(f"== {revision} ({sha})", flush=True)
+            try:
+                subprocess.run(command + benchmark_args(args), check=True)
+            finally:
+                git('worktree', 'remove', '--force', checkout)
+            with open(output) as f:
+                runs.append((revision, json.load(f)))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    (label_a, run_a), (label_b, run_b) = runs
+    before = {(r['mode'], r['scenario']): r for r in run_a['results']}
+    print(f"\n{label_a} -> {label_b}")
+    print(f"{'mode':<7} {'scenario':<16} {'p50 ms':>17} {'p95 ms':>17} {'req/s':>19} {'queries':>11}")
+    for r in run_b['results']:
+        a = before.get((r['mode'], r['scenario']))
+        if a is None:
+            continue
+        print(f"{r['mode']:<7} {r['scenario']:<16} "
+              f"{_change(a['p50_ms'], r['p50_ms']):>17} {_change(a['p95_ms'], r['p95_ms']):>17} "
+              f"{_change(a['throughput'], r['throughput'], '.0f'):>19} "
+              f"{a['queries']:>5.1f}->{r['queries']:<5.1f}")
+
+def _change(before, after, spec='.2f'):
+    percent = (after - before) / before * 100 if before else 0.0
+    return f"{before:{spec}}->{after:{spec}} {percent:+.0f}%"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url')
+    parser.add_argument('--companies', type=int, default=20)
+    parser.add_argument('--departments-per-company', type=int, default=10)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--dashboards', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=300, help='requests per scenario')
+    parser.add_argument('--login-requests', type=int, default=50, help='requests of the login scenario (password hashing)')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent HTTP clients in server mode')
+    parser.add_argument('--mode', choices=['client', 'server', 'both'], default='both')
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--compare', nargs=2, metavar='REV', help='run on two git revisions and compare')
+    parser.add_argument('--app-dir', default=ROOT_DIR, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(args)
+
+    url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'suite.db')
+    app = load_app(args.app_dir, url)
+    # Revisões antigas configuram o log em DEBUG na importação
+    logging.getLogger().setLevel(logging.WARNING)
+    from app import db
+    with app.app_context():
+        create_schema(db)
+        identities = seed(db, args.companies, args.departments_per_company, args.users, args.dashboards)
+        counter = QueryCounter(db.engine)
+
+    revision = git('rev-parse', '--short', 'HEAD', cwd=args.app_dir)
+    print(f"{revision}: {args.companies} companies x {args.departments_per_company} departments, "
+          f"{args.users} users, {args.dashboards} dashboards ({url.split(':', 1)[0]})", flush=True)
+    results = []
+    if args.mode in ('client', 'both'):
+        results += run_client(app, counter, identities, args.requests, args.login_requests)
+    if args.mode in ('server', 'both'):
+        results += run_server(app, counter, identities, args.requests, args.login_requests, args.threads)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'revision': revision, 'args': vars(args), 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
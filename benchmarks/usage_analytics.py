@@ -0,0 +1,124 @@
+"""
+Benchmark do registro de visualizações (view_events.py)
+
+Monta um banco com dashboards sintéticos e mede:
+
+- record(): custo por chamada no request (apenas o buffer em memória);
+- gravação de eventos: um INSERT + commit por visualização (o que seria
+  gravar no request) contra lotes de VIEW_EVENTS_FLUSH_SIZE eventos com
+  write_events (eventos + totais por hora na mesma transação);
+- relatório de mais vistos por período: pelos totais por hora
+  (most_viewed) contra a mesma agregação direto nos eventos.
+
+Os eventos cobrem os últimos 90 dias, com poucos dashboards concentrando a
+maior parte das visualizações.
+
+Uso:
+    python benchmarks/usage_analytics.py
+    python benchmarks/usage_analytics.py --events 3000000 --dashboards 5000
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from sqlalchemy import func, insert, select
+from app import create_app, db
+import migrate
+from models import dashboard_view_events
+from view_events import REPORT_PERIODS, ViewEventRecorder, most_viewed, write_events
+from seed_data import generate
+
+def synthetic_events(count, dashboards, rng, now):
+    """Events over the last 90 days; dashboard popularity follows a Pareto distribution"""
+    span = 90 * 24 * 3600
+    for _ in range(count):
+        dashboard_id = min(int(rng.paretovariate(1.2)), dashboards)
+        yield dashboard_id, rng.randrange(1, 1000), now - datetime.timedelta(seconds=rng.randrange(span))
+
+def raw_report(days, limit=50):
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    table = dashboard_view_events
+    return db.session.execute(
+        select(table.c.dashboard_id, func.count().label('views'))
+        .where(table.c.viewed_at >= since)
+        .group_by(table.c.dashboard_id)
+        .order_by(func.count().desc())
+        .limit(limit)
+    ).all()
+
+def median_ms(func, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url')
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--dashboards', type=int, default=2000)
+    parser.add_argument('--single', type=int, default=2000, help='events written one INSERT + commit at a time')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'usage_analytics.db')
+    app = create_app(SQLALCHEMY_DATABASE_URI=url, RATELIMIT_ENABLED=False)
+    rng = random.Random(42)
+    now = datetime.datetime.utcnow()
+    with app.app_context():
+        migrate.upgrade(db.engine, log=lambda message: None)
+        generate(db.engine, companies=20, departments=200, users=10, dashboards=args.dashboards,
+                 log=lambda message: None)
+
+    # Custo de record() no request: só o append no buffer (sem gravação durante a medição)
+    recorder = ViewEventRecorder()
+    buffering = create_app(SQLALCHEMY_DATABASE_URI=url, VIEW_EVENTS_FLUSH_SIZE=0, VIEW_EVENTS_FLUSH_INTERVAL=3600)
+    with buffering.test_request_context():
+        calls = 100000
+        start = time.perf_counter()
+        for i in range(calls):
+            recorder.record(i % args.dashboards + 1, 1)
+        per_call = (time.perf_counter() - start) / calls
+    print(f"record(): {per_call * 1e6:.2f} us per call")
+
+    with app.app_context():
+        # Um INSERT + commit por visualização
+        table = dashboard_view_events
+        start = time.perf_counter()
+        for dashboard_id, user_id, viewed_at in synthetic_events(args.single, args.dashboards, rng, now):
+            with db.engine.begin() as conn:
+                conn.execute(insert(table).values(dashboard_id=dashboard_id, user_id=user_id, viewed_at=viewed_at))
+        single = args.single / (time.perf_counter() - start)
+
+        # Lotes como os da thread de gravação
+        batch_size = app.config['VIEW_EVENTS_FLUSH_SIZE']
+        events = synthetic_events(args.events, args.dashboards, rng, now)
+        start = time.perf_counter()
+        written = 0
+        while written < args.events:
+            batch = [next(events) for _ in range(min(batch_size, args.events - written))]
+            with db.engine.begin() as conn:
+                write_events(conn, batch)
+            written += len(batch)
+        batched = args.events / (time.perf_counter() - start)
+        print(f"writes: {single:,.0f} events/s one per transaction, "
+              f"{batched:,.0f} events/s in batches of {batch_size} (with hourly rollups)")
+
+        print(f"{'period':<7} {'rollups ms':>10} {'raw events ms':>13}")
+        for period, days in REPORT_PERIODS.items():
+            rollup_ms = median_ms(lambda: most_viewed(days), args.rounds)
+            raw_ms = median_ms(lambda: raw_report(days), args.rounds)
+            print(f"{period:<7} {rollup_ms:>10.1f} {raw_ms:>13.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""
+Build dos arquivos estáticos (static/ -> static/dist/)
+
+- Arquivos com conteúdo idêntico (ex.: cópias da mesma imagem de login) são
+  gravados uma única vez e compartilham o mesmo nome com hash.
+- Imagens PNG/JPEG são convertidas para AVIF e WebP em larguras responsivas
+  (IMAGE_WIDTHS, nunca maiores que o original); uma cópia do original também
+  é gravada como fallback.
+- CSS e JavaScript são minificados (rcssmin/rjsmin se instalados; senão um
+  minificador conservador embutido). As url() do CSS que apontam para imagens
+  passam a usar a versão WebP.
+- Arquivos de texto gerados (CSS, JS, SVG) ganham variantes .gz e .br
+  (brotli, se o pacote estiver instalado) ao lado, servidas por
+  compression.CompressionMiddleware sem comprimir a cada request.
+- Todo arquivo gerado tem o hash do conteúdo no nome e pode ficar em cache
+  para sempre; static/dist/manifest.json liga o nome lógico ao nome gerado e
+  é lido por asset_url() / picture_sources() (assets.py).
+
+Sem o build (ou sem o manifest) os templates continuam servindo os arquivos
+originais, com ?v=<hash> na URL.
+
+Uso:
+    pip install Pillow      # apenas na máquina de build
+    python build_assets.py
+    python build_assets.py --check   # apenas lista duplicados e o que seria gerado
+"""
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT_DIR, 'static')
+DIST_NAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+HASH_LENGTH = 12
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+IMAGE_WIDTHS = (480, 960, 1600)
+# Ordem de preferência do navegador em <picture>: AVIF antes de WebP
+IMAGE_FORMATS = (
+    ('avif', {'quality': 55}),
+    ('webp', {'quality': 80, 'method': 6}),
+)
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.svg')
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+def minify_css(text):
+    try:
+        import rcssmin
+        return rcssmin.cssmin(text)
+    except ImportError:
+        pass
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+def minify_js(text):
+    try:
+        import rjsmin
+        return rjsmin.jsmin(text)
+    except ImportError:
+        pass
+    # Conservador: remove apenas comentários de linha inteira, indentação e linhas vazias,
+    # mantendo as quebras de linha (sem depender da inserção automática de ponto e vírgula)
+    lines = [line for line in strip_comment_lines(text.splitlines()) if line and not line.startswith('//')]
+    return '\n'.join(lines) + '\n'
+
+def strip_comment_lines(lines):
+    """Stripped lines without the /* */ blocks that occupy whole lines.
+
+    Um bloco só é removido se começa no início de uma linha e o primeiro */ fecha
+    essa linha; se houver código depois do */ (ou o bloco não fechar), tudo é mantido.
+    """
+    block = []
+    for line in lines:
+        line = line.strip()
+        if not block and not line.startswith('/*'):
+            yield line
+            continue
+        block.append(line)
+        # O */ procurado depois do /* de abertura (/*/ não fecha o bloco)
+        end = line.find('*/', 2 if len(block) == 1 else 0)
+        if end == -1:
+            continue
+        if end + 2 != len(line):
+            yield from block
+        block = []
+    yield from block
+
+class AssetBuild:
+    """One run of the pipeline: reads static/, writes static/dist/ and the manifest"""
+
+    def __init__(self, static_dir=STATIC_DIR, write=True, log=print):
+        self.static_dir = static_dir
+        self.dist_dir = os.path.join(static_dir, DIST_NAME)
+        self.write = write
+        self.log = log
+        self.files = {}
+        self.images = {}
+        self._outputs = {}
+        self._by_content = {}
+        self._precompressed = set()
+
+    def sources(self):
+        """Logical names (relative to static/) of every source file"""
+        names = []
+        for directory, subdirs, filenames in os.walk(self.static_dir):
+            if os.path.abspath(directory) == os.path.abspath(self.static_dir):
+                subdirs[:] = [d for d in subdirs if d != DIST_NAME]
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                names.append(os.path.relpath(path, self.static_dir).replace(os.sep, '/'))
+        return sorted(names)
+
+    def read(self, name):
+        with open(os.path.join(self.static_dir, name), 'rb') as f:
+            return f.read()
+
+    def emit(self, name, data, suffix=None):
+        """Write data as dist/<stem>.<hash><suffix>; identical content is written once"""
+        digest = content_hash(data)
+        stem, extension = os.path.splitext(name)
+        key = (digest, suffix or extension)
+        if key in self._outputs:
+            return self._outputs[key]
+        output = f'{DIST_NAME}/{stem}.{digest}{suffix or extension}'
+        self._outputs[key] = output
+        if self.write:
+            path = os.path.join(self.static_dir, output)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            if output.endswith(PRECOMPRESS_EXTENSIONS):
+                self.precompress(path, data)
+        return output
+
+    def precompress(self, path, data):
+        """Write path.gz and path.br next to a text file"""
+        variants = {'.gz': lambda: gzip.compress(data, 9, mtime=0)}
+        try:
+            import brotli
+            variants['.br'] = lambda: brotli.compress(data, quality=11)
+        except ImportError:
+            pass
+        for suffix, compress in variants.items():
+            self._precompressed.add(path + suffix)
+            if not os.path.exists(path + suffix):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compress())
+
+    def report_duplicates(self, names):
+        groups = {}
+        for name in names:
+            groups.setdefault(hashlib.sha256(self.read(name)).hexdigest(), []).append(name)
+        for group in groups.values():
+            if len(group) > 1:
+                self.log(f"duplicate content ({os.path.getsize(os.path.join(self.static_dir, group[0]))} bytes): {', '.join(group)}")
+        return groups
+
+    def build_image(self, name, data):
+        from PIL import Image, features
+
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self._by_content:
+            # Mesma imagem com outro nome: reutilizar as variantes já geradas
+            self.files[name], self.images[name] = self._by_content[digest]
+            return
+
+        self.files[name] = self.emit(name, data)
+        variants = {}
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            # Larguras muito próximas do original não compensam um arquivo a mais
+            widths = sorted({w for w in IMAGE_WIDTHS if w < image.width * 0.9} | {image.width})
+            stem = os.path.splitext(name)[0]
+            for format, options in IMAGE_FORMATS:
+                if not features.check(format):
+                    self.log(f"Pillow without {format} support, skipping {format} variants")
+                    continue
+                for width in widths:
+                    height = round(image.height * width / image.width)
+                    resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                    buffer = io.BytesIO()
+                    resized.save(buffer, format=format.upper(), **options)
+                    variants.setdefault(format, []).append([width, self.emit(f'{stem}-{width}', buffer.getvalue(), f'.{format}')])
+        self.images[name] = variants
+        self._by_content[digest] = (self.files[name], variants)
+
+    def css_url(self, url):
+        """Manifest path for an image referenced from CSS, preferring the widest WebP"""
+        if url.startswith('/static/'):
+            name = url[len('/static/'):]
+        elif url.startswith('../'):
+            name = url[len('../'):]
+        else:
+            return None
+        variants = self.images.get(name, {}).get('webp')
+        if variants:
+            return variants[-1][1]
+        return self.files.get(name)
+
+    def build_css(self, name, data):
+        text = data.decode('utf-8')
+
+        def rewrite(match):
+            output = self.css_url(match.group(2))
+            return f"url('/static/{output}')" if output else match.group(0)
+
+        text = minify_css(CSS_URL.sub(rewrite, text))
+        self.files[name] = self.emit(name, text.encode('utf-8'), '.min.css')
+
+    def build_js(self, name, data):
+        text = minify_js(data.decode('utf-8'))
+        self.files[name] = self.emit(name, text.encode('utf-8'), '.min.js')
+
+    def run(self):
+        names = self.sources()
+        self.report_duplicates(names)
+        # Imagens primeiro: o CSS aponta para as versões geradas
+        ordered = sorted(names, key=lambda name: name.endswith('.css'))
+        for name in ordered:
+            data = self.read(name)
+            extension = os.path.splitext(name)[1].lower()
+            if extension in IMAGE_EXTENSIONS:
+                self.build_image(name, data)
+            elif extension == '.css':
+                self.build_css(name, data)
+            elif extension == '.js':
+                self.build_js(name, data)
+            else:
+                self.files[name] = self.emit(name, data)
+
+        if self.write:
+            self.remove_stale()
+            with open(os.path.join(self.dist_dir, MANIFEST_NAME), 'w') as f:
+                json.dump({'files': self.files, 'images': self.images}, f, indent=1, sort_keys=True)
+
+        source_bytes = sum(os.path.getsize(os.path.join(self.static_dir, name)) for name in names)
+        self.log(f"{len(names)} source files ({source_bytes / 1e6:.1f} MB) -> {len(self._outputs)} files in static/{DIST_NAME}")
+        for name in sorted(self.files):
+            self.log(f"  {name} -> {self.files[name]}")
+
+    def remove_stale(self):
+        """Delete files of previous builds that are not in the new manifest"""
+        current = {os.path.join(self.static_dir, output) for output in self._outputs.values()} | self._precompressed
+        for directory, _, filenames in os.walk(self.dist_dir):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if filename != MANIFEST_NAME and path not in current:
+                    os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--check', action='store_true', help='report without writing static/dist')
+    args = parser.parse_args()
+
+    if importlib.util.find_spec('PIL') is None:
+        sys.exit("Pillow is required to build the images: pip install Pillow")
+    AssetBuild(write=not args.check).run()
+
+if __name__ == '__main__':
+    main()
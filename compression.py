@@ -0,0 +1,242 @@
+"""
+Compressão das respostas (gzip/brotli)
+
+Middleware WSGI aplicado em create_app, como o ProxyFix:
+
+- Respostas dinâmicas (HTML, JSON, NDJSON...) com Content-Type em
+  COMPRESSION_MIMETYPES e pelo menos COMPRESSION_MIN_SIZE bytes são
+  comprimidas com brotli (se o pacote estiver instalado e o navegador aceitar)
+  ou gzip. Respostas streamed (sem Content-Length, ex.: importação de
+  usuários) são comprimidas bloco a bloco, com flush a cada bloco para o
+  navegador continuar recebendo o progresso em tempo real.
+- Arquivos estáticos com uma variante .br/.gz pré-comprimida ao lado (gerada
+  por build_assets.py) são servidos a partir dela, sem custo de CPU no
+  request.
+
+Respostas que já têm Content-Encoding, Cache-Control: no-transform, status
+sem corpo ou parciais (206) passam sem alteração.
+"""
+import mimetypes
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ('br', 'gzip')
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+def accepted_encodings(header):
+    """Encodings of an Accept-Encoding header with a non-zero q-value"""
+    accepted = set()
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name)
+    return accepted
+
+class GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+class BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    """Compress a whole body in one call"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    stream = GzipStream(gzip_level)
+    return stream.compress(data) + stream.finish()
+
+def static_mimetype(filename):
+    """Content-Type of the uncompressed file, as Flask would send it"""
+    mimetype, _ = mimetypes.guess_type(filename)
+    mimetype = mimetype or 'application/octet-stream'
+    if mimetype.startswith('text/') or mimetype in ('application/javascript', 'application/json'):
+        mimetype += '; charset=utf-8'
+    return mimetype
+
+class CompressionMiddleware:
+    """WSGI middleware for dynamic compression and precompressed static files"""
+
+    def __init__(self, app, config, static_folder=None, static_url_path='/static'):
+        self.app = app
+        self.min_size = config.get('COMPRESSION_MIN_SIZE', 1024)
+        self.mimetypes = frozenset(config.get('COMPRESSION_MIMETYPES', ()))
+        self.gzip_level = config.get('COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = config.get('COMPRESSION_BROTLI_QUALITY', 4)
+        self.static_folder = static_folder
+        self.static_prefix = static_url_path.rstrip('/') + '/'
+        self.encodings = tuple(e for e in ENCODINGS if e != 'br' or brotli is not None)
+
+    def _choose(self, environ):
+        accepted = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING'))
+        for encoding in self.encodings:
+            if encoding in accepted:
+                return encoding
+        return None
+
+    def __call__(self, environ, start_response):
+        encoding = self._choose(environ)
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        path = environ.get('PATH_INFO', '')
+        if self.static_folder and path.startswith(self.static_prefix):
+            response = self._precompressed(environ, start_response, path)
+            if response is not None:
+                return response
+        return self._dynamic(environ, start_response, encoding)
+
+    def _precompressed(self, environ, start_response, path):
+        """Serve file.br / file.gz in place of file when the variant exists"""
+        accepted = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING'))
+        relative = path[len(self.static_prefix):]
+        if '..' in relative:
+            return None
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+            if encoding not in accepted or not os.path.isfile(os.path.join(self.static_folder, relative + suffix)):
+                continue
+
+            def precompressed_start_response(status, headers, exc_info=None, encoding=encoding):
+                if status.startswith(('200', '304')):
+                    headers = [(name, value) for name, value in headers if name.lower() != 'content-type']
+                    headers.append(('Content-Type', static_mimetype(relative)))
+                    headers.append(('Content-Encoding', encoding))
+                    headers.append(('Vary', 'Accept-Encoding'))
+                return start_response(status, headers, exc_info)
+            return self.app(dict(environ, PATH_INFO=path + suffix), precompressed_start_response)
+        return None
+
+    def _should_compress(self, status, headers):
+        code = int(status[:3])
+        if code < 200 or code in (204, 206, 304):
+            return False
+        values = {}
+        for name, value in headers:
+            values[name.lower()] = value
+        if 'content-encoding' in values or 'no-transform' in values.get('cache-control', ''):
+            return False
+        mimetype = values.get('content-type', '').split(';')[0].strip().lower()
+        if mimetype not in self.mimetypes:
+            return False
+        length = values.get('content-length')
+        return length is None or int(length) >= self.min_size
+
+    def _dynamic(self, environ, start_response, encoding):
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured['response'] = (status, headers, exc_info)
+            return self._write_unsupported
+
+        app_iter = self.app(environ, capture)
+        try:
+            chunks = iter(app_iter)
+            # Algumas aplicações só chamam start_response ao produzir o primeiro bloco
+            first = next(chunks, None) if 'response' not in captured else None
+        except Exception:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+            raise
+        status, headers, exc_info = captured['response']
+
+        if not self._should_compress(status, headers):
+            start_response(status, headers, exc_info)
+            if first is None:
+                return app_iter
+            return self._passthrough(app_iter, chunks, first)
+
+        streamed = not any(name.lower() == 'content-length' for name, _ in headers)
+        headers = self._compressed_headers(headers, encoding)
+        if streamed:
+            start_response(status, headers, exc_info)
+            return self._stream(app_iter, chunks, first, encoding)
+
+        body = b''.join(([first] if first else []) + list(chunks))
+        if hasattr(app_iter, 'close'):
+            app_iter.close()
+        data = compress(body, encoding, self.gzip_level, self.brotli_quality)
+        headers.append(('Content-Length', str(len(data))))
+        start_response(status, headers, exc_info)
+        return [data]
+
+    @staticmethod
+    def _write_unsupported(data):
+        raise RuntimeError('CompressionMiddleware does not support the WSGI write() callable')
+
+    @staticmethod
+    def _compressed_headers(headers, encoding):
+        result = []
+        vary = None
+        for name, value in headers:
+            lower = name.lower()
+            if lower == 'content-length':
+                continue
+            if lower == 'etag' and not value.startswith('W/'):
+                # O corpo comprimido é outra representação: a ETag passa a ser fraca
+                value = 'W/' + value
+            if lower == 'vary':
+                vary = value
+                continue
+            result.append((name, value))
+        if vary is None:
+            vary = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            vary += ', Accept-Encoding'
+        result.append(('Vary', vary))
+        result.append(('Content-Encoding', encoding))
+        return result
+
+    @staticmethod
+    def _passthrough(app_iter, chunks, first):
+        try:
+            yield first
+            yield from chunks
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    def _stream(self, app_iter, chunks, first, encoding):
+        stream = BrotliStream(self.brotli_quality) if encoding == 'br' else GzipStream(self.gzip_level)
+        try:
+            if first:
+                yield stream.compress(first) + stream.flush()
+            for chunk in chunks:
+                if chunk:
+                    yield stream.compress(chunk) + stream.flush()
+            yield stream.finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
@@ -0,0 +1,92 @@
+"""
+GETs condicionais (ETag / Last-Modified) para páginas e APIs consultadas com frequência
+
+Os validadores vêm de uma única consulta agregada (COUNT + MAX(updated_at)) sobre
+as linhas envolvidas, sem carregar nenhuma delas. Se o navegador já tem a versão
+atual (If-None-Match / If-Modified-Since), a resposta é um 304 antes de qualquer
+consulta de conteúdo ou renderização.
+
+A ETag também inclui o que mais muda a página (o usuário logado e o escopo de
+acesso) e RELEASE, de forma que um deploy com templates novos invalida tudo.
+RELEASE é o mesmo em todos os workers de um deploy: a variável RELEASE, o
+commit na Vercel ou, sem nenhum dos dois, um hash do código e dos templates.
+"""
+import glob
+import hashlib
+import json
+import os
+from flask import make_response, request, session
+from flask_login import current_user
+from sqlalchemy import func, select
+from werkzeug.http import is_resource_modified
+from app import db
+from models import Company, Department, Dashboard
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def source_fingerprint():
+    """Hash of the Python modules and templates, identical in every worker of a deploy"""
+    digest = hashlib.sha256()
+    paths = glob.glob(os.path.join(ROOT_DIR, '*.py')) + \
+        glob.glob(os.path.join(ROOT_DIR, 'templates', '**', '*.html'), recursive=True)
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, ROOT_DIR).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+# Identifica a versão em execução; nunca o início do processo, que difere entre workers
+RELEASE = os.environ.get('RELEASE') or os.environ.get('VERCEL_GIT_COMMIT_SHA') or source_fingerprint()
+
+def make_etag(*parts):
+    """Opaque validator for any JSON-serializable parts"""
+    raw = json.dumps([RELEASE, *parts], default=str, separators=(',', ':'))
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+def user_parts():
+    """Everything base.html shows about the logged-in user (topbar and sidebar)"""
+    company = current_user.company
+    return [
+        current_user.id, current_user.name, current_user.email, current_user.role,
+        list(company) if company else None,
+        [list(d) for d in current_user.departments],
+    ]
+
+def dashboard_state(*criteria):
+    """(count, last_modified) of the dashboards matching criteria, with their departments and companies"""
+    count, *timestamps = db.session.execute(
+        select(
+            func.count(Dashboard.id),
+            func.max(Dashboard.updated_at),
+            func.max(Department.updated_at),
+            func.max(Company.updated_at),
+        )
+        .select_from(Dashboard)
+        .join(Department, Dashboard.department_id == Department.id)
+        .join(Company, Department.company_id == Company.id)
+        .where(*criteria)
+    ).one()
+    return count, max((t for t in timestamps if t is not None), default=None)
+
+def department_state(*criteria):
+    """(count, last_modified) of the departments matching criteria"""
+    count, last_modified = db.session.execute(
+        select(func.count(Department.id), func.max(Department.updated_at)).where(*criteria)
+    ).one()
+    return count, last_modified
+
+def conditional(etag, last_modified, render):
+    """304 if the client's copy is current, otherwise render() with the validators attached"""
+    # Mensagens flash pendentes fazem parte da página: renderizar sempre
+    pending_flashes = bool(session.get('_flashes'))
+    if not pending_flashes and not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response('', 304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Conteúdo por usuário: o navegador guarda, mas revalida a cada uso
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -15,10 +15,112 @@ class Config:
     PASSWORD_REQUIRE_NUMBER = True
     PASSWORD_REQUIRE_SPECIAL = True
     
+    # Password hashing (formato do werkzeug; ver benchmarks/password_hashing.py para escolher o custo)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 = verificar no próprio request
+    PASSWORD_VERIFY_TIMEOUT = None
+    PASSWORD_IMPORT_PROCESSES = int(os.environ['PASSWORD_IMPORT_PROCESSES']) if os.environ.get('PASSWORD_IMPORT_PROCESSES') else None  # None = uma por CPU
+    
+    # Importação de usuários em lote (linhas por INSERT)
+    USER_IMPORT_BATCH_SIZE = 500
+    USER_IMPORT_MAX_ROWS = 10000
+    
+    # Login attempts
+    MAX_FAILED_LOGIN_ATTEMPTS = 5
+    LAST_LOGIN_FLUSH_INTERVAL = 5  # segundos entre gravações em lote de last_login
+    LAST_LOGIN_FLUSH_SIZE = 500
+    
     # Rate limiting
-    RATELIMIT_STORAGE_URI = "memory://"
+    # memory:// mantém contadores por worker; para compartilhar entre workers/instâncias use
+    # redis://host:6379 (ou servidor compatível) ou sqlalchemy+postgresql://... (tabela rate_limits)
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_STRATEGY = 'sliding-window-counter'
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
     RATELIMIT_HEADERS_ENABLED = True
     
+    # Access index (segundos que cada entrada usuário->dashboards fica em cache; 0 = apenas por request)
+    ACCESS_INDEX_TTL = int(os.environ.get('ACCESS_INDEX_TTL', 30))
+    
+    # Admin listings (linhas por página na paginação por keyset)
+    ADMIN_PAGE_SIZE = 50
+    # Listagens completas em streaming (?all=1): linhas por lote do cursor e tamanho dos blocos enviados
+    ADMIN_STREAM_YIELD_PER = 500
+    ADMIN_STREAM_CHUNK_SIZE = 16384
+    
+    # Cache do usuário autenticado (USER_CACHE_URL=redis://... para compartilhar entre workers e
+    # as invalidações das rotas); users.updated_at é conferido no máximo a cada USER_CACHE_REVALIDATE
+    # segundos, o atraso máximo de uma edição em outro worker com o cache só em memória
+    USER_CACHE_URL = os.environ.get('USER_CACHE_URL')
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    USER_CACHE_REVALIDATE = int(os.environ.get('USER_CACHE_REVALIDATE', 10))
+    USER_CACHE_SIZE = 10000
+    
+    # Cache de fragmentos renderizados (menu lateral e grade de dashboards); a versão é por worker,
+    # então o TTL é a defasagem máxima entre workers dos fragmentos sem estado na chave
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 60))
+    FRAGMENT_CACHE_SIZE = 5000
+    
+    # Páginas de visualização do Power BI renderizadas, por dashboard (0 = sem cache)
+    DASHBOARD_PAGE_CACHE_SIZE = int(os.environ.get('DASHBOARD_PAGE_CACHE_SIZE', 2000))
+    
+    # Compressão das respostas (compression.py); brotli é usado se o pacote estiver instalado
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1') == '1'
+    COMPRESSION_MIN_SIZE = 1024  # bytes; respostas menores não compensam
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 4
+    COMPRESSION_MIMETYPES = [
+        'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+        'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml',
+    ]
+    
+    # Tokens de embed do Power BI (embed_tokens.py); sem POWER_BI_CLIENT_ID apenas links públicos são exibidos
+    POWER_BI_TENANT_ID = os.environ.get('POWER_BI_TENANT_ID')
+    POWER_BI_CLIENT_ID = os.environ.get('POWER_BI_CLIENT_ID')
+    POWER_BI_CLIENT_SECRET = os.environ.get('POWER_BI_CLIENT_SECRET')
+    POWER_BI_API_URL = os.environ.get('POWER_BI_API_URL', 'https://api.powerbi.com')
+    POWER_BI_AUTHORITY_URL = os.environ.get('POWER_BI_AUTHORITY_URL', 'https://login.microsoftonline.com')
+    EMBED_TOKEN_MIN_VALIDITY = 120  # segundos mínimos de validade de um token entregue ao navegador
+    EMBED_TOKEN_REFRESH_MARGIN = 600  # renovar em segundo plano quando faltar menos que isso
+    EMBED_TOKEN_REFRESH_INTERVAL = 30
+    EMBED_TOKEN_IDLE_TTL = 3600  # tokens sem uso há mais tempo não são renovados
+    EMBED_TOKEN_CACHE_SIZE = 1000
+    EMBED_TOKEN_TIMEOUT = 10
+    
+    # Registro de visualizações de dashboards (view_events.py), gravado em lote fora do request
+    VIEW_EVENTS_ENABLED = os.environ.get('VIEW_EVENTS_ENABLED', '1') == '1'
+    VIEW_EVENTS_FLUSH_SIZE = 1000  # eventos em memória que antecipam a gravação
+    VIEW_EVENTS_FLUSH_INTERVAL = 10  # segundos entre gravações
+    VIEW_EVENTS_MAX_BUFFER = 100000  # com o banco indisponível, os eventos mais antigos são descartados
+    # Arquivo JSON Lines em vez do banco (carregado depois com python view_events.py load)
+    VIEW_EVENTS_FILE = os.environ.get('VIEW_EVENTS_FILE')
+    
+    # Verificação dos links do Power BI (dashboard_health.py)
+    DASHBOARD_HEALTH_CONCURRENCY = 20  # verificações simultâneas
+    DASHBOARD_HEALTH_PER_HOST = 4  # conexões abertas por host
+    DASHBOARD_HEALTH_TIMEOUT = 10  # segundos por verificação
+    DASHBOARD_HEALTH_TTL = int(os.environ.get('DASHBOARD_HEALTH_TTL', 900))  # idade máxima de um resultado
+    # Segundos entre varreduras numa thread do processo (0 = apenas pelo script ou pelo cron)
+    DASHBOARD_HEALTH_INTERVAL = int(os.environ.get('DASHBOARD_HEALTH_INTERVAL', 0))
+    # Segredo enviado pela Vercel Cron a /api/cron/dashboard-health (sem ele a rota responde 404)
+    CRON_SECRET = os.environ.get('CRON_SECRET')
+    
+    # Instrumentação dos requests (instrumentation.py): histogramas em /metrics e perfis dos lentos
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '0') == '1'
+    INSTRUMENTATION_SLOW_MS = int(os.environ.get('INSTRUMENTATION_SLOW_MS', 500))
+    INSTRUMENTATION_PROFILE_RATE = float(os.environ.get('INSTRUMENTATION_PROFILE_RATE', 0))  # fração dos requests
+    INSTRUMENTATION_PROFILE_DIR = os.environ.get('INSTRUMENTATION_PROFILE_DIR', 'profiles')
+    INSTRUMENTATION_PROFILE_KEEP = 50
+    # Token para o scraper do Prometheus (Authorization: Bearer ...); sem ele, só o usuário master
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Cabeçalhos de segurança (security_headers.py): política por endpoint, None = nenhum cabeçalho
+    SECURITY_HEADERS_DEFAULT = 'default'
+    SECURITY_HEADERS_ROUTES = {
+        'view_dashboard': 'dashboard_view',
+        'dashboard_embed_token': 'dashboard_view',
+        'static': None,
+    }
+    
     # Session configuration
     # SESSION_COOKIE_SECURE será ajustado dinamicamente baseado no ambiente
     SESSION_COOKIE_HTTPONLY = True
@@ -0,0 +1,336 @@
+"""
+Verificação em segundo plano dos links do Power BI (dashboard_health)
+
+Um link quebrado ou revogado só aparecia quando alguém abria o dashboard e
+via o iframe vazio. A varredura faz um GET em cada power_bi_link dos
+dashboards ativos e grava em dashboard_health o status HTTP, a latência e o
+erro; a listagem do admin lê apenas essa tabela, sem rede ao renderizar.
+
+As requisições rodam em asyncio, só com a biblioteca padrão:
+
+- no máximo DASHBOARD_HEALTH_CONCURRENCY verificações ao mesmo tempo, e
+  DASHBOARD_HEALTH_PER_HOST conexões abertas por host (quase todos os links
+  são de app.powerbi.com), reaproveitadas com keep-alive;
+- cada verificação (conexão + resposta) tem DASHBOARD_HEALTH_TIMEOUT segundos;
+- resultados valem DASHBOARD_HEALTH_TTL segundos: dashboards verificados há
+  menos tempo ficam de fora, e links repetidos são verificados uma única vez
+  (o resultado vale para todos os dashboards com o mesmo link).
+
+2xx e 3xx contam como saudáveis. A verificação é de disponibilidade: um link
+público revogado que ainda responde 200 com a página de erro do Power BI não
+é detectado.
+
+A varredura roda por este script (cron), pela rota /api/cron/dashboard-health
+(Vercel Cron, com CRON_SECRET) ou, com DASHBOARD_HEALTH_INTERVAL > 0, numa
+thread do próprio processo.
+
+Uso:
+    python dashboard_health.py            # verifica os links vencidos
+    python dashboard_health.py --all      # ignora o TTL e verifica todos
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import ssl
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import delete, insert, select
+from app import db
+from models import Dashboard, DashboardHealth
+
+logger = logging.getLogger(__name__)
+
+CheckResult = namedtuple('CheckResult', ['ok', 'status_code', 'latency_ms', 'error'])
+
+USER_AGENT = 'HiDash-HealthCheck/1.0'
+MAX_BODY = 256 * 1024  # respostas maiores não são lidas até o fim; a conexão é fechada
+MAX_HEADERS = 100
+WRITE_BATCH = 500
+
+class HealthCheckError(Exception):
+    """The response could not be read as HTTP/1.1"""
+
+class HostPool:
+    """Keep-alive connections to one origin, at most `limit` in use at a time"""
+
+    def __init__(self, scheme, host, port, limit, ssl_context=None):
+        self.host = host
+        self.port = port
+        self.ssl = ssl_context if scheme == 'https' else None
+        self._slots = asyncio.Semaphore(limit)
+        self._idle = []
+
+    async def acquire(self):
+        """Wait for a free slot; returns an idle (reader, writer) or None"""
+        await self._slots.acquire()
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    async def connect(self):
+        return await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl, server_hostname=self.host if self.ssl else None
+        )
+
+    def release(self, connection, reusable):
+        if connection is not None:
+            reader, writer = connection
+            if reusable and not writer.is_closing():
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+        self._slots.release()
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+async def _read_headers(reader):
+    status_line = await reader.readline()
+    parts = status_line.decode('latin-1').split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith('HTTP/') or not parts[1].isdigit():
+        raise HealthCheckError(f'invalid status line {status_line[:40]!r}')
+    headers = {}
+    for _ in range(MAX_HEADERS):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            return parts[0], int(parts[1]), headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    raise HealthCheckError('too many response headers')
+
+async def _drain(reader, status_code, headers):
+    """Consume the body; returns whether the connection can be reused"""
+    if status_code < 200 or status_code in (204, 304):
+        return True
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        total = 0
+        while True:
+            size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                # Trailers até a linha em branco
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return True
+            total += size
+            if total > MAX_BODY:
+                return False
+            await reader.readexactly(size + 2)
+    length = headers.get('content-length')
+    if length is None or not length.isdigit():
+        # Corpo delimitado pelo fechamento da conexão
+        return False
+    if int(length) > MAX_BODY:
+        return False
+    await reader.readexactly(int(length))
+    return True
+
+class HealthChecker:
+    """Concurrent GET of many URLs with per-host pooled connections"""
+
+    def __init__(self, concurrency=20, per_host=4, timeout=10, ssl_context=None):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+
+    def run(self, urls):
+        """{url: CheckResult} for every distinct URL"""
+        return asyncio.run(self.check_many(urls))
+
+    async def check_many(self, urls):
+        limit = asyncio.Semaphore(self.concurrency)
+        pools = {}
+
+        async def check(url):
+            async with limit:
+                return url, await self.check(url, pools)
+
+        try:
+            return dict(await asyncio.gather(*(check(url) for url in set(urls))))
+        finally:
+            for pool in pools.values():
+                pool.close()
+
+    async def check(self, url, pools):
+        parts = urllib.parse.urlsplit(url or '')
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            return CheckResult(False, None, None, 'invalid URL')
+        try:
+            port = parts.port or (443 if parts.scheme == 'https' else 80)
+        except ValueError:
+            return CheckResult(False, None, None, 'invalid URL')
+        key = (parts.scheme, parts.hostname, port)
+        pool = pools.get(key)
+        if pool is None:
+            pool = pools[key] = HostPool(*key, self.per_host, self.ssl_context)
+
+        host = parts.hostname if port in (80, 443) else f'{parts.hostname}:{port}'
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        request = (
+            f'GET {target} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {USER_AGENT}\r\n'
+            f'Accept: text/html,*/*\r\nConnection: keep-alive\r\n\r\n'
+        ).encode('latin-1', 'replace')
+
+        try:
+            status_code, latency = await self._request(pool, request)
+        except asyncio.TimeoutError:
+            return CheckResult(False, None, None, f'timeout after {self.timeout}s')
+        except (OSError, HealthCheckError, ValueError, asyncio.IncompleteReadError) as e:
+            return CheckResult(False, None, None, (str(e) or type(e).__name__)[:200])
+        error = None if status_code < 400 else f'HTTP {status_code}'
+        return CheckResult(error is None, status_code, int(latency * 1000), error)
+
+    async def _request(self, pool, request):
+        """(status code, seconds); the timeout covers connect and response, not the wait for a slot"""
+        for attempt in range(2):
+            connection = await pool.acquire()
+            reused = connection is not None
+            reusable = False
+            start = time.perf_counter()
+            try:
+                # Conexão aberta aqui, e não dentro do wait_for da troca: num erro ou timeout
+                # o finally a recebe e fecha (antes ela ficava aberta a cada varredura)
+                if connection is None:
+                    connection = await asyncio.wait_for(pool.connect(), self.timeout)
+                remaining = self.timeout - (time.perf_counter() - start)
+                status_code, reusable = await asyncio.wait_for(self._exchange(connection, request), remaining)
+                return status_code, time.perf_counter() - start
+            except asyncio.TimeoutError:
+                raise
+            except (OSError, HealthCheckError, asyncio.IncompleteReadError):
+                # Uma conexão ociosa pode ter sido fechada pelo servidor: tentar de novo numa nova
+                if not reused or attempt:
+                    raise
+            finally:
+                pool.release(connection, reusable)
+
+    async def _exchange(self, connection, request):
+        reader, writer = connection
+        writer.write(request)
+        await writer.drain()
+        version, status_code, headers = await _read_headers(reader)
+        reusable = await _drain(reader, status_code, headers)
+        reusable = reusable and version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        return status_code, reusable
+
+def checker_from_config(config):
+    return HealthChecker(
+        concurrency=config.get('DASHBOARD_HEALTH_CONCURRENCY', 20),
+        per_host=config.get('DASHBOARD_HEALTH_PER_HOST', 4),
+        timeout=config.get('DASHBOARD_HEALTH_TIMEOUT', 10),
+    )
+
+def sweep(force=False, checker=None):
+    """Check the links of active dashboards whose result is missing, stale or for another URL"""
+    config = current_app.config
+    checker = checker or checker_from_config(config)
+    now = datetime.datetime.utcnow()
+    fresh_after = now - datetime.timedelta(seconds=config.get('DASHBOARD_HEALTH_TTL', 900))
+
+    rows = db.session.execute(
+        select(Dashboard.id, Dashboard.power_bi_link, DashboardHealth)
+        .outerjoin(DashboardHealth, DashboardHealth.dashboard_id == Dashboard.id)
+        .where(Dashboard.is_active == True)  # noqa: E712
+    ).all()
+
+    # Resultado recente de um link vale para os outros dashboards com o mesmo link
+    known = {}
+    pending = []
+    for dashboard_id, url, health in rows:
+        if not force and health is not None and health.url == url and health.checked_at >= fresh_after:
+            known.setdefault(url, (health.checked_at, CheckResult(
+                health.ok, health.status_code, health.latency_ms, health.error)))
+        else:
+            pending.append((dashboard_id, url))
+    # Sem conexão aberta com o banco durante a rede
+    db.session.close()
+
+    reused = [(dashboard_id, url) for dashboard_id, url in pending if url in known]
+    to_check = [(dashboard_id, url) for dashboard_id, url in pending if url not in known]
+    start = time.perf_counter()
+    results = checker.run(url for _, url in to_check) if to_check else {}
+    elapsed = time.perf_counter() - start
+
+    values = [_row(dashboard_id, url, results[url], now) for dashboard_id, url in to_check]
+    values += [_row(dashboard_id, url, known[url][1], known[url][0]) for dashboard_id, url in reused]
+    for i in range(0, len(values), WRITE_BATCH):
+        batch = values[i:i + WRITE_BATCH]
+        db.session.execute(delete(DashboardHealth).where(
+            DashboardHealth.dashboard_id.in_([value['dashboard_id'] for value in batch])))
+        db.session.execute(insert(DashboardHealth), batch)
+    db.session.commit()
+
+    failed = sum(1 for result in results.values() if not result.ok)
+    summary = {
+        'dashboards': len(rows),
+        'checked': len(to_check),
+        'urls': len(results),
+        'reused': len(reused),
+        'failed': failed,
+        'seconds': round(elapsed, 3),
+    }
+    logger.info("Dashboard health sweep: %s", summary)
+    return summary
+
+def _row(dashboard_id, url, result, checked_at):
+    return {
+        'dashboard_id': dashboard_id,
+        'url': url,
+        'ok': result.ok,
+        'status_code': result.status_code,
+        'latency_ms': result.latency_ms,
+        'error': result.error,
+        'checked_at': checked_at,
+    }
+
+class BackgroundSweeper:
+    """Periodic sweep in a daemon thread (DASHBOARD_HEALTH_INTERVAL seconds)"""
+
+    def __init__(self):
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def start(self, app):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, args=(app,), name='dashboard-health', daemon=True)
+                    self._worker.start()
+
+    def _run(self, app):
+        interval = app.config['DASHBOARD_HEALTH_INTERVAL']
+        while True:
+            try:
+                with app.app_context():
+                    sweep()
+            except Exception:
+                logger.exception("Dashboard health sweep failed")
+            time.sleep(interval)
+
+background_sweeper = BackgroundSweeper()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--all', action='store_true', help='ignore DASHBOARD_HEALTH_TTL and check every active link')
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        summary = sweep(force=args.all)
+    print(f"{summary['checked']} dashboards checked ({summary['urls']} distinct links) in {summary['seconds']}s, "
+          f"{summary['reused']} reused recent results, {summary['failed']} links failing")
+
+if __name__ == '__main__':
+    main()
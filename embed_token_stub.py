@@ -0,0 +1,136 @@
+"""
+Servidor local que imita o Azure AD e o GenerateToken do Power BI
+
+Usado em testes e em desenvolvimento no lugar da API real: responde aos
+mesmos endpoints que embed_tokens.PowerBIProvider chama, gera tokens falsos
+com validade configurável e conta as chamadas recebidas. Pode ser usado
+dentro do processo:
+
+    with StubServer(lifetime=60) as stub:
+        app.config.update(stub.config)
+        ...
+        assert stub.calls['generate'] == 1
+
+ou como processo separado:
+
+    python embed_token_stub.py --port 8765 --lifetime 300
+    POWER_BI_API_URL=http://127.0.0.1:8765 POWER_BI_AUTHORITY_URL=http://127.0.0.1:8765 \\
+        POWER_BI_CLIENT_ID=stub POWER_BI_TENANT_ID=stub POWER_BI_CLIENT_SECRET=stub python main.py
+"""
+import argparse
+import datetime
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GENERATE_PATH = re.compile(r'^/v1\.0/myorg/groups/([^/]+)/reports/([^/]+)/GenerateToken$')
+AUTHORITY_PATH = re.compile(r'^/([^/]+)/oauth2/v2\.0/token$')
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        stub = self.server.stub
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if AUTHORITY_PATH.match(self.path):
+            stub.record('authority')
+            return self._json(200, {'token_type': 'Bearer', 'expires_in': 3599, 'access_token': f'aad-{uuid.uuid4()}'})
+
+        match = GENERATE_PATH.match(self.path)
+        if match is None:
+            return self._json(404, {'error': {'code': 'NotFound'}})
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._json(401, {'error': {'code': 'Unauthorized'}})
+        stub.record('generate', match.group(2))
+        expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=stub.lifetime)
+        return self._json(200, {
+            '@odata.context': 'stub',
+            'token': f'embed-{match.group(2)}-{uuid.uuid4()}',
+            'tokenId': str(uuid.uuid4()),
+            'expiration': expiration.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        })
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.stub.verbose:
+            super().log_message(format, *args)
+
+class StubServer:
+    """Token endpoints on 127.0.0.1, served from a background thread"""
+
+    def __init__(self, port=0, lifetime=3600, latency=0, verbose=False):
+        self.lifetime = lifetime
+        self.latency = latency
+        self.verbose = verbose
+        self.calls = Counter()
+        self.reports = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def config(self):
+        """Settings that point embed_tokens at this server"""
+        return {
+            'POWER_BI_TENANT_ID': 'stub-tenant',
+            'POWER_BI_CLIENT_ID': 'stub-client',
+            'POWER_BI_CLIENT_SECRET': 'stub-secret',
+            'POWER_BI_API_URL': self.url,
+            'POWER_BI_AUTHORITY_URL': self.url,
+        }
+
+    def record(self, endpoint, report_id=None):
+        with self._lock:
+            self.calls[endpoint] += 1
+            if report_id:
+                self.reports[report_id] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='embed-token-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--lifetime', type=int, default=3600, help='seconds each embed token stays valid')
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every response')
+    args = parser.parse_args()
+
+    stub = StubServer(args.port, args.lifetime, args.latency, verbose=True)
+    print(f"Power BI token stub listening on {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
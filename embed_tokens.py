@@ -0,0 +1,282 @@
+"""
+Tokens de embed do Power BI (secure embed)
+
+Dashboards cujo link é um reportEmbed (reportId + groupId) são exibidos com um
+token de embed gerado pela API do Power BI, em vez do link público. Gerar um
+token é uma chamada remota, então o serviço:
+
+- guarda um token por (workspace, relatório) até perto de expirar;
+- renova em segundo plano os tokens que vencem em menos de
+  EMBED_TOKEN_REFRESH_MARGIN segundos, desde que tenham sido usados nos
+  últimos EMBED_TOKEN_IDLE_TTL segundos (os demais são descartados);
+- junta requests simultâneos para o mesmo relatório em uma única chamada;
+- quando o cache enche, descarta primeiro os tokens que vencem antes.
+
+O provedor fica atrás de TokenProvider: PowerBIProvider fala com o Azure AD e
+a API REST do Power BI; embed_token_stub.py sobe um servidor local com os
+mesmos endpoints para testes (POWER_BI_API_URL / POWER_BI_AUTHORITY_URL).
+"""
+import datetime
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# expires_at em segundos desde a época (time.time())
+EmbedToken = namedtuple('EmbedToken', ['token', 'token_id', 'embed_url', 'expires_at'])
+
+POWER_BI_SCOPE = 'https://analysis.windows.net/powerbi/api/.default'
+
+class EmbedTokenError(Exception):
+    """The token provider could not generate an embed token"""
+
+def embed_target(power_bi_link):
+    """(workspace_id, report_id) of a secure-embed link, or None for public links"""
+    parts = urllib.parse.urlsplit(power_bi_link or '')
+    query = urllib.parse.parse_qs(parts.query)
+    report_id = query.get('reportId', [None])[0]
+    workspace_id = query.get('groupId', [None])[0]
+    if not report_id or not workspace_id or not parts.path.rstrip('/').endswith('reportEmbed'):
+        return None
+    return workspace_id, report_id
+
+class TokenProvider(ABC):
+    """Interface of the upstream that issues embed tokens"""
+
+    @abstractmethod
+    def generate(self, workspace_id, report_id):
+        """Return a new EmbedToken for the report, or raise EmbedTokenError"""
+
+class PowerBIProvider(TokenProvider):
+    """Azure AD client credentials + Power BI REST GenerateToken"""
+
+    def __init__(self, tenant_id, client_id, client_secret,
+                 api_url='https://api.powerbi.com', authority_url='https://login.microsoftonline.com',
+                 timeout=10):
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = api_url.rstrip('/')
+        self.authority_url = authority_url.rstrip('/')
+        self.timeout = timeout
+        self._access_token = None
+        self._access_token_expires_at = 0
+        self._lock = threading.Lock()
+
+    def _request(self, url, data, headers):
+        request = urllib.request.Request(url, data=data, headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise EmbedTokenError(f'{url}: {e}') from e
+
+    def access_token(self):
+        """Azure AD token of the service principal, reused until close to expiry"""
+        with self._lock:
+            if self._access_token and self._access_token_expires_at - time.time() > 60:
+                return self._access_token
+            payload = self._request(
+                f'{self.authority_url}/{self.tenant_id}/oauth2/v2.0/token',
+                urllib.parse.urlencode({
+                    'grant_type': 'client_credentials',
+                    'client_id': self.client_id,
+                    'client_secret': self.client_secret,
+                    'scope': POWER_BI_SCOPE,
+                }).encode(),
+                {'Content-Type': 'application/x-www-form-urlencoded'}
+            )
+            try:
+                self._access_token = payload['access_token']
+                self._access_token_expires_at = time.time() + int(payload.get('expires_in', 3600))
+            except (KeyError, TypeError, ValueError) as e:
+                raise EmbedTokenError(f'Unexpected Azure AD token response: {e!r}') from e
+            return self._access_token
+
+    def generate(self, workspace_id, report_id):
+        quote = urllib.parse.quote
+        payload = self._request(
+            f'{self.api_url}/v1.0/myorg/groups/{quote(workspace_id)}/reports/{quote(report_id)}/GenerateToken',
+            json.dumps({'accessLevel': 'View'}).encode(),
+            {'Content-Type': 'application/json', 'Authorization': f'Bearer {self.access_token()}'}
+        )
+        try:
+            token = payload['token']
+            expiration = datetime.datetime.fromisoformat(payload['expiration'])
+            token_id = payload.get('tokenId')
+        except (KeyError, TypeError, ValueError) as e:
+            raise EmbedTokenError(f'Unexpected GenerateToken response: {e!r}') from e
+        if expiration.tzinfo is None:
+            expiration = expiration.replace(tzinfo=datetime.timezone.utc)
+        embed_url = (f'https://app.powerbi.com/reportEmbed?reportId={quote(report_id)}'
+                     f'&groupId={quote(workspace_id)}')
+        return EmbedToken(token, token_id, embed_url, expiration.timestamp())
+
+class _Entry:
+    __slots__ = ('token', 'last_used')
+
+    def __init__(self, token, last_used):
+        self.token = token
+        self.last_used = last_used
+
+class EmbedTokenService:
+    """Cached, coalesced and refreshed-ahead embed tokens per report"""
+
+    def __init__(self, provider=None):
+        self._provider = provider
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._worker = None
+        self._settings = None
+
+    def _config(self):
+        # Configuração lida no primeiro uso; a thread de renovação não tem contexto de aplicação
+        if self._settings is None:
+            config = current_app.config
+            self._settings = {
+                'min_validity': config.get('EMBED_TOKEN_MIN_VALIDITY', 120),
+                'refresh_margin': config.get('EMBED_TOKEN_REFRESH_MARGIN', 600),
+                'refresh_interval': config.get('EMBED_TOKEN_REFRESH_INTERVAL', 30),
+                'idle_ttl': config.get('EMBED_TOKEN_IDLE_TTL', 3600),
+                'max_size': config.get('EMBED_TOKEN_CACHE_SIZE', 1000),
+                'timeout': config.get('EMBED_TOKEN_TIMEOUT', 10),
+            }
+            if self._provider is None:
+                self._provider = self._create_provider(config)
+        return self._settings
+
+    def _create_provider(self, config):
+        if not config.get('POWER_BI_CLIENT_ID'):
+            return None
+        return PowerBIProvider(
+            config.get('POWER_BI_TENANT_ID'),
+            config.get('POWER_BI_CLIENT_ID'),
+            config.get('POWER_BI_CLIENT_SECRET'),
+            api_url=config.get('POWER_BI_API_URL', 'https://api.powerbi.com'),
+            authority_url=config.get('POWER_BI_AUTHORITY_URL', 'https://login.microsoftonline.com'),
+            timeout=config.get('EMBED_TOKEN_TIMEOUT', 10),
+        )
+
+    @property
+    def enabled(self):
+        """Whether a token provider is configured"""
+        self._config()
+        return self._provider is not None
+
+    def get(self, workspace_id, report_id):
+        """Return a token valid for at least EMBED_TOKEN_MIN_VALIDITY seconds"""
+        settings = self._config()
+        if self._provider is None:
+            raise EmbedTokenError('No Power BI token provider is configured')
+        key = (workspace_id, report_id)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and entry.token.expires_at - now > settings['min_validity']:
+            entry.last_used = now
+            return entry.token
+
+        self._start_worker()
+        return self._fetch(key, now)
+
+    def _fetch(self, key, last_used=None):
+        """Generate a token for key; concurrent callers share one upstream call"""
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = Future()
+        if not leader:
+            try:
+                return call.result(timeout=self._settings['timeout'] * 2)
+            except FutureTimeoutError as e:
+                raise EmbedTokenError(f'Timed out waiting for the token of report {key[1]}') from e
+
+        try:
+            token = self._provider.generate(*key)
+        except Exception as e:
+            # Quem chama (rota e renovação) trata apenas EmbedTokenError
+            if not isinstance(e, EmbedTokenError):
+                error = EmbedTokenError(f'Token provider failed: {e!r}')
+                error.__cause__ = e
+                e = error
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.set_exception(e)
+            raise e
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(token, last_used or 0)
+                self._evict(keep=key)
+            else:
+                entry.token = token
+                if last_used:
+                    entry.last_used = last_used
+            self._inflight.pop(key, None)
+        call.set_result(token)
+        return token
+
+    def _evict(self, keep=None):
+        """Keep the cache within EMBED_TOKEN_CACHE_SIZE, dropping the soonest to expire (except keep)"""
+        overflow = len(self._entries) - self._settings['max_size']
+        if overflow > 0:
+            candidates = [item for item in self._entries.items() if item[0] != keep]
+            by_expiry = sorted(candidates, key=lambda item: item[1].token.expires_at)
+            for key, _ in by_expiry[:overflow]:
+                del self._entries[key]
+
+    def _start_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='embed-token-refresh', daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self._settings['refresh_interval'])
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Embed token refresh failed")
+
+    def refresh(self):
+        """Renew tokens close to expiry that are still in use; drop idle and expired ones"""
+        settings = self._settings
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.items())
+        for key, entry in entries:
+            remaining = entry.token.expires_at - now
+            if remaining > settings['refresh_margin']:
+                continue
+            if now - entry.last_used > settings['idle_ttl']:
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                continue
+            try:
+                self._fetch(key)
+            except Exception:
+                logger.warning("Could not refresh the embed token of report %s", key[1], exc_info=True)
+                if remaining <= 0:
+                    with self._lock:
+                        if self._entries.get(key) is entry:
+                            del self._entries[key]
+
+    def clear(self):
+        """Drop every cached token"""
+        with self._lock:
+            self._entries.clear()
+
+embed_tokens = EmbedTokenService()
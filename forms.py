@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, PasswordField, BooleanField, TextAreaField, SelectField, SelectMultipleField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError, Regexp, Optional
 from models import User, UserRole
@@ -43,6 +44,28 @@ class UserForm(FlaskForm):
         if user:
             raise ValidationError('Email already registered.')
 
+class ImportedUserForm(UserForm):
+    """UserForm rules applied to one row of a bulk import (user_import.py)"""
+    
+    class Meta:
+        csrf = False
+    
+    def __init__(self, *args, taken_emails=None, **kwargs):
+        super(ImportedUserForm, self).__init__(*args, **kwargs)
+        # E-mails já cadastrados ou usados em linhas anteriores, carregados em lote
+        self.taken_emails = taken_emails if taken_emails is not None else set()
+    
+    def validate_email(self, email):
+        if email.data in self.taken_emails:
+            raise ValidationError('Email already registered.')
+
+class UserImportForm(FlaskForm):
+    file = FileField('File', validators=[
+        FileRequired(),
+        FileAllowed(['csv', 'json'], 'Upload a CSV or JSON file.')
+    ])
+    dry_run = BooleanField('Only validate (do not create users)')
+
 class EditUserForm(FlaskForm):
     name = StringField('Name', validators=[DataRequired(), Length(min=3, max=100)])
     email = StringField('Email', validators=[DataRequired(), Email()])
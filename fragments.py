@@ -0,0 +1,162 @@
+"""
+Cache de fragmentos renderizados (menu lateral e grade de dashboards)
+
+Os fragmentos são indexados pelo conjunto de departamentos do usuário e por um
+número de versão que muda quando uma transação que gravou linhas de Company,
+Department ou Dashboard é confirmada (after_commit; um rollback não muda nada).
+Em cache quente a página não renderiza o bloco nem executa as consultas por
+trás dele.
+
+A chave de cada fragmento também contém o que entra na ETag da página
+(conditional.py): a grade, o estado COUNT/MAX(updated_at) dos dashboards; o
+menu lateral, os departamentos do principal em cache. Um worker com a versão
+defasada renderiza de novo em vez de servir um corpo antigo sob uma ETag nova.
+
+A versão é do processo e os outros workers não a veem mudar. Neles a grade
+muda já no request seguinte (pelo estado na chave), o menu lateral quando o
+principal é recarregado (USER_CACHE_REVALIDATE) e qualquer outro fragmento
+fica defasado por no máximo FRAGMENT_CACHE_TTL segundos.
+
+A página de visualização do Power BI não depende do usuário: é renderizada uma
+vez por (dashboard.id, updated_at) e servida do cache com uma única busca em
+dict; editar o dashboard muda updated_at e substitui a entrada. O token de
+embed (links reportEmbed) não entra na página: o navegador o busca à parte.
+"""
+import threading
+from flask import current_app, render_template, url_for
+from flask_login import current_user
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import registry
+from models import Company, Department, Dashboard
+from embed_tokens import embed_target, embed_tokens
+from user_cache import MemoryBackend
+from utils import get_power_bi_iframe
+
+VERSIONED_MODELS = (Company, Department, Dashboard)
+
+class FragmentCache:
+    """Versioned in-process cache of rendered template fragments"""
+
+    def __init__(self):
+        self.version = 0
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = MemoryBackend(current_app.config.get('FRAGMENT_CACHE_SIZE', 5000))
+        return self._backend
+
+    def bump(self):
+        """Invalidate every fragment rendered so far"""
+        with self._lock:
+            self.version += 1
+
+    def get_or_render(self, key, render):
+        """Return the cached markup for key, calling render() on a miss"""
+        ttl = current_app.config.get('FRAGMENT_CACHE_TTL', 60)
+        if not ttl:
+            return Markup(render())
+
+        versioned_key = (self.version,) + tuple(key)
+        html = self.backend.get(versioned_key)
+        if html is None:
+            html = render()
+            self.backend.set(versioned_key, html, ttl)
+        return Markup(html)
+
+fragment_cache = FragmentCache()
+
+# Mudar a versão no flush deixaria um request concorrente guardar dados ainda não
+# confirmados sob a versão nova; os flushes só marcam a sessão, o commit muda a versão
+
+@event.listens_for(Session, 'after_flush')
+def collect_fragment_changes(session, flush_context):
+    """Note writes to companies, departments or dashboards until the transaction ends"""
+    if session.info.get('fragments_changed'):
+        return
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, VERSIONED_MODELS):
+            session.info['fragments_changed'] = True
+            return
+
+@event.listens_for(Session, 'after_commit')
+def bump_fragment_version(session):
+    """A committed write to companies, departments or dashboards changes the fragment version"""
+    if session.info.pop('fragments_changed', False):
+        fragment_cache.bump()
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_fragment_changes(session, previous_transaction):
+    # Só o rollback da transação externa descarta tudo; o de um savepoint mantém a marca
+    if previous_transaction.parent is None:
+        session.info.pop('fragments_changed', None)
+
+@registry.template_global()
+def sidebar_departments(selected_department_id=None):
+    """Rendered department links of the sidebar for common users"""
+    departments = current_user.departments
+    key = (
+        'sidebar',
+        # (id, nome, ativo): os mesmos valores que user_parts() põe na ETag
+        tuple(departments),
+        selected_department_id,
+    )
+    return fragment_cache.get_or_render(key, lambda: render_template(
+        '_sidebar_departments.html',
+        departments=departments,
+        selected_department_id=selected_department_id
+    ))
+
+def dashboard_grid(scope, department_id, load_dashboards, state=()):
+    """Rendered dashboard card grid, shared by every user with the same scope.
+
+    state is the (count, last_modified) of the dashboards that also goes into the ETag.
+    """
+    key = ('grid', current_user.role, scope, department_id, *state)
+    return fragment_cache.get_or_render(key, lambda: render_template(
+        'dashboard/_cards.html',
+        dashboards=load_dashboards()
+    ))
+
+class DashboardPageCache:
+    """Rendered dashboard/view.html pages keyed by dashboard id and updated_at"""
+
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def get_or_render(self, dashboard):
+        entry = self._pages.get(dashboard.id)
+        if entry is not None and entry[0] == dashboard.updated_at:
+            return entry[1]
+
+        # Links reportEmbed: a página busca o token de embed em /api/dashboards/<id>/embed-token
+        token_url = None
+        if embed_target(dashboard.power_bi_link) and embed_tokens.enabled:
+            token_url = url_for('dashboard_embed_token', dashboard_id=dashboard.id)
+        html = render_template(
+            'dashboard/view.html',
+            dashboard=dashboard,
+            iframe_html=get_power_bi_iframe(dashboard.power_bi_link, token_url)
+        )
+        max_size = current_app.config.get('DASHBOARD_PAGE_CACHE_SIZE', 2000)
+        if max_size:
+            with self._lock:
+                self._pages.pop(dashboard.id, None)
+                while len(self._pages) >= max_size:
+                    # Dicts preservam a ordem de inserção: descartar a entrada mais antiga
+                    del self._pages[next(iter(self._pages))]
+                self._pages[dashboard.id] = (dashboard.updated_at, html)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+dashboard_pages = DashboardPageCache()
@@ -1,15 +1,24 @@
 import os
 import random
 import string
-from app import app, db
+import migrate
+from app import create_app, db
 from models import User, Company, Department, Dashboard, UserRole
-from werkzeug.security import generate_password_hash
+from passwords import hash_password
 
 def random_password(length=12):
     """Generate a random strong password"""
     chars = string.ascii_letters + string.digits + "!@#$%^&*"
     return ''.join(random.choice(chars) for _ in range(length))
 
+app = create_app()
+
+def create_schema():
+    """Apply pending schema migrations (passo explícito; a aplicação não cria tabelas ao iniciar)"""
+    with app.app_context():
+        migrate.upgrade(db.engine)
+        print("Database schema is up to date")
+
 def create_initial_data():
     """Create initial data for the application"""
     with app.app_context():
@@ -24,7 +33,7 @@ def create_initial_data():
             name='System Administrator',
             email='admin@hidash.com',
             role=UserRole.MASTER,
-            password_hash=generate_password_hash(master_password)
+            password_hash=hash_password(master_password)
         )
         
         db.session.add(master)
@@ -35,4 +44,5 @@ def create_initial_data():
         print(f"Password: {master_password}")
 
 if __name__ == "__main__":
+    create_schema()
     create_initial_data()
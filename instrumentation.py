@@ -0,0 +1,230 @@
+"""
+Instrumentação opcional dos requests (INSTRUMENTATION_ENABLED=1)
+
+Quando ligada, create_app chama init_app e cada request registra:
+
+- latência por endpoint, método e status (histograma);
+- quantidade e tempo das consultas SQL, contadas pelos eventos
+  before/after_cursor_execute do SQLAlchemy;
+- tempo de renderização de cada template (sinais before_render_template /
+  template_rendered, também emitidos por utils.stream_template).
+
+Os histogramas ficam em memória no processo e são expostos em /metrics no
+formato texto do Prometheus, para o usuário master ou para quem enviar
+"Authorization: Bearer <METRICS_TOKEN>" (scraper). Cada worker expõe os
+próprios números.
+
+Requests acima de INSTRUMENTATION_SLOW_MS geram um aviso no log. Com
+INSTRUMENTATION_PROFILE_RATE > 0, essa fração dos requests roda sob cProfile;
+os perfis dos requests lentos são gravados em INSTRUMENTATION_PROFILE_DIR (arquivos .prof do pstats, ex.:
+python -m pstats arquivo.prof ou snakeviz), mantendo os
+INSTRUMENTATION_PROFILE_KEEP mais recentes.
+
+Desligada, nada é registrado: nenhum hook, listener ou rota extra.
+"""
+import bisect
+import contextvars
+import cProfile
+import datetime
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+from flask import Response, abort, before_render_template, current_app, request, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class Histogram:
+    """Prometheus-style histogram with a fixed set of labels"""
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Contagem por faixa (+Inf no fim), soma e total
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        """Lines of the Prometheus text exposition format"""
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, counts, total, count in sorted(snapshot):
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                bucket_labels = ','.join(pairs + [f'le="{le}"'])
+                lines.append(f'{self.name}_bucket{{{bucket_labels}}} {cumulative}')
+            label_text = '{' + ','.join(pairs) + '}' if pairs else ''
+            lines.append(f'{self.name}_sum{label_text} {total!r}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+request_duration = Histogram(
+    'hidash_request_duration_seconds', 'Time to handle a request, including streamed bodies.',
+    ('endpoint', 'method', 'status'), LATENCY_BUCKETS)
+request_queries = Histogram(
+    'hidash_request_sql_queries', 'SQL statements executed per request.',
+    ('endpoint',), QUERY_COUNT_BUCKETS)
+request_sql_duration = Histogram(
+    'hidash_request_sql_duration_seconds', 'Time spent in SQL statements per request.',
+    ('endpoint',), LATENCY_BUCKETS)
+template_duration = Histogram(
+    'hidash_template_render_duration_seconds', 'Time to render a template.',
+    ('template',), LATENCY_BUCKETS)
+METRICS = (request_duration, request_queries, request_sql_duration, template_duration)
+
+class RequestStats:
+    __slots__ = ('start', 'queries', 'sql_time', 'templates', 'profiler')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.templates = []
+        self.profiler = None
+
+# Estatísticas do request em andamento na thread (None fora de um request)
+_current = contextvars.ContextVar('hidash_request_stats', default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('hidash_query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        starts = conn.info.get('hidash_query_start')
+        if starts:
+            stats.sql_time += time.perf_counter() - starts.pop()
+        stats.queries += 1
+
+def _before_render(sender, template, context, **extra):
+    stats = _current.get()
+    if stats is not None:
+        stats.templates.append(time.perf_counter())
+
+def _rendered(sender, template, context, **extra):
+    stats = _current.get()
+    if stats is not None and stats.templates:
+        template_duration.observe(time.perf_counter() - stats.templates.pop(), template.name or 'string')
+
+def _start_request():
+    stats = RequestStats()
+    config = current_app.config
+    rate = config.get('INSTRUMENTATION_PROFILE_RATE', 0)
+    if rate and random.random() < rate:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            stats.profiler = profiler
+        except ValueError:
+            # Outro profiler já ativo nesta thread
+            pass
+    _current.set(stats)
+
+def _attach(response):
+    stats = _current.get()
+    if stats is not None:
+        # Registrado quando o servidor fecha a resposta: inclui o corpo streamed
+        # (stream_with_context roda o gerador e o teardown depois da view)
+        labels = (request.endpoint or 'unmatched', request.method, str(response.status_code))
+        path, config = request.path, current_app.config
+        response.call_on_close(lambda: _finish(stats, labels, path, config))
+    return response
+
+def _finish(stats, labels, path, config):
+    elapsed = time.perf_counter() - stats.start
+    if _current.get() is stats:
+        _current.set(None)
+    if stats.profiler is not None:
+        stats.profiler.disable()
+
+    endpoint, method, _ = labels
+    request_duration.observe(elapsed, *labels)
+    request_queries.observe(stats.queries, endpoint)
+    request_sql_duration.observe(stats.sql_time, endpoint)
+
+    if elapsed * 1000 >= config.get('INSTRUMENTATION_SLOW_MS', 500):
+        logger.warning("Slow request %s %s: %.0f ms, %d queries (%.0f ms in SQL)",
+                       method, path, elapsed * 1000, stats.queries, stats.sql_time * 1000)
+        if stats.profiler is not None:
+            _dump_profile(stats.profiler, endpoint, elapsed, config)
+
+def _dump_profile(profiler, endpoint, elapsed, config):
+    directory = config.get('INSTRUMENTATION_PROFILE_DIR') or 'profiles'
+    keep = config.get('INSTRUMENTATION_PROFILE_KEEP', 50)
+    timestamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    name = f"{timestamp}-{re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint)}-{elapsed * 1000:.0f}ms.prof"
+    try:
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(directory, name))
+        # Manter apenas os perfis mais recentes (o nome começa pela data)
+        profiles = sorted(f for f in os.listdir(directory) if f.endswith('.prof'))
+        for old in profiles[:-keep] if keep else []:
+            os.remove(os.path.join(directory, old))
+    except OSError:
+        logger.exception("Could not write the request profile")
+
+def metrics():
+    """Prometheus text exposition of this process's metrics"""
+    token = current_app.config.get('METRICS_TOKEN')
+    authorization = request.headers.get('Authorization', '')
+    if not (token and hmac.compare_digest(authorization, f'Bearer {token}')):
+        if not current_user.is_authenticated or not current_user.is_master():
+            abort(404)
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.collect())
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+_listening = False
+_listening_lock = threading.Lock()
+
+def init_app(app):
+    """Register the hooks, SQL listeners, template signals and /metrics on app"""
+    global _listening
+    with _listening_lock:
+        if not _listening:
+            # Listeners globais: só contam dentro de um request instrumentado
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            _listening = True
+
+    # Primeiro before_request e último after_request: o tempo inclui os demais hooks
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_request)
+    app.after_request_funcs.setdefault(None, []).insert(0, _attach)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    from app import limiter
+    app.add_url_rule('/metrics', 'metrics', limiter.exempt(metrics))
@@ -0,0 +1,345 @@
+"""
+Listagens administrativas paginadas no servidor
+
+Paginação por keyset (ordenação + id como desempate), ordenação e filtros por
+coluna executados no banco. Usado tanto pelas páginas de administração (primeira
+página renderizada no servidor) quanto pela API JSON consumida por table-filter.js.
+
+Listing.stream() devolve todas as linhas do filtro em lotes de um cursor no
+servidor (yield_per), para as páginas renderizadas em streaming (?all=1).
+"""
+import base64
+import json
+from itertools import islice
+from flask import current_app
+from flask_login import current_user
+from sqlalchemy import and_, false, or_, select
+from sqlalchemy.orm import joinedload
+from app import db
+from models import User, Company, Department, Dashboard, UserRole
+from queries import (
+    company_department_ids, dashboard_query, user_query,
+    department_listing, company_listing
+)
+
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(sort_value, row_id):
+    """Encode the last (sort value, id) pair of a page as an opaque cursor"""
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, value_type=None):
+    """Decode a cursor produced by encode_cursor, returning None if invalid.
+
+    value_type (int or str) is the Python type of the sort column; a cursor whose
+    sort value is not a scalar of that type is invalid too.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        return None
+    # O cursor vem da URL: listas, objetos, null ou o tipo errado quebrariam a comparação no banco
+    if not _cursor_scalar(row_id, int):
+        return None
+    if value_type is not None and not _cursor_scalar(sort_value, value_type):
+        return None
+    return sort_value, row_id
+
+def _cursor_scalar(value, value_type):
+    # type() e não isinstance(): bool é subclasse de int
+    if type(value) is not value_type:
+        return False
+    return value_type is not int or -2 ** 63 <= value < 2 ** 63
+
+def text_filter(column):
+    """Case-insensitive substring filter on a text column"""
+    return lambda value: column.icontains(value, autoescape=True)
+
+def label_filter(column, labels):
+    """Filter a column by the labels shown in the table (e.g. Active/Inactive)"""
+    def apply(value):
+        matches = [key for key, label in labels.items() if value.lower() in label.lower()]
+        if not matches:
+            return false()
+        if len(matches) == len(labels):
+            return None
+        return column.in_(matches)
+    return apply
+
+def related_name_filter(column, subquery_factory):
+    """Filter by the name of a related row through an id subquery"""
+    return lambda value: column.in_(subquery_factory(value))
+
+class RowStream:
+    """Lazy iterator of rows that can still answer `{% if rows %}` in templates"""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._first = None
+
+    def __bool__(self):
+        # Buscar apenas a primeira linha para saber se a listagem está vazia
+        if self._first is None:
+            self._first = list(islice(self._rows, 1))
+        return bool(self._first)
+
+    def __iter__(self):
+        bool(self)
+        first, self._first = self._first, []
+        yield from first
+        yield from self._rows
+
+class Listing:
+    """Server-side description of an admin table: base query, sorts and filters"""
+
+    def __init__(self, query, id_column, sorts, filters, search, serialize,
+                 rows_template, context_name, default_sort='name'):
+        self.query = query
+        self.id_column = id_column
+        self.sorts = sorts
+        self.filters = filters
+        self.search = search
+        self.serialize = serialize
+        self.rows_template = rows_template
+        self.context_name = context_name
+        self.default_sort = default_sort
+
+    def _query(self, args):
+        """Filtered and ordered query for the request arguments, plus the sort column"""
+        query = self.query()
+
+        # Filtros por coluna (mesmos nomes dos campos de filtro da tabela)
+        for name, build in self.filters.items():
+            value = (args.get(name) or '').strip()
+            if value:
+                clause = build(value)
+                if clause is not None:
+                    query = query.filter(clause)
+
+        # Busca livre em todas as colunas de texto
+        term = (args.get('q') or '').strip()
+        if term:
+            query = query.filter(or_(*[column.icontains(term, autoescape=True) for column in self.search]))
+
+        sort = args.get('sort') or self.default_sort
+        descending = sort.startswith('-')
+        sort_column = self.sorts.get(sort.lstrip('-'), self.sorts[self.default_sort])
+
+        cursor = decode_cursor(args.get('after') or '', sort_column.type.python_type)
+        if cursor:
+            sort_value, last_id = cursor
+            if descending:
+                query = query.filter(or_(
+                    sort_column < sort_value,
+                    and_(sort_column == sort_value, self.id_column < last_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    sort_column > sort_value,
+                    and_(sort_column == sort_value, self.id_column > last_id)
+                ))
+
+        if descending:
+            query = query.order_by(sort_column.desc(), self.id_column.desc())
+        else:
+            query = query.order_by(sort_column.asc(), self.id_column.asc())
+        return query, sort_column
+
+    def page(self, args):
+        """Return (rows, next_cursor) for the request arguments"""
+        query, sort_column = self._query(args)
+
+        default_limit = current_app.config.get('ADMIN_PAGE_SIZE', 50)
+        limit = args.get('limit', default_limit, type=int)
+        limit = max(1, min(limit or default_limit, MAX_PAGE_SIZE))
+
+        # Uma linha a mais indica se existe próxima página
+        rows = (
+            query.add_columns(sort_column.label('_sort_value'), self.id_column.label('_sort_id'))
+            .limit(limit + 1)
+            .all()
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+
+        items = [row[0] if len(row) == 3 else tuple(row[:-2]) for row in rows]
+        return items, next_cursor
+
+    def stream(self, args):
+        """Every matching row, fetched in batches from a server-side cursor"""
+        query, _ = self._query(args)
+        batch = current_app.config.get('ADMIN_STREAM_YIELD_PER', 500)
+        single_entity = len(query.column_descriptions) == 1
+        statement = query.statement
+
+        def rows():
+            # Executado só ao iterar, já dentro do contexto da resposta streamed (a sessão da
+            # view é fechada no teardown); como select 2.0, pois o Query legado aplica unique(),
+            # incompatível com yield_per
+            result = db.session.execute(statement, execution_options={'yield_per': batch})
+            if single_entity:
+                yield from result.scalars()
+            else:
+                yield from (tuple(row) for row in result)
+
+        return RowStream(rows())
+
+def serialize_user(user):
+    return {
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'role': user.role,
+        'company': user.company.name if user.company else None,
+        'departments': [{'id': d.id, 'name': d.name} for d in user.departments],
+        'is_locked': bool(user.is_locked),
+    }
+
+def serialize_company(row):
+    company, department_count, user_count = row
+    return {
+        'id': company.id,
+        'name': company.name,
+        'departments': department_count,
+        'users': user_count,
+        'is_active': bool(company.is_active),
+    }
+
+def serialize_department(row):
+    department, dashboard_count, user_count = row
+    return {
+        'id': department.id,
+        'name': department.name,
+        'company': department.company.name,
+        'dashboards': dashboard_count,
+        'users': user_count,
+        'is_active': bool(department.is_active),
+    }
+
+def serialize_dashboard(dashboard):
+    return {
+        'id': dashboard.id,
+        'name': dashboard.name,
+        'description': dashboard.description,
+        'department': dashboard.department.name,
+        'company': dashboard.department.company.name,
+        'is_active': bool(dashboard.is_active),
+        'health': serialize_health(dashboard),
+    }
+
+def serialize_health(dashboard):
+    health = dashboard.health
+    # Resultado de um link anterior à última edição não vale para o link atual
+    if health is None or health.url != dashboard.power_bi_link:
+        return None
+    return {
+        'ok': health.ok,
+        'status_code': health.status_code,
+        'latency_ms': health.latency_ms,
+        'error': health.error,
+        'checked_at': health.checked_at.isoformat() + 'Z',
+    }
+
+ROLE_LABELS = {UserRole.MASTER: 'Master', UserRole.ADMIN: 'Administrator', UserRole.USER: 'User'}
+ACTIVE_LABELS = {True: 'Active', False: 'Inactive'}
+
+def company_ids_named(value):
+    return select(Company.id).where(Company.name.icontains(value, autoescape=True))
+
+def department_ids_named(value):
+    return select(Department.id).where(Department.name.icontains(value, autoescape=True))
+
+def department_ids_of_company_named(value):
+    return select(Department.id).where(Department.company_id.in_(company_ids_named(value)))
+
+def _scoped_users():
+    query = user_query()
+    if not current_user.is_master():
+        query = query.filter(User.company_id == current_user.company_id)
+    return query
+
+def _user_department_filter(value):
+    clause = User.departments.any(Department.name.icontains(value, autoescape=True))
+    # Admins e masters aparecem como "All Departments" na tabela
+    if value.lower() in 'all departments':
+        clause = or_(clause, User.role.in_([UserRole.MASTER, UserRole.ADMIN]))
+    return clause
+
+def _scoped_departments():
+    if current_user.is_master():
+        return department_listing()
+    return department_listing(company_id=current_user.company_id)
+
+def _scoped_dashboards():
+    # Resultado da verificação do link (dashboard_health.py) na mesma consulta
+    query = dashboard_query().options(joinedload(Dashboard.health))
+    if not current_user.is_master():
+        query = query.filter(Dashboard.department_id.in_(company_department_ids(current_user.company_id)))
+    return query
+
+users_listing = Listing(
+    query=_scoped_users,
+    id_column=User.id,
+    sorts={'id': User.id, 'name': User.name, 'email': User.email, 'role': User.role},
+    filters={
+        'name': text_filter(User.name),
+        'email': text_filter(User.email),
+        'role': label_filter(User.role, ROLE_LABELS),
+        'company': related_name_filter(User.company_id, company_ids_named),
+        'department': _user_department_filter,
+        'status': label_filter(User.is_locked, {True: 'Locked', False: 'Active'}),
+    },
+    search=[User.name, User.email],
+    serialize=serialize_user,
+    rows_template='admin/_user_rows.html',
+    context_name='users',
+)
+
+companies_listing = Listing(
+    query=company_listing,
+    id_column=Company.id,
+    sorts={'id': Company.id, 'name': Company.name},
+    filters={
+        'name': text_filter(Company.name),
+        'status': label_filter(Company.is_active, ACTIVE_LABELS),
+    },
+    search=[Company.name],
+    serialize=serialize_company,
+    rows_template='admin/_company_rows.html',
+    context_name='companies',
+)
+
+departments_listing = Listing(
+    query=_scoped_departments,
+    id_column=Department.id,
+    sorts={'id': Department.id, 'name': Department.name},
+    filters={
+        'name': text_filter(Department.name),
+        'company': related_name_filter(Department.company_id, company_ids_named),
+        'status': label_filter(Department.is_active, ACTIVE_LABELS),
+    },
+    search=[Department.name],
+    serialize=serialize_department,
+    rows_template='admin/_department_rows.html',
+    context_name='departments',
+)
+
+dashboards_listing = Listing(
+    query=_scoped_dashboards,
+    id_column=Dashboard.id,
+    sorts={'id': Dashboard.id, 'name': Dashboard.name},
+    filters={
+        'name': text_filter(Dashboard.name),
+        'department': related_name_filter(Dashboard.department_id, department_ids_named),
+        'company': related_name_filter(Dashboard.department_id, department_ids_of_company_named),
+        'status': label_filter(Dashboard.is_active, ACTIVE_LABELS),
+    },
+    search=[Dashboard.name, Dashboard.description],
+    serialize=serialize_dashboard,
+    rows_template='admin/_dashboard_rows.html',
+    context_name='dashboards',
+)
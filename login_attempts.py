@@ -0,0 +1,122 @@
+"""
+Controle de tentativas de login
+
+As tentativas falhas são contadas com um único UPDATE atômico no banco
+(incremento e bloqueio na mesma instrução, com RETURNING), sem ler-modificar-
+gravar em Python. O last_login não é gravado no caminho do login: fica num
+buffer em memória e é gravado em lote por uma thread em segundo plano.
+"""
+import atexit
+import datetime
+import logging
+import threading
+import time
+from flask import current_app
+from sqlalchemy import bindparam, case, func, update
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from models import User
+
+logger = logging.getLogger(__name__)
+
+def register_failed_login(user_id):
+    """Atomically count a failed attempt, locking the account at the configured limit.
+
+    Returns (attempts, locked), or None when the account was already locked.
+    """
+    max_attempts = current_app.config.get('MAX_FAILED_LOGIN_ATTEMPTS', 5)
+    attempts = func.coalesce(User.failed_login_attempts, 0) + 1
+    row = db.session.execute(
+        update(User)
+        .where(User.id == user_id, User.is_locked.isnot(True))
+        .values(
+            failed_login_attempts=attempts,
+            is_locked=case((attempts >= max_attempts, True), else_=False)
+        )
+        .returning(User.failed_login_attempts, User.is_locked)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.session.commit()
+    return tuple(row) if row else None
+
+def reset_failed_logins(user):
+    """Clear the failed attempts after a successful password check.
+
+    Returns False if the account was locked concurrently (the login must be refused).
+    """
+    # Caso comum (contador zerado): nenhuma escrita no caminho do login. Um bloqueio gravado
+    # entre a leitura do usuário e a conferência da senha vale a partir do próximo login
+    if not user.failed_login_attempts and not user.is_locked:
+        return True
+    # Com falhas anteriores, UPDATE condicionado: a cópia carregada no request pode não ver
+    # um bloqueio feito em paralelo. updated_at mantido: zerar o contador não muda o
+    # usuário em cache (user_cache)
+    result = db.session.execute(
+        update(User)
+        .where(User.id == user.id, User.is_locked.isnot(True))
+        .values(failed_login_attempts=0, updated_at=User.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+class LastLoginBuffer:
+    """Collects last_login timestamps and writes them in batched UPDATEs"""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._worker = None
+        self._app = None
+
+    def record(self, user_id, when=None):
+        # A thread de gravação usa a aplicação do request que registrou o login
+        self._app = current_app._get_current_object()
+        with self._lock:
+            self._pending[user_id] = when or datetime.datetime.utcnow()
+            size = len(self._pending)
+        self._start_worker()
+        if size >= self._app.config.get('LAST_LOGIN_FLUSH_SIZE', 500):
+            threading.Thread(target=self.flush, daemon=True).start()
+
+    def _start_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='last-login-flush', daemon=True)
+                    self._worker.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self._app.config.get('LAST_LOGIN_FLUSH_INTERVAL', 5))
+            try:
+                self.flush()
+            except SQLAlchemyError:
+                logger.exception("Failed to flush last_login updates")
+
+    def flush(self):
+        """Write every buffered timestamp in a single executemany UPDATE"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending or self._app is None:
+            return
+        params = [{'uid': user_id, 'ts': when} for user_id, when in pending.items()]
+        with self._app.app_context():
+            try:
+                db.session.connection().execute(
+                    update(User.__table__)
+                    .where(User.__table__.c.id == bindparam('uid'))
+                    .values(last_login=bindparam('ts')),
+                    params
+                )
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+                # Manter os valores para a próxima tentativa (sem sobrescrever logins mais recentes)
+                with self._lock:
+                    for user_id, when in pending.items():
+                        self._pending.setdefault(user_id, when)
+                raise
+
+last_login_buffer = LastLoginBuffer()
@@ -0,0 +1,78 @@
+"""
+Operações em lote na tabela user_department
+
+As mudanças de vínculo que afetam muitos usuários são feitas com instruções
+SQL baseadas em conjuntos (DELETE ... WHERE / INSERT ... SELECT), sem carregar
+usuários nem coleções user.departments no ORM.
+
+Só usuários comuns têm vínculos gravados. O acesso de administradores (todos os
+departamentos da própria empresa) e de masters (tudo) é uma regra avaliada na
+verificação (access.py), não linhas materializadas em user_department.
+"""
+import datetime
+from sqlalchemy import delete, insert, select, update
+from app import db
+from models import User, Department, UserRole, user_department
+
+def stores_memberships(role):
+    """Only common users have explicit department rows"""
+    return role == UserRole.USER
+
+def touch_users(*criteria):
+    """Bump users.updated_at so every worker reloads cached principals (within USER_CACHE_REVALIDATE)"""
+    db.session.execute(
+        update(User).where(*criteria).values(updated_at=datetime.datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+def sync_user_departments(user_id, department_ids, company_id=None):
+    """Make the user's memberships equal to department_ids, touching only the difference.
+
+    Com company_id, departamentos de outras empresas são ignorados. Retorna
+    (adicionados, removidos).
+    """
+    wanted = set(department_ids or [])
+    if wanted and company_id is not None:
+        wanted = set(db.session.execute(
+            select(Department.id).where(Department.id.in_(wanted), Department.company_id == company_id)
+        ).scalars())
+
+    current = set(db.session.execute(
+        select(user_department.c.department_id).where(user_department.c.user_id == user_id)
+    ).scalars())
+
+    added = wanted - current
+    removed = current - wanted
+    if added or removed:
+        touch_users(User.id == user_id)
+    if removed:
+        db.session.execute(
+            delete(user_department).where(
+                user_department.c.user_id == user_id,
+                user_department.c.department_id.in_(removed)
+            )
+        )
+    if added:
+        db.session.execute(insert(user_department), [
+            {'user_id': user_id, 'department_id': department_id} for department_id in sorted(added)
+        ])
+    return added, removed
+
+def reassign_department(department_id, old_company_id):
+    """Drop the memberships of the old company's users when a department changes company.
+
+    Um único DELETE; os administradores da nova empresa passam a acessá-lo pela regra de papel.
+    """
+    old_company_users = select(User.id).where(User.company_id == old_company_id)
+    touch_users(User.id.in_(
+        select(user_department.c.user_id).where(
+            user_department.c.department_id == department_id,
+            user_department.c.user_id.in_(old_company_users)
+        )
+    ))
+    db.session.execute(
+        delete(user_department).where(
+            user_department.c.department_id == department_id,
+            user_department.c.user_id.in_(old_company_users)
+        )
+    )
@@ -0,0 +1,124 @@
+"""
+Migrações de schema versionadas
+
+Cada arquivo em migrations/ (NNNN_descricao.py) define upgrade(conn) e,
+opcionalmente, downgrade(conn). As versões aplicadas ficam na tabela
+schema_migrations; cada migração roda numa transação própria junto com o
+registro da versão. Migrações com TRANSACTIONAL = False (ex.: CREATE INDEX
+CONCURRENTLY no PostgreSQL) rodam em autocommit e precisam ser idempotentes.
+
+Uso:
+    python migrate.py                  # aplica as migrações pendentes
+    python migrate.py status
+    python migrate.py downgrade 0002   # desfaz as migrações posteriores à 0002
+"""
+import argparse
+import datetime
+import importlib
+import os
+import re
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_\w+\.py$')
+
+schema_migrations = Table(
+    'schema_migrations', MetaData(),
+    Column('version', String(32), primary_key=True),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+class Migration:
+    def __init__(self, version, module):
+        self.version = version
+        self.module = module
+        self.description = (module.__doc__ or '').strip().split('\n', 1)[0]
+        self.transactional = getattr(module, 'TRANSACTIONAL', True)
+
+    def __repr__(self):
+        return f'<Migration {self.version}>'
+
+def discover():
+    """All migrations in version order"""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            module = importlib.import_module(f'migrations.{filename[:-3]}')
+            migrations.append(Migration(match.group(1), module))
+    return migrations
+
+def applied_versions(engine):
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def _run(engine, migration, step, record):
+    if migration.transactional:
+        with engine.begin() as conn:
+            step(conn)
+            record(conn)
+    else:
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            step(conn)
+            record(conn)
+
+def upgrade(engine, target=None, log=print):
+    """Apply pending migrations up to target (default: all). Returns the applied versions."""
+    done = applied_versions(engine)
+    applied = []
+    for migration in discover():
+        if target and migration.version > target:
+            break
+        if migration.version in done:
+            continue
+        log(f"Applying {migration.version}: {migration.description}")
+        _run(engine, migration, migration.module.upgrade, lambda conn, v=migration.version: conn.execute(
+            schema_migrations.insert().values(version=v, applied_at=datetime.datetime.utcnow())
+        ))
+        applied.append(migration.version)
+    return applied
+
+def downgrade(engine, target, log=print):
+    """Revert applied migrations newer than target, newest first"""
+    done = applied_versions(engine)
+    reverted = []
+    for migration in reversed(discover()):
+        if migration.version <= target or migration.version not in done:
+            continue
+        if not hasattr(migration.module, 'downgrade'):
+            raise RuntimeError(f"Migration {migration.version} cannot be reverted")
+        log(f"Reverting {migration.version}: {migration.description}")
+        _run(engine, migration, migration.module.downgrade, lambda conn, v=migration.version: conn.execute(
+            schema_migrations.delete().where(schema_migrations.c.version == v)
+        ))
+        reverted.append(migration.version)
+    return reverted
+
+def status(engine):
+    """(version, description, applied) for every known migration"""
+    done = applied_versions(engine)
+    return [(m.version, m.description, m.version in done) for m in discover()]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', nargs='?', default='upgrade', choices=['upgrade', 'downgrade', 'status'])
+    parser.add_argument('target', nargs='?')
+    args = parser.parse_args()
+
+    from app import create_app, db
+    app = create_app()
+    with app.app_context():
+        if args.command == 'status':
+            for version, description, applied in status(db.engine):
+                print(f"[{'x' if applied else ' '}] {version} {description}")
+        elif args.command == 'downgrade':
+            if not args.target:
+                parser.error("downgrade requires a target version")
+            downgrade(db.engine, args.target)
+        else:
+            if not upgrade(db.engine, args.target):
+                print("Database is up to date")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Initial schema (companies, departments, dashboards, users, user_department)
+
+Snapshot das tabelas como existiam antes das migrações versionadas. Bancos
+criados com db.create_all() já possuem essas tabelas e a migração não altera
+nada neles (checkfirst).
+"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+Table('companies', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('description', Text),
+    Column('is_active', Boolean),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+)
+
+Table('users', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('email', String(100), unique=True, nullable=False),
+    Column('password_hash', String(256), nullable=False),
+    Column('role', String(20), nullable=False),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('last_login', DateTime),
+    Column('failed_login_attempts', Integer),
+    Column('is_locked', Boolean),
+    Column('company_id', Integer, ForeignKey('companies.id')),
+)
+
+Table('departments', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('description', Text),
+    Column('is_active', Boolean),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('company_id', Integer, ForeignKey('companies.id'), nullable=False),
+)
+
+Table('dashboards', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('description', String(100)),
+    Column('power_bi_link', String(500), nullable=False),
+    Column('is_active', Boolean),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Column('department_id', Integer, ForeignKey('departments.id'), nullable=False),
+)
+
+Table('user_department', metadata,
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('department_id', Integer, ForeignKey('departments.id'), primary_key=True),
+)
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+
+def downgrade(conn):
+    metadata.drop_all(conn, checkfirst=True)
@@ -0,0 +1,18 @@
+"""
+Truncate dashboard descriptions to 100 characters
+
+Substitui o antigo script migrate_descriptions.py: descrições mais longas
+ficam com 97 caracteres seguidos de "...".
+"""
+from sqlalchemy import column, func, table, update
+
+dashboards = table('dashboards', column('description'))
+
+def upgrade(conn):
+    result = conn.execute(
+        update(dashboards)
+        .where(func.length(dashboards.c.description) > 100)
+        .values(description=func.substr(dashboards.c.description, 1, 97).concat('...'))
+    )
+    if result.rowcount:
+        print(f"  {result.rowcount} dashboard descriptions truncated")
@@ -0,0 +1,46 @@
+"""
+Indexes for the hot lookup and listing columns
+
+Cada índice corresponde a uma forma de consulta das rotas:
+
+- departments (company_id, name): departamentos de uma empresa, ordenados por
+  nome (listagem do admin, formulários, /api/departments)
+- departments/companies/dashboards/users (name, id): ordenação por nome com
+  paginação por cursor nas listagens administrativas
+- dashboards (department_id, is_active): grade de um departamento e a contagem
+  de dashboards por departamento
+- users (company_id, role): administradores da empresa (add_department) e
+  usuários de uma empresa; users (role) para a busca do usuário master
+- user_department (department_id, user_id): lado reverso da associação (a chave
+  primária só atende buscas por user_id)
+
+No PostgreSQL os índices são criados com CONCURRENTLY, sem bloquear gravações
+durante a construção, por isso a migração roda fora de transação.
+"""
+TRANSACTIONAL = False
+
+INDEXES = [
+    ('ix_departments_company_id_name', 'departments', 'company_id, name'),
+    ('ix_departments_name_id', 'departments', 'name, id'),
+    ('ix_companies_name_id', 'companies', 'name, id'),
+    ('ix_dashboards_department_id_is_active', 'dashboards', 'department_id, is_active'),
+    ('ix_dashboards_name_id', 'dashboards', 'name, id'),
+    ('ix_users_company_id_role', 'users', 'company_id, role'),
+    ('ix_users_role', 'users', 'role'),
+    ('ix_users_name_id', 'users', 'name, id'),
+    ('ix_user_department_department_id_user_id', 'user_department', 'department_id, user_id'),
+]
+
+def upgrade(conn):
+    concurrently = ' CONCURRENTLY' if conn.dialect.name == 'postgresql' else ''
+    for name, table_name, columns in INDEXES:
+        conn.exec_driver_sql(f'CREATE INDEX{concurrently} IF NOT EXISTS {name} ON {table_name} ({columns})')
+    if conn.dialect.name == 'postgresql':
+        conn.exec_driver_sql('ANALYZE departments, companies, dashboards, users, user_department')
+    else:
+        conn.exec_driver_sql('ANALYZE')
+
+def downgrade(conn):
+    concurrently = ' CONCURRENTLY' if conn.dialect.name == 'postgresql' else ''
+    for name, _, _ in INDEXES:
+        conn.exec_driver_sql(f'DROP INDEX{concurrently} IF EXISTS {name}')
@@ -0,0 +1,28 @@
+"""
+Remove materialized department memberships of admins and masters
+
+O acesso de administradores aos departamentos da própria empresa passou a ser
+uma regra avaliada em access.py; os vínculos gravados em user_department
+para administradores e masters deixam de ser usados e são removidos. O
+downgrade recria os vínculos de cada administrador com os departamentos da
+sua empresa.
+"""
+from sqlalchemy import column, delete, insert, select, table
+
+users = table('users', column('id'), column('role'), column('company_id'))
+departments = table('departments', column('id'), column('company_id'))
+user_department = table('user_department', column('user_id'), column('department_id'))
+
+def upgrade(conn):
+    privileged = select(users.c.id).where(users.c.role.in_(['admin', 'master']))
+    result = conn.execute(delete(user_department).where(user_department.c.user_id.in_(privileged)))
+    if result.rowcount:
+        print(f"  {result.rowcount} admin/master memberships removed")
+
+def downgrade(conn):
+    conn.execute(insert(user_department).from_select(
+        ['user_id', 'department_id'],
+        select(users.c.id, departments.c.id)
+        .join(departments, departments.c.company_id == users.c.company_id)
+        .where(users.c.role == 'admin')
+    ))
@@ -0,0 +1,28 @@
+"""
+Dashboard link health (dashboard_health)
+
+Último resultado da verificação do power_bi_link de cada dashboard, gravado
+por dashboard_health.py: status HTTP, latência e erro. A URL verificada fica
+junto para que um link editado apareça como pendente até a próxima varredura.
+"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+Table('dashboards', metadata, Column('id', Integer, primary_key=True))
+
+dashboard_health = Table('dashboard_health', metadata,
+    Column('dashboard_id', Integer, ForeignKey('dashboards.id', ondelete='CASCADE'), primary_key=True),
+    Column('url', String(500), nullable=False),
+    Column('ok', Boolean, nullable=False),
+    Column('status_code', Integer),
+    Column('latency_ms', Integer),
+    Column('error', String(200)),
+    Column('checked_at', DateTime, nullable=False),
+)
+
+def upgrade(conn):
+    dashboard_health.create(conn, checkfirst=True)
+
+def downgrade(conn):
+    dashboard_health.drop(conn, checkfirst=True)
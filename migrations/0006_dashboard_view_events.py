@@ -0,0 +1,31 @@
+"""
+Dashboard view events and hourly rollups
+
+dashboard_view_events guarda cada abertura de dashboard (gravada em lote por
+view_events.py); dashboard_view_hourly guarda o total por dashboard e hora,
+usado pelo relatório de mais vistos sem percorrer os eventos.
+"""
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, MetaData, Table
+
+metadata = MetaData()
+
+Table('dashboard_view_events', metadata,
+    Column('id', BigInteger().with_variant(Integer, 'sqlite'), primary_key=True),
+    Column('dashboard_id', Integer, nullable=False),
+    Column('user_id', Integer),
+    Column('viewed_at', DateTime, nullable=False),
+    Index('ix_dashboard_view_events_viewed_at', 'viewed_at'),
+)
+
+Table('dashboard_view_hourly', metadata,
+    Column('dashboard_id', Integer, primary_key=True),
+    Column('hour', DateTime, primary_key=True),
+    Column('views', Integer, nullable=False),
+    Index('ix_dashboard_view_hourly_hour', 'hour', 'dashboard_id', 'views'),
+)
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+
+def downgrade(conn):
+    metadata.drop_all(conn, checkfirst=True)
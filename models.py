@@ -1,14 +1,16 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from app import db, login_manager
+from passwords import hash_password, verify_password, needs_rehash
 from sqlalchemy import Table, Column, Integer, String, Boolean, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 
 # Association table for User-Department many-to-many relationship
 user_department = db.Table('user_department',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
-    db.Column('department_id', db.Integer, db.ForeignKey('departments.id'), primary_key=True)
+    db.Column('department_id', db.Integer, db.ForeignKey('departments.id'), primary_key=True),
+    # Lado reverso (usuários de um departamento); a chave primária só cobre user_id primeiro
+    db.Index('ix_user_department_department_id_user_id', 'department_id', 'user_id')
 )
 
 # User roles
@@ -17,8 +19,26 @@ class UserRole:
     ADMIN = 'admin'
     USER = 'user'
 
-class User(UserMixin, db.Model):
+class RoleMixin:
+    """Role helpers shared by User and the cached principal (user_cache.CachedUser)"""
+    
+    def is_master(self):
+        return self.role == UserRole.MASTER
+    
+    def is_admin(self):
+        return self.role == UserRole.ADMIN
+    
+    def is_common_user(self):
+        return self.role == UserRole.USER
+
+class User(RoleMixin, UserMixin, db.Model):
     __tablename__ = 'users'
+    # Índices criados pela migração 0003 (migrations/)
+    __table_args__ = (
+        db.Index('ix_users_company_id_role', 'company_id', 'role'),
+        db.Index('ix_users_role', 'role'),
+        db.Index('ix_users_name_id', 'name', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -37,25 +57,22 @@ class User(UserMixin, db.Model):
     departments = relationship("Department", secondary=user_department, back_populates="users")
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-    
-    def is_master(self):
-        return self.role == UserRole.MASTER
+        return verify_password(self.password_hash, password)
     
-    def is_admin(self):
-        return self.role == UserRole.ADMIN
-    
-    def is_common_user(self):
-        return self.role == UserRole.USER
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
     
     def __repr__(self):
         return f'<User {self.email}>'
 
 class Company(db.Model):
     __tablename__ = 'companies'
+    __table_args__ = (
+        db.Index('ix_companies_name_id', 'name', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -73,6 +90,10 @@ class Company(db.Model):
 
 class Department(db.Model):
     __tablename__ = 'departments'
+    __table_args__ = (
+        db.Index('ix_departments_company_id_name', 'company_id', 'name'),
+        db.Index('ix_departments_name_id', 'name', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -92,6 +113,10 @@ class Department(db.Model):
 
 class Dashboard(db.Model):
     __tablename__ = 'dashboards'
+    __table_args__ = (
+        db.Index('ix_dashboards_department_id_is_active', 'department_id', 'is_active'),
+        db.Index('ix_dashboards_name_id', 'name', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -104,11 +129,48 @@ class Dashboard(db.Model):
     # Relationships
     department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False)
     department = relationship("Department", back_populates="dashboards")
+    # Último resultado de dashboard_health.py (None = ainda não verificado)
+    health = relationship("DashboardHealth", uselist=False, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f'<Dashboard {self.name}>'
 
+class DashboardHealth(db.Model):
+    __tablename__ = 'dashboard_health'
+    
+    dashboard_id = db.Column(db.Integer, db.ForeignKey('dashboards.id', ondelete='CASCADE'), primary_key=True)
+    url = db.Column(db.String(500), nullable=False)  # link verificado
+    ok = db.Column(db.Boolean, nullable=False)
+    status_code = db.Column(db.Integer)
+    latency_ms = db.Column(db.Integer)
+    error = db.Column(db.String(200))
+    checked_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<DashboardHealth {self.dashboard_id} ok={self.ok}>'
+
+# Visualizações de dashboards (view_events.py); sem chave estrangeira, para excluir um
+# dashboard não depender de apagar milhões de eventos. Os relatórios fazem join com dashboards.
+dashboard_view_events = db.Table('dashboard_view_events',
+    db.Column('id', db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True),
+    db.Column('dashboard_id', db.Integer, nullable=False),
+    db.Column('user_id', db.Integer),
+    db.Column('viewed_at', db.DateTime, nullable=False),
+    db.Index('ix_dashboard_view_events_viewed_at', 'viewed_at')
+)
+
+# Total de visualizações por dashboard e hora, incrementado a cada gravação dos eventos
+dashboard_view_hourly = db.Table('dashboard_view_hourly',
+    db.Column('dashboard_id', db.Integer, primary_key=True),
+    db.Column('hour', db.DateTime, primary_key=True),
+    db.Column('views', db.Integer, nullable=False),
+    # Relatório por período: soma por dashboard sem ler a tabela
+    db.Index('ix_dashboard_view_hourly_hour', 'hour', 'dashboard_id', 'views')
+)
+
 # User loader for Flask-Login
+# O principal autenticado vem do cache (user_cache); o banco só é consultado em caso de miss
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    from user_cache import user_cache
+    return user_cache.get(int(user_id))
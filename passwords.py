@@ -0,0 +1,86 @@
+"""
+Política de hash de senhas
+
+O algoritmo e os custos vêm de PASSWORD_HASH_METHOD no Config (no formato do
+werkzeug, ex.: "scrypt:32768:8:1" ou "pbkdf2:sha256:600000"). Hashes gerados
+com outra política são atualizados no próximo login bem-sucedido. A verificação
+roda num pool limitado (PASSWORD_HASH_WORKERS) para que uma rajada de logins
+não consuma todas as CPUs usadas pelas demais rotas. Importações em lote
+(user_import.py) geram os hashes num pool de processos.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+_executor = None
+_executor_lock = threading.Lock()
+_method_prefixes = {}
+
+def hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD
+
+def hash_password(password, method=None):
+    """Hash a password with the configured policy"""
+    return generate_password_hash(password, method=method or hash_method())
+
+def _method_prefix(method):
+    # O werkzeug completa parâmetros omitidos (ex.: "scrypt" -> "scrypt:32768:8:1");
+    # gerar um hash uma única vez revela o prefixo efetivo da política
+    if method not in _method_prefixes:
+        _method_prefixes[method] = generate_password_hash('', method=method).split('$', 1)[0]
+    return _method_prefixes[method]
+
+def needs_rehash(pwhash):
+    """True if the hash was produced under a different policy than the configured one"""
+    return pwhash.split('$', 1)[0] != _method_prefix(hash_method())
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = current_app.config.get('PASSWORD_HASH_WORKERS', 2)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return _executor
+
+def verify_password(pwhash, password):
+    """Check a password against its hash on the bounded hashing pool"""
+    if not current_app.config.get('PASSWORD_HASH_WORKERS'):
+        return check_password_hash(pwhash, password)
+    timeout = current_app.config.get('PASSWORD_VERIFY_TIMEOUT')
+    return _get_executor().submit(check_password_hash, pwhash, password).result(timeout=timeout)
+
+def hash_passwords(passwords, processes=None):
+    """Yield the hashes of many passwords, in order, computed in a process pool.
+
+    processes=0 (ou um ambiente sem suporte a multiprocessing) gera no próprio processo.
+    """
+    method = hash_method()
+    if processes is None:
+        processes = current_app.config.get('PASSWORD_IMPORT_PROCESSES')
+    if processes == 0 or len(passwords) < 2:
+        for password in passwords:
+            yield generate_password_hash(password, method=method)
+        return
+
+    # forkserver evita herdar as threads e conexões do worker web; o servidor pré-carrega
+    # apenas o werkzeug (e não o __main__ da aplicação)
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['werkzeug.security'])
+    else:
+        context = multiprocessing.get_context('spawn')
+    try:
+        executor = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+    except (OSError, NotImplementedError, ImportError):
+        for password in passwords:
+            yield generate_password_hash(password, method=method)
+        return
+    with executor:
+        chunksize = max(1, len(passwords) // ((processes or multiprocessing.cpu_count()) * 4))
+        yield from executor.map(generate_password_hash, passwords, repeat(method), chunksize=chunksize)
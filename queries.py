@@ -0,0 +1,73 @@
+"""
+Consultas compartilhadas das listagens
+
+Carregam antecipadamente (joined/selectin) os relacionamentos lidos pelos
+templates e calculam contagens no SQL, de forma que cada listagem executa
+um número constante de consultas, independente do número de linhas.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload
+from app import db
+from models import User, Company, Department, Dashboard, UserRole, user_department
+
+def company_department_ids(company_id):
+    """Subquery with the ids of the departments of a company"""
+    return select(Department.id).where(Department.company_id == company_id)
+
+def dashboard_query():
+    """Dashboards with their department and company loaded in the same query"""
+    return Dashboard.query.options(
+        joinedload(Dashboard.department).joinedload(Department.company)
+    )
+
+def user_query():
+    """Users with their company joined and departments loaded in one extra query"""
+    return User.query.options(
+        joinedload(User.company),
+        selectinload(User.departments)
+    )
+
+def department_listing(company_id=None):
+    """Query of (department, dashboard_count, user_count) rows"""
+    dashboard_count = (
+        select(func.count(Dashboard.id))
+        .where(Dashboard.department_id == Department.id)
+        .correlate(Department)
+        .scalar_subquery()
+    )
+    member_count = (
+        select(func.count())
+        .select_from(user_department)
+        .where(user_department.c.department_id == Department.id)
+        .correlate(Department)
+        .scalar_subquery()
+    )
+    # Administradores da empresa acessam o departamento pela regra de papel, sem vínculo gravado
+    admin_count = (
+        select(func.count(User.id))
+        .where(User.company_id == Department.company_id, User.role == UserRole.ADMIN)
+        .correlate(Department)
+        .scalar_subquery()
+    )
+    query = db.session.query(Department, dashboard_count, member_count + admin_count).options(
+        joinedload(Department.company)
+    )
+    if company_id is not None:
+        query = query.filter(Department.company_id == company_id)
+    return query
+
+def company_listing():
+    """Query of (company, department_count, user_count) rows"""
+    department_count = (
+        select(func.count(Department.id))
+        .where(Department.company_id == Company.id)
+        .correlate(Company)
+        .scalar_subquery()
+    )
+    user_count = (
+        select(func.count(User.id))
+        .where(User.company_id == Company.id)
+        .correlate(Company)
+        .scalar_subquery()
+    )
+    return db.session.query(Company, department_count, user_count)
@@ -0,0 +1,267 @@
+"""
+Armazenamento SQL compartilhado para o Flask-Limiter
+
+Registra o esquema sqlalchemy+<url do banco> (ex.: sqlalchemy+postgresql://...)
+na biblioteca limits. Os contadores ficam numa tabela rate_limits e são
+incrementados atomicamente no SQL (INSERT ... ON CONFLICT DO UPDATE), mas fora
+do caminho do request: cada worker acumula os incrementos em memória e uma
+thread em segundo plano os grava em lote a cada flush_interval segundos,
+trazendo de volta o total global. Suporta a estratégia sliding-window-counter.
+
+Para Redis ou servidores compatíveis basta usar RATELIMIT_STORAGE_URI=redis://...,
+que já é suportado nativamente pela limits.
+"""
+import atexit
+import logging
+import threading
+import time
+from limits.storage import Storage, SlidingWindowCounterSupport
+from limits.storage.base import TimestampedSlidingWindow
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, case, create_engine, select
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+class _Counter:
+    __slots__ = ('base', 'pending', 'expires_at', 'checked_until')
+
+    def __init__(self, base, expires_at, checked_until=0.0):
+        self.base = base          # último total global conhecido
+        self.pending = 0          # incrementos locais ainda não gravados
+        self.expires_at = expires_at
+        self.checked_until = checked_until  # chave ausente no banco: não consultar de novo até lá
+
+    def is_current(self, now):
+        return self.expires_at > now or self.checked_until > now
+
+class SQLStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate-limit storage backed by a SQL table with write-behind batching"""
+
+    STORAGE_SCHEME = ['sqlalchemy+postgresql', 'sqlalchemy+postgres', 'sqlalchemy+sqlite']
+    DEPENDENCIES = []
+
+    def __init__(self, uri, wrap_exceptions=False, flush_interval=1.0, table_name='rate_limits', **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        url = uri.split('+', 1)[1]
+        if url.startswith('postgres://'):
+            url = 'postgresql://' + url[len('postgres://'):]
+        self.engine = create_engine(url, pool_pre_ping=True, pool_size=1, max_overflow=2) \
+            if url.startswith('postgresql') else create_engine(url)
+        self.table = Table(
+            table_name, MetaData(),
+            Column('key', String(255), primary_key=True),
+            Column('count', Integer, nullable=False),
+            Column('expires_at', Float, nullable=False, index=True),
+        )
+        self.flush_interval = float(flush_interval)
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._table_ready = False
+        self._flusher = None
+        self._flushes = 0
+
+    @property
+    def base_exceptions(self):
+        return SQLAlchemyError
+
+    def _ensure_table(self):
+        # Criada na primeira utilização, nunca na importação da aplicação
+        if not self._table_ready:
+            self.table.create(self.engine, checkfirst=True)
+            self._table_ready = True
+
+    def _start_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='ratelimit-flush', daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except SQLAlchemyError:
+                logger.exception("Rate limit flush failed; counters kept for the next attempt")
+
+    def _counter(self, key, now, negative_ttl=None):
+        """Local counter for key, loading the global value on first use.
+
+        Uma chave ausente ou expirada no banco fica em cache como contador vazio por
+        negative_ttl segundos (padrão: flush_interval), sem um SELECT a cada request.
+        """
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None and counter.is_current(now):
+                return counter
+
+        # Leitura (nunca escrita) síncrona apenas na primeira vez que o worker vê a chave
+        self._ensure_table()
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(self.table.c.count, self.table.c.expires_at).where(self.table.c.key == key)
+            ).first()
+
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or not counter.is_current(now):
+                if row and row.expires_at > now:
+                    counter = _Counter(row.count, row.expires_at)
+                else:
+                    ttl = self.flush_interval if negative_ttl is None else negative_ttl
+                    counter = _Counter(0, 0.0, now + ttl)
+                self._counters[key] = counter
+            return counter
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        counter = self._counter(key, now)
+        with self._lock:
+            if counter.expires_at <= now:
+                counter.base = 0
+                counter.expires_at = now + expiry
+            counter.pending += amount
+            value = counter.base + counter.pending
+        self._start_flusher()
+        return value
+
+    def decr(self, key, amount=1):
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                return 0
+            counter.pending -= amount
+            return counter.base + counter.pending
+
+    def get(self, key):
+        return self._get(key, time.time())
+
+    def _get(self, key, now, negative_ttl=None):
+        counter = self._counter(key, now, negative_ttl)
+        with self._lock:
+            if counter.expires_at <= now:
+                return 0
+            return counter.base + counter.pending
+
+    def get_expiry(self, key):
+        now = time.time()
+        counter = self._counter(key, now)
+        return counter.expires_at if counter.expires_at > now else now
+
+    def flush(self):
+        """Write pending increments in one transaction and refresh global totals"""
+        with self._flush_lock:
+            with self._lock:
+                batch = {
+                    key: (counter.pending, counter.expires_at)
+                    for key, counter in self._counters.items()
+                    if counter.pending
+                }
+                for key in batch:
+                    self._counters[key].pending = 0
+            if not batch:
+                return
+
+            # Dialetos importados só no primeiro flush, fora do cold start
+            from sqlalchemy.dialects import postgresql, sqlite
+
+            now = time.time()
+            dialect = postgresql if self.engine.dialect.name == 'postgresql' else sqlite
+            table = self.table
+            results = {}
+            try:
+                self._ensure_table()
+                with self.engine.begin() as conn:
+                    for key, (delta, expires_at) in batch.items():
+                        stmt = dialect.insert(table).values(key=key, count=delta, expires_at=expires_at)
+                        expired = table.c.expires_at <= now
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=[table.c.key],
+                            set_={
+                                'count': case((expired, stmt.excluded.count), else_=table.c.count + stmt.excluded.count),
+                                'expires_at': case((expired, stmt.excluded.expires_at), else_=table.c.expires_at),
+                            },
+                        ).returning(table.c.count, table.c.expires_at)
+                        results[key] = conn.execute(stmt).one()
+
+                    self._flushes += 1
+                    if self._flushes % 60 == 0:
+                        conn.execute(table.delete().where(table.c.expires_at <= now))
+            except SQLAlchemyError:
+                # Devolver os incrementos para a próxima tentativa
+                with self._lock:
+                    for key, (delta, _) in batch.items():
+                        counter = self._counters.get(key)
+                        if counter is not None:
+                            counter.pending += delta
+                raise
+
+            with self._lock:
+                for key, (count, expires_at) in results.items():
+                    counter = self._counters.get(key)
+                    if counter is not None:
+                        counter.base = count
+                        counter.expires_at = expires_at
+                # Descartar contadores locais expirados
+                for key in [k for k, c in self._counters.items() if not c.is_current(now) and not c.pending]:
+                    del self._counters[key]
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(select(1))
+            return True
+        except SQLAlchemyError:
+            return False
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+        self._ensure_table()
+        with self.engine.begin() as conn:
+            return conn.execute(self.table.delete()).rowcount
+
+    def clear(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+        self._ensure_table()
+        with self.engine.begin() as conn:
+            conn.execute(self.table.delete().where(self.table.c.key == key))
+
+    # Sliding window counter: janela anterior ponderada + janela atual
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count, previous_ttl, current_count, _ = self._sliding_window_info(
+            previous_key, current_key, expiry, now
+        )
+        if int(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+            return False
+        current_count = self.incr(current_key, 2 * expiry, amount=amount)
+        if int(previous_count * previous_ttl / expiry + current_count) > limit:
+            self.decr(current_key, amount)
+            return False
+        return True
+
+    def _sliding_window_info(self, previous_key, current_key, expiry, now):
+        # As duas chaves só importam até o fim da janela atual: a ausência fica em cache até lá
+        window_left = expiry - now % expiry
+        previous_count = self._get(previous_key, now, window_left)
+        current_count = self._get(current_key, now, window_left)
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._sliding_window_info(previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
@@ -1,40 +1,57 @@
-import datetime
-from flask import render_template, request, redirect, url_for, flash, abort, session, jsonify, make_response
+import hmac
+import json
+import time
+from flask import (
+    render_template, request, redirect, url_for, flash, abort, session, jsonify,
+    Response, stream_with_context, current_app
+)
 from flask_login import login_user, logout_user, login_required, current_user
-from app import app, db, limiter
+from app import db, limiter, registry
 from models import User, Company, Department, Dashboard, UserRole
 from forms import (
     LoginForm, UserForm, EditUserForm, ChangePasswordForm,
-    CompanyForm, DepartmentForm, DashboardForm
+    CompanyForm, DepartmentForm, DashboardForm, UserImportForm
 )
+from access import access_index, department_scope
+from user_cache import user_cache
+from fragments import dashboard_grid, dashboard_pages
+from embed_tokens import EmbedTokenError, embed_target, embed_tokens
+from dashboard_health import sweep as sweep_dashboard_health
+from view_events import REPORT_PERIODS, most_viewed, view_events
+from conditional import conditional, dashboard_state, department_state, make_etag, user_parts
+from memberships import reassign_department, stores_memberships, sync_user_departments
+from login_attempts import register_failed_login, reset_failed_logins, last_login_buffer
+from queries import dashboard_query
+from user_import import UserImport, UserImportError, read_rows
+from listings import users_listing, companies_listing, departments_listing, dashboards_listing
 from utils import (
     check_master_access, check_admin_access, check_company_access, 
     check_department_access, check_dashboard_access,
     get_accessible_companies, get_accessible_departments, get_accessible_dashboards,
-    get_power_bi_iframe
+    stream_template
 )
 
 # Make session permanent
-@app.before_request
+@registry.before_request
 def make_session_permanent():
     session.permanent = True
 
 # Error handlers
-@app.errorhandler(403)
+@registry.errorhandler(403)
 def forbidden(e):
     return render_template('errors/403.html'), 403
 
-@app.errorhandler(404)
+@registry.errorhandler(404)
 def page_not_found(e):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
+@registry.errorhandler(500)
 def internal_server_error(e):
     return render_template('errors/500.html'), 500
 
 # Authentication routes
-@app.route('/', methods=['GET', 'POST'])
-@app.route('/login', methods=['GET', 'POST'])
+@registry.route('/', methods=['GET', 'POST'])
+@registry.route('/login', methods=['GET', 'POST'])
 @limiter.limit("5 per minute")
 def login():
     if current_user.is_authenticated:
@@ -50,28 +67,34 @@ def login():
         
         if user and user.check_password(form.password.data):
             # Reset failed login attempts on successful login
-            user.failed_login_attempts = 0
-            user.last_login = datetime.datetime.utcnow()
-            db.session.commit()
+            # (UPDATE condicionado: falha se a conta foi bloqueada em paralelo)
+            if not reset_failed_logins(user):
+                flash('Account is locked. Please contact an administrator.', 'danger')
+                return render_template('login.html', form=form)
+            
+            # Atualizar hashes gerados com uma política antiga
+            if user.password_needs_rehash():
+                user.set_password(form.password.data)
+                db.session.commit()
+            
+            # last_login é gravado em lote fora do caminho do login
+            last_login_buffer.record(user.id)
             
             login_user(user, remember=form.remember_me.data)
             next_page = request.args.get('next')
             return redirect(next_page or url_for('dashboard'))
         else:
-            # Increment failed login attempts
+            # Increment failed login attempts (incremento e bloqueio atômicos no banco)
             if user:
-                user.failed_login_attempts += 1
-                # Lock account after 5 failed attempts
-                if user.failed_login_attempts >= 5:
-                    user.is_locked = True
+                result = register_failed_login(user.id)
+                if result and result[1]:
                     flash('Too many failed login attempts. Account has been locked.', 'danger')
-                db.session.commit()
             
             flash('Invalid email or password.', 'danger')
     
     return render_template('login.html', form=form)
 
-@app.route('/logout')
+@registry.route('/logout')
 def logout():
     try:
         logout_user()
@@ -82,42 +105,64 @@ def logout():
         print(f"Logout error: {str(e)}")
     return redirect(url_for('login'))
 
-@app.route('/forgot-password')
+@registry.route('/forgot-password')
 def forgot_password():
     flash('Please contact the administrator to receive new access.', 'info')
     return redirect(url_for('login'))
 
 # Dashboard routes
-@app.route('/dashboard')
-@app.route('/dashboard/department/<int:department_id>')
+@registry.route('/dashboard')
+@registry.route('/dashboard/department/<int:department_id>')
 @login_required
 def dashboard(department_id=None):
     if department_id:
         # Verificar se o usuário tem acesso ao departamento
         if not check_department_access(department_id):
             abort(403)
-        # Filtrar dashboards apenas do departamento selecionado
-        department = Department.query.get_or_404(department_id)
-        
-        # Garantir que apenas dashboards ativos sejam retornados
-        dashboards = Dashboard.query.filter(
-            Dashboard.department_id == department_id,
-            Dashboard.is_active == True
-        ).all()
-        
-        title = f"Department: {department.name}"
+        count, last_modified = dashboard_state(Dashboard.department_id == department_id, Dashboard.is_active == True)
+        _, department_modified = department_state(Department.id == department_id)
+        last_modified = max(filter(None, [last_modified, department_modified]), default=None)
+        scope = department_id
     else:
-        # Todos os dashboards acessíveis
-        dashboards = get_accessible_dashboards()
-        title = "My Dashboards"
+        # Todos os dashboards acessíveis; usuários com os mesmos departamentos compartilham a grade
+        if current_user.is_master():
+            scope = 'all'
+            count, last_modified = dashboard_state()
+        else:
+            scope = access_index.get(current_user).department_ids
+            count, last_modified = dashboard_state(Dashboard.department_id.in_(department_scope(current_user)))
+    
+    # ETag a partir de COUNT/MAX(updated_at): 304 sem montar a grade nem renderizar a página.
+    # O escopo entra por user_parts() (departamentos e empresa do usuário), sem listar ids;
+    # o mesmo estado indexa a grade em cache, então o corpo nunca é mais antigo que a ETag
+    etag = make_etag('dashboard', department_id, current_user.role, count, last_modified, user_parts())
+    
+    def render():
+        if department_id:
+            # Filtrar dashboards apenas do departamento selecionado
+            department = Department.query.get_or_404(department_id)
+            
+            # Garantir que apenas dashboards ativos sejam retornados
+            # (a consulta só roda se a grade não estiver no cache de fragmentos)
+            grid = dashboard_grid(None, department_id, lambda: dashboard_query().filter(
+                Dashboard.department_id == department_id,
+                Dashboard.is_active == True
+            ).all(), state=(count, last_modified))
+            
+            title = f"Department: {department.name}"
+        else:
+            grid = dashboard_grid(scope, None, get_accessible_dashboards, state=(count, last_modified))
+            title = "My Dashboards"
+        
+        # Passar o ID do departamento selecionado para o template
+        return render_template('dashboard/index.html', 
+                              dashboard_grid=grid, 
+                              title=title, 
+                              selected_department_id=department_id)
     
-    # Passar o ID do departamento selecionado para o template
-    return render_template('dashboard/index.html', 
-                          dashboards=dashboards, 
-                          title=title, 
-                          selected_department_id=department_id)
+    return conditional(etag, last_modified, render)
 
-@app.route('/dashboard/view/<int:dashboard_id>')
+@registry.route('/dashboard/view/<int:dashboard_id>')
 @login_required
 def view_dashboard(dashboard_id):
     dashboard = Dashboard.query.get_or_404(dashboard_id)
@@ -125,28 +170,57 @@ def view_dashboard(dashboard_id):
     if not check_dashboard_access(dashboard_id):
         abort(403)
     
-    iframe_html = get_power_bi_iframe(dashboard.power_bi_link)
+    # Apenas em memória; gravado em lote por view_events
+    view_events.record(dashboard.id, current_user.id)
     
-    # Adicionando cabeçalhos de segurança para evitar visualização do código fonte
-    response = make_response(render_template('dashboard/view.html', dashboard=dashboard, iframe_html=iframe_html))
-    response.headers['Content-Security-Policy'] = "default-src 'self' https://*.powerbi.com; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline' https://cdnjs.cloudflare.com; img-src 'self' data: https://*.powerbi.com; frame-src https://*.powerbi.com"
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'DENY'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
+    # Página renderizada uma vez por (id, updated_at); cabeçalhos de segurança (CSP do
+    # Power BI, sem cache) pela política 'dashboard_view' em SECURITY_HEADERS_ROUTES
+    return dashboard_pages.get_or_render(dashboard)
+
+@registry.route('/api/dashboards/<int:dashboard_id>/embed-token')
+@login_required
+def dashboard_embed_token(dashboard_id):
+    dashboard = Dashboard.query.get_or_404(dashboard_id)
+    
+    if not check_dashboard_access(dashboard_id):
+        abort(403)
     
-    return response
+    # Apenas links reportEmbed usam token; links públicos são embutidos diretamente
+    target = embed_target(dashboard.power_bi_link)
+    if target is None or not embed_tokens.enabled:
+        abort(404)
+    
+    try:
+        token = embed_tokens.get(*target)
+    except EmbedTokenError:
+        current_app.logger.exception("Embed token request failed for dashboard %s", dashboard_id)
+        return jsonify({'error': 'Power BI token service unavailable'}), 503
+    
+    return jsonify({
+        'token': token.token,
+        'embedUrl': token.embed_url,
+        'reportId': target[1],
+        'expiresIn': int(token.expires_at - time.time()),
+    })
+
+@registry.route('/api/cron/dashboard-health')
+@limiter.exempt
+def cron_dashboard_health():
+    # Chamado pela Vercel Cron com "Authorization: Bearer <CRON_SECRET>"
+    secret = current_app.config.get('CRON_SECRET')
+    if not secret or not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {secret}'):
+        abort(404)
+    return jsonify(sweep_dashboard_health())
 
 # Company routes (Master only)
-@app.route('/companies')
+@registry.route('/companies')
 @login_required
 def companies():
     check_master_access()
-    companies = Company.query.all()
-    return render_template('admin/companies.html', companies=companies)
+    companies, next_cursor = companies_listing.page(request.args)
+    return render_template('admin/companies.html', companies=companies, next_cursor=next_cursor)
 
-@app.route('/companies/add', methods=['GET', 'POST'])
+@registry.route('/companies/add', methods=['GET', 'POST'])
 @login_required
 def add_company():
     check_master_access()
@@ -165,7 +239,7 @@ def add_company():
     
     return render_template('admin/company_form.html', form=form, title='Add Company')
 
-@app.route('/companies/edit/<int:company_id>', methods=['GET', 'POST'])
+@registry.route('/companies/edit/<int:company_id>', methods=['GET', 'POST'])
 @login_required
 def edit_company(company_id):
     check_master_access()
@@ -178,12 +252,13 @@ def edit_company(company_id):
         company.description = form.description.data
         company.is_active = form.is_active.data
         db.session.commit()
+        user_cache.clear()
         flash('Company updated successfully.', 'success')
         return redirect(url_for('companies'))
     
     return render_template('admin/company_form.html', form=form, company=company, title='Edit Company')
 
-@app.route('/companies/delete/<int:company_id>', methods=['POST'])
+@registry.route('/companies/delete/<int:company_id>', methods=['POST'])
 @login_required
 def delete_company(company_id):
     check_master_access()
@@ -191,23 +266,22 @@ def delete_company(company_id):
     company = Company.query.get_or_404(company_id)
     db.session.delete(company)
     db.session.commit()
+    access_index.clear()
+    user_cache.clear()
     flash('Company deleted successfully.', 'success')
     return redirect(url_for('companies'))
 
 # Department routes (Master and Admin)
-@app.route('/departments')
+@registry.route('/departments')
 @login_required
 def departments():
     check_admin_access()
     
-    if current_user.is_master():
-        departments = Department.query.all()
-    else:  # Admin
-        departments = Department.query.filter_by(company_id=current_user.company_id).all()
-    
-    return render_template('admin/departments.html', departments=departments)
+    # Primeira página; as demais são carregadas via /api/departments/list
+    departments, next_cursor = departments_listing.page(request.args)
+    return render_template('admin/departments.html', departments=departments, next_cursor=next_cursor)
 
-@app.route('/departments/add', methods=['GET', 'POST'])
+@registry.route('/departments/add', methods=['GET', 'POST'])
 @login_required
 def add_department():
     check_admin_access()
@@ -233,24 +307,17 @@ def add_department():
             company_id=form.company_id.data
         )
         db.session.add(department)
-        db.session.flush()  # Para obter o ID do departamento antes do commit
-        
-        # Atribuir automaticamente o novo departamento a todos administradores da mesma empresa
-        admin_users = User.query.filter(
-            (User.company_id == form.company_id.data) & 
-            ((User.role == UserRole.ADMIN) | (User.role == UserRole.MASTER))
-        ).all()
-        
-        for admin_user in admin_users:
-            admin_user.departments.append(department)
-            
+        # Administradores da empresa acessam o novo departamento pela regra de papel (access.py),
+        # sem vínculos gravados em user_department
         db.session.commit()
+        access_index.clear()
+        user_cache.clear()
         flash('Department added successfully.', 'success')
         return redirect(url_for('departments'))
     
     return render_template('admin/department_form.html', form=form, title='Add Department')
 
-@app.route('/departments/edit/<int:department_id>', methods=['GET', 'POST'])
+@registry.route('/departments/edit/<int:department_id>', methods=['GET', 'POST'])
 @login_required
 def edit_department(department_id):
     check_admin_access()
@@ -284,30 +351,20 @@ def edit_department(department_id):
         department.is_active = form.is_active.data
         department.company_id = new_company_id
         
-        # Se a empresa foi alterada, precisamos atualizar as permissões dos usuários
+        # Se a empresa foi alterada, os usuários da empresa antiga perdem o vínculo
+        # (um único DELETE em user_department, sem carregar os usuários)
         if old_company_id != new_company_id:
-            # Remover o departamento dos usuários da empresa antiga
-            old_users = User.query.filter_by(company_id=old_company_id).all()
-            for user in old_users:
-                if department in user.departments:
-                    user.departments.remove(department)
-            
-            # Adicionar o departamento para os administradores da nova empresa
-            new_admin_users = User.query.filter(
-                (User.company_id == new_company_id) & 
-                ((User.role == UserRole.ADMIN) | (User.role == UserRole.MASTER))
-            ).all()
-            for admin_user in new_admin_users:
-                if department not in admin_user.departments:
-                    admin_user.departments.append(department)
+            reassign_department(department.id, old_company_id)
         
         db.session.commit()
+        access_index.clear()
+        user_cache.clear()
         flash('Department updated successfully.', 'success')
         return redirect(url_for('departments'))
     
     return render_template('admin/department_form.html', form=form, department=department, title='Edit Department')
 
-@app.route('/departments/delete/<int:department_id>', methods=['POST'])
+@registry.route('/departments/delete/<int:department_id>', methods=['POST'])
 @login_required
 def delete_department(department_id):
     check_admin_access()
@@ -320,24 +377,39 @@ def delete_department(department_id):
     
     db.session.delete(department)
     db.session.commit()
+    access_index.clear()
+    user_cache.clear()
     flash('Department deleted successfully.', 'success')
     return redirect(url_for('departments'))
 
 # Dashboard management routes (Master and Admin)
-@app.route('/dashboards/manage')
+@registry.route('/dashboards/manage')
 @login_required
 def manage_dashboards():
     check_admin_access()
     
-    if current_user.is_master():
-        dashboards = Dashboard.query.all()
-    else:  # Admin
-        department_ids = [d.id for d in Department.query.filter_by(company_id=current_user.company_id).all()]
-        dashboards = Dashboard.query.filter(Dashboard.department_id.in_(department_ids)).all()
+    if request.args.get('all'):
+        # Todas as linhas, renderizadas à medida que saem do cursor (memória constante)
+        dashboards = dashboards_listing.stream(request.args)
+        return Response(stream_template('admin/dashboards.html', dashboards=dashboards, next_cursor=None))
+    
+    dashboards, next_cursor = dashboards_listing.page(request.args)
+    return render_template('admin/dashboards.html', dashboards=dashboards, next_cursor=next_cursor)
+
+@registry.route('/reports/most-viewed')
+@login_required
+def most_viewed_report():
+    check_admin_access()
     
-    return render_template('admin/dashboards.html', dashboards=dashboards)
+    period = request.args.get('period', '7d')
+    if period not in REPORT_PERIODS:
+        period = '7d'
+    company_id = None if current_user.is_master() else current_user.company_id
+    rows = most_viewed(REPORT_PERIODS[period], company_id=company_id)
+    return render_template('admin/most_viewed.html', rows=rows, period=period, periods=REPORT_PERIODS,
+                           title='Most Viewed Dashboards')
 
-@app.route('/dashboards/add', methods=['GET', 'POST'])
+@registry.route('/dashboards/add', methods=['GET', 'POST'])
 @login_required
 def add_dashboard():
     check_admin_access()
@@ -366,12 +438,13 @@ def add_dashboard():
         )
         db.session.add(dashboard)
         db.session.commit()
+        access_index.clear()
         flash('Dashboard added successfully.', 'success')
         return redirect(url_for('manage_dashboards'))
     
     return render_template('admin/dashboard_form.html', form=form, title='Add Dashboard')
 
-@app.route('/dashboards/edit/<int:dashboard_id>', methods=['GET', 'POST'])
+@registry.route('/dashboards/edit/<int:dashboard_id>', methods=['GET', 'POST'])
 @login_required
 def edit_dashboard(dashboard_id):
     check_admin_access()
@@ -403,12 +476,13 @@ def edit_dashboard(dashboard_id):
         dashboard.is_active = form.is_active.data
         dashboard.department_id = form.department_id.data
         db.session.commit()
+        access_index.clear()
         flash('Dashboard updated successfully.', 'success')
         return redirect(url_for('manage_dashboards'))
     
     return render_template('admin/dashboard_form.html', form=form, dashboard=dashboard, title='Edit Dashboard')
 
-@app.route('/dashboards/delete/<int:dashboard_id>', methods=['POST'])
+@registry.route('/dashboards/delete/<int:dashboard_id>', methods=['POST'])
 @login_required
 def delete_dashboard(dashboard_id):
     check_admin_access()
@@ -421,23 +495,25 @@ def delete_dashboard(dashboard_id):
     
     db.session.delete(dashboard)
     db.session.commit()
+    access_index.clear()
     flash('Dashboard deleted successfully.', 'success')
     return redirect(url_for('manage_dashboards'))
 
 # User management routes
-@app.route('/users')
+@registry.route('/users')
 @login_required
 def users():
     check_admin_access()
     
-    if current_user.is_master():
-        users = User.query.all()
-    else:  # Admin
-        users = User.query.filter_by(company_id=current_user.company_id).all()
+    if request.args.get('all'):
+        # Todas as linhas, renderizadas à medida que saem do cursor (memória constante)
+        users = users_listing.stream(request.args)
+        return Response(stream_template('admin/users.html', users=users, next_cursor=None))
     
-    return render_template('admin/users.html', users=users)
+    users, next_cursor = users_listing.page(request.args)
+    return render_template('admin/users.html', users=users, next_cursor=next_cursor)
 
-@app.route('/users/add', methods=['GET', 'POST'])
+@registry.route('/users/add', methods=['GET', 'POST'])
 @login_required
 def add_user():
     check_admin_access()
@@ -500,27 +576,48 @@ def add_user():
         db.session.add(user)
         db.session.flush()  # Flush to get the user ID for department association
         
-        # Associate departments based on role
-        # Administradores têm acesso a todos os departamentos da empresa
-        if form.role.data == UserRole.ADMIN:
-            # Adicionar todos os departamentos da empresa ao usuário admin
-            departments = Department.query.filter_by(company_id=form.company_id.data).all()
-            for dept in departments:
-                user.departments.append(dept)
-        # Usuários comuns só têm acesso aos departamentos selecionados
-        elif form.role.data == UserRole.USER and form.department_ids.data:
-            for dept_id in form.department_ids.data:
-                department = Department.query.get(dept_id)
-                if department and department.company_id == user.company_id:
-                    user.departments.append(department)
+        # Usuários comuns só têm acesso aos departamentos selecionados;
+        # administradores acessam toda a empresa pela regra de papel
+        if stores_memberships(form.role.data):
+            sync_user_departments(user.id, form.department_ids.data, company_id=user.company_id)
         
         db.session.commit()
+        access_index.invalidate_user(user.id)
+        user_cache.invalidate(user.id)
         flash('User added successfully.', 'success')
         return redirect(url_for('users'))
     
     return render_template('admin/user_form.html', form=form, title='Add User')
 
-@app.route('/users/edit/<int:user_id>', methods=['GET', 'POST'])
+@registry.route('/users/import')
+@login_required
+def import_users():
+    check_admin_access()
+    return render_template('admin/user_import.html', form=UserImportForm(), title='Import Users')
+
+@registry.route('/api/users/import', methods=['POST'])
+@login_required
+def api_import_users():
+    """Bulk import of a CSV/JSON file, streaming NDJSON progress and per-row errors"""
+    check_admin_access()
+    form = UserImportForm()
+    if not form.validate_on_submit():
+        return jsonify({"errors": form.errors}), 400
+
+    upload = form.file.data
+    try:
+        rows = read_rows(upload.read(), upload.filename or '')
+    except UserImportError as e:
+        return jsonify({"errors": {"file": [str(e)]}}), 400
+    max_rows = current_app.config.get('USER_IMPORT_MAX_ROWS', 10000)
+    if len(rows) > max_rows:
+        return jsonify({"errors": {"file": [f"The file has {len(rows)} rows; the limit is {max_rows}."]}}), 400
+
+    job = UserImport(current_user, rows, dry_run=form.dry_run.data)
+    lines = (json.dumps(event) + "\n" for event in job.run())
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+@registry.route('/users/edit/<int:user_id>', methods=['GET', 'POST'])
 @login_required
 def edit_user(user_id):
     check_admin_access()
@@ -547,7 +644,8 @@ def edit_user(user_id):
         if form.company_id.data:
             departments = Department.query.filter_by(company_id=form.company_id.data).all()
             form.department_ids.choices = [(d.id, d.name) for d in departments]
-            form.department_ids.data = [d.id for d in user.departments]
+            if request.method == 'GET':
+                form.department_ids.data = [d.id for d in user.departments]
     else:  # Admin
         # Admins can only assign to their company and not as masters
         form.company_id.choices = [(current_user.company_id, current_user.company.name)]
@@ -560,7 +658,9 @@ def edit_user(user_id):
         # Admins can only assign to their company's departments
         departments = Department.query.filter_by(company_id=current_user.company_id).all()
         form.department_ids.choices = [(d.id, d.name) for d in departments]
-        form.department_ids.data = [d.id for d in user.departments]
+        # No POST, manter os departamentos enviados no formulário
+        if request.method == 'GET':
+            form.department_ids.data = [d.id for d in user.departments]
     
     if form.validate_on_submit():
         # Validate company access
@@ -587,29 +687,20 @@ def edit_user(user_id):
         if form.password.data and (user.is_master() or user.is_admin()):
             user.set_password(form.password.data)
         
-        # Update department associations based on role
-        user.departments = []
-        
-        # Administradores têm acesso a todos os departamentos da empresa
-        if form.role.data == UserRole.ADMIN:
-            # Adicionar todos os departamentos da empresa ao usuário admin
-            departments = Department.query.filter_by(company_id=form.company_id.data).all()
-            for dept in departments:
-                user.departments.append(dept)
-        # Usuários comuns só têm acesso aos departamentos selecionados
-        elif form.role.data == UserRole.USER and form.department_ids.data:
-            for dept_id in form.department_ids.data:
-                department = Department.query.get(dept_id)
-                if department and department.company_id == user.company_id:
-                    user.departments.append(department)
+        # Aplicar só a diferença entre os vínculos atuais e os selecionados
+        # (administradores e masters não têm vínculos gravados: acesso pela regra de papel)
+        department_ids = form.department_ids.data if stores_memberships(form.role.data) else []
+        sync_user_departments(user.id, department_ids, company_id=user.company_id)
         
         db.session.commit()
+        access_index.invalidate_user(user.id)
+        user_cache.invalidate(user.id)
         flash('User updated successfully.', 'success')
         return redirect(url_for('users'))
     
     return render_template('admin/user_form.html', form=form, user=user, title='Edit User')
 
-@app.route('/users/reset-password/<int:user_id>', methods=['GET', 'POST'])
+@registry.route('/users/reset-password/<int:user_id>', methods=['GET', 'POST'])
 @login_required
 def reset_user_password(user_id):
     check_admin_access()
@@ -627,12 +718,13 @@ def reset_user_password(user_id):
         user.is_locked = False  # Unlock account if it was locked
         user.failed_login_attempts = 0  # Reset failed attempts
         db.session.commit()
+        user_cache.invalidate(user.id)
         flash('Password reset successfully.', 'success')
         return redirect(url_for('users'))
     
     return render_template('admin/user_password_reset.html', form=form, user=user)
 
-@app.route('/users/delete/<int:user_id>', methods=['POST'])
+@registry.route('/users/delete/<int:user_id>', methods=['POST'])
 @login_required
 def delete_user(user_id):
     check_admin_access()
@@ -650,11 +742,13 @@ def delete_user(user_id):
     
     db.session.delete(user)
     db.session.commit()
+    access_index.invalidate_user(user_id)
+    user_cache.invalidate(user_id)
     flash('User deleted successfully.', 'success')
     return redirect(url_for('users'))
 
 # API Routes
-@app.route('/api/departments')
+@registry.route('/api/departments')
 @login_required
 def api_departments():
     company_id = request.args.get('company_id', type=int)
@@ -665,5 +759,47 @@ def api_departments():
     if not check_company_access(company_id):
         return jsonify([])
         
-    departments = Department.query.filter_by(company_id=company_id, is_active=True).all()
-    return jsonify([{"id": dept.id, "name": dept.name} for dept in departments])
+    # Revalidação barata: o select de empresa do formulário pede a mesma lista várias vezes
+    criteria = [Department.company_id == company_id, Department.is_active == True]
+    count, last_modified = department_state(*criteria)
+    etag = make_etag('api_departments', company_id, count, last_modified)
+    
+    def render():
+        departments = Department.query.filter(*criteria).all()
+        return jsonify([{"id": dept.id, "name": dept.name} for dept in departments])
+    
+    return conditional(etag, last_modified, render)
+
+
+def listing_page_json(listing):
+    """Return one keyset page of an admin listing as JSON plus the rendered table rows"""
+    items, next_cursor = listing.page(request.args)
+    return jsonify({
+        "items": [listing.serialize(item) for item in items],
+        "next": next_cursor,
+        "html": render_template(listing.rows_template, **{listing.context_name: items})
+    })
+
+@registry.route('/api/users')
+@login_required
+def api_users():
+    check_admin_access()
+    return listing_page_json(users_listing)
+
+@registry.route('/api/companies')
+@login_required
+def api_companies():
+    check_master_access()
+    return listing_page_json(companies_listing)
+
+@registry.route('/api/departments/list')
+@login_required
+def api_departments_listing():
+    check_admin_access()
+    return listing_page_json(departments_listing)
+
+@registry.route('/api/dashboards')
+@login_required
+def api_dashboards():
+    check_admin_access()
+    return listing_page_json(dashboards_listing)
@@ -0,0 +1,136 @@
+"""
+Cabeçalhos de segurança por política
+
+Cada política (CSP, X-Frame-Options, cache etc.) é serializada uma única vez
+na importação; o after_request apenas copia as tuplas prontas para a
+resposta. A política de cada rota vem de SECURITY_HEADERS_ROUTES no Config
+(endpoint -> nome da política, None = sem cabeçalhos); as demais usam
+SECURITY_HEADERS_DEFAULT.
+
+Políticas com nonce deixam de exigir 'unsafe-inline' para scripts: os
+templates usam <script nonce="{{ csp_nonce() }}">. O nonce só é gerado se
+algum template o pedir (ou se a resposta for streamed, quando o corpo ainda
+não foi renderizado); o CSP com nonce é montado a partir de dois pedaços
+pré-calculados.
+"""
+import secrets
+from flask import current_app, g, request
+from app import registry
+
+CDN_SCRIPTS = ('https://code.jquery.com', 'https://cdn.jsdelivr.net', 'https://cdnjs.cloudflare.com')
+CDN_STYLES = ('https://cdn.jsdelivr.net', 'https://cdnjs.cloudflare.com', 'https://fonts.googleapis.com')
+CDN_FONTS = ('https://fonts.gstatic.com', 'https://cdnjs.cloudflare.com')
+
+NONCE_MARKER = '\0nonce\0'
+
+class Policy:
+    """A named set of security headers, serialized once"""
+
+    def __init__(self, name, csp=None, nonce=False, headers=None):
+        self.name = name
+        self.nonce = nonce
+        base = list((headers or {}).items())
+        self._nonce_csp = None
+        if csp:
+            base.append(('Content-Security-Policy', self._serialize(csp)))
+            if nonce:
+                with_marker = dict(csp)
+                with_marker['script-src'] = list(csp.get('script-src', ["'self'"])) + [f"'nonce-{NONCE_MARKER}'"]
+                self._nonce_csp = tuple(self._serialize(with_marker).split(NONCE_MARKER))
+        self.headers = tuple(base)
+        self._without_csp = tuple(h for h in base if h[0] != 'Content-Security-Policy')
+        self._names = frozenset(name.lower() for name, _ in base)
+
+    @staticmethod
+    def _serialize(directives):
+        return '; '.join(' '.join((name,) + tuple(sources)).strip() for name, sources in directives.items())
+
+    def apply(self, response, nonce=None):
+        headers = response.headers
+        header_list = self.headers
+        if nonce is not None and self._nonce_csp:
+            prefix, suffix = self._nonce_csp
+            header_list = self._without_csp + (('Content-Security-Policy', prefix + nonce + suffix),)
+        # Caso comum: a rota não definiu nenhum destes cabeçalhos, basta acrescentar a lista pronta
+        if any(name.lower() in self._names for name, _ in headers):
+            for name, value in header_list:
+                headers[name] = value
+        else:
+            headers.extend(header_list)
+        return response
+
+    def __repr__(self):
+        return f'<Policy {self.name}>'
+
+BASE_HEADERS = {
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'DENY',
+    'Referrer-Policy': 'strict-origin-when-cross-origin',
+}
+
+NO_CACHE_HEADERS = {
+    'Cache-Control': 'no-store, no-cache, must-revalidate, max-age=0',
+    'Pragma': 'no-cache',
+}
+
+POLICIES = {policy.name: policy for policy in [
+    # Páginas da aplicação (base.html, login, admin) e respostas JSON
+    Policy('default', nonce=True, headers=BASE_HEADERS, csp={
+        'default-src': ["'self'"],
+        'script-src': ["'self'", *CDN_SCRIPTS],
+        'style-src': ["'self'", "'unsafe-inline'", *CDN_STYLES],
+        'font-src': ["'self'", 'data:', *CDN_FONTS],
+        'img-src': ["'self'", 'data:'],
+        'connect-src': ["'self'"],
+        'object-src': ["'none'"],
+        'base-uri': ["'self'"],
+        'form-action': ["'self'"],
+        'frame-ancestors': ["'none'"],
+    }),
+    # Visualização do Power BI: iframe do powerbi.com (ou powerbi-client do jsDelivr) e nada em cache
+    Policy('dashboard_view', nonce=True, headers={**BASE_HEADERS, **NO_CACHE_HEADERS, 'X-XSS-Protection': '1; mode=block'}, csp={
+        'default-src': ["'self'", 'https://*.powerbi.com'],
+        'script-src': ["'self'", 'https://cdn.jsdelivr.net'],
+        'connect-src': ["'self'"],
+        'style-src': ["'self'", "'unsafe-inline'", 'https://cdnjs.cloudflare.com'],
+        'font-src': ["'self'", 'https://cdnjs.cloudflare.com'],
+        'img-src': ["'self'", 'data:', 'https://*.powerbi.com'],
+        'frame-src': ['https://*.powerbi.com'],
+        'object-src': ["'none'"],
+        'base-uri': ["'self'"],
+        'frame-ancestors': ["'none'"],
+    }),
+    # Sem CSP (ex.: respostas de terceiros ou arquivos que precisam ser embutidos)
+    Policy('minimal', headers={'X-Content-Type-Options': 'nosniff'}),
+]}
+
+@registry.template_global()
+def csp_nonce():
+    """Per-request nonce for inline <script> tags"""
+    nonce = g.get('_csp_nonce')
+    if nonce is None:
+        nonce = g._csp_nonce = secrets.token_urlsafe(16)
+    return nonce
+
+def _route_policies(app):
+    """Resolve the endpoint -> Policy table once per application"""
+    table = app.extensions.get('security_headers')
+    if table is None:
+        routes = app.config.get('SECURITY_HEADERS_ROUTES', {})
+        table = {endpoint: POLICIES[name] if name else None for endpoint, name in routes.items()}
+        table[None] = POLICIES[app.config.get('SECURITY_HEADERS_DEFAULT', 'default')]
+        app.extensions['security_headers'] = table
+    return table
+
+@registry.after_request
+def apply_security_headers(response):
+    table = _route_policies(current_app)
+    policy = table.get(request.endpoint, table[None])
+    # 304: o navegador mantém os cabeçalhos da resposta em cache (CSP com o nonce do corpo guardado)
+    if policy is None or response.status_code == 304:
+        return response
+    nonce = g.get('_csp_nonce')
+    if nonce is None and policy.nonce and response.is_streamed:
+        # O corpo ainda será renderizado: decidir o nonce antes de enviar os cabeçalhos
+        nonce = csp_nonce()
+    return policy.apply(response, nonce)
@@ -0,0 +1,290 @@
+"""
+Gerador de dados sintéticos multiempresa (testes locais em escala de produção)
+
+Preenche um banco vazio com empresas, departamentos, usuários, vínculos
+user_department e dashboards, com a distribuição desigual de um ambiente real:
+poucas empresas grandes concentram a maior parte dos departamentos e usuários,
+alguns departamentos têm muito mais dashboards que os demais e o número de
+vínculos por usuário varia (média --memberships, limitada aos departamentos
+da empresa). Com os valores padrão são cerca de 1 milhão de vínculos.
+
+Regras da aplicação respeitadas: o usuário 1 é o master (master@example.com),
+cerca de --admin-ratio dos demais são administradores da própria empresa e só
+usuários comuns têm vínculos gravados (memberships.stores_memberships), sempre
+com departamentos da própria empresa. Todos os usuários têm a senha --password
+(um único hash, gerado com a política de PASSWORD_HASH_METHOD).
+
+A mesma --seed gera sempre os mesmos dados (as datas são relativas ao dia da
+geração). As linhas são geradas e gravadas em blocos, sem montar as tabelas
+inteiras em memória: COPY no PostgreSQL (psycopg2 ou psycopg) e INSERT em lote
+(executemany) nos demais bancos. Os índices secundários são removidos antes da
+carga e recriados no fim. Tudo roda numa única transação; no PostgreSQL as
+sequências de id são ajustadas e as tabelas analisadas no fim.
+
+É também o gerador dos benchmarks (benchmarks/*.py), que chamam generate()
+com tamanhos menores: todos medem sobre a mesma distribuição de dados. O
+benchmarks/suite.py --compare usa o gerador da revisão atual também com os
+modelos de revisões antigas, anteriores a memberships.py e passwords.py.
+
+Uso:
+    python seed_data.py                          # DATABASE_URL do ambiente
+    python seed_data.py --companies 2000 --users 200000 --memberships 5
+    python seed_data.py --database-url sqlite:///local.db --seed 7
+"""
+import argparse
+import csv
+import datetime
+import io
+import itertools
+import random
+import time
+from sqlalchemy import func, inspect, select, text
+from models import User, Company, Department, Dashboard, UserRole, user_department
+
+try:
+    from memberships import stores_memberships
+except ImportError:
+    # Revisões anteriores a memberships.py (benchmarks/suite.py --compare)
+    def stores_memberships(role):
+        return role == UserRole.USER
+
+CHUNK = 50000
+FIRST_NAMES = ('Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João',
+               'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago', 'Vanessa', 'William')
+LAST_NAMES = ('Almeida', 'Barbosa', 'Carvalho', 'Dias', 'Ferreira', 'Gomes', 'Lima', 'Martins', 'Nunes', 'Oliveira',
+              'Pereira', 'Ribeiro', 'Rodrigues', 'Santos', 'Silva', 'Souza', 'Teixeira', 'Vieira')
+COMPANY_WORDS = ('Alpha', 'Atlântica', 'Boreal', 'Cedro', 'Delta', 'Horizonte', 'Ipê', 'Jequitibá', 'Norte',
+                 'Orion', 'Pampa', 'Serra', 'Sul', 'Vale', 'Vértice')
+COMPANY_SUFFIXES = ('Logística', 'Varejo', 'Energia', 'Saúde', 'Engenharia', 'Alimentos', 'Tecnologia', 'Seguros')
+DEPARTMENTS = ('Finance', 'Sales', 'Marketing', 'Operations', 'Human Resources', 'Logistics', 'Procurement',
+               'Customer Service', 'IT', 'Legal', 'Compliance', 'Planning', 'Quality', 'Engineering', 'Treasury')
+REPORTS = ('Revenue', 'Headcount', 'Pipeline', 'Churn', 'Inventory', 'Costs', 'Margin', 'SLA', 'Forecast', 'NPS')
+
+TABLES = (Company.__table__, Department.__table__, User.__table__, Dashboard.__table__, user_department)
+
+class SeedError(RuntimeError):
+    """The target database already has tenant data"""
+
+def _skewed_weights(rng, count, alpha=1.2):
+    # Pareto: com alpha ~1.2, cerca de 20% dos itens ficam com 80% do peso
+    return [rng.paretovariate(alpha) for _ in range(count)]
+
+def _allocate(rng, total, weights):
+    """Split total items among len(weights) owners, at least one each, proportionally to weights"""
+    counts = [1] * len(weights)
+    for owner in rng.choices(range(len(weights)), weights=weights, k=max(0, total - len(weights))):
+        counts[owner] += 1
+    return counts
+
+def _timestamp(rng, now, days=3 * 365):
+    return now - datetime.timedelta(seconds=rng.randrange(days * 86400))
+
+class _TableWriter:
+    """Bulk writes of tuples: COPY on PostgreSQL, executemany elsewhere"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.driver = conn.dialect.driver if conn.dialect.name == 'postgresql' else None
+
+    def write(self, table, columns, rows):
+        if not rows:
+            return
+        if self.driver in ('psycopg2', 'psycopg'):
+            self._copy(table, columns, rows)
+        else:
+            self._insert(table, columns, rows)
+
+    def _insert(self, table, columns, rows):
+        # executemany direto no driver, com tuplas: sem montar um dicionário por linha
+        dialect = self.conn.dialect
+        # Conversões de tipo do SQLAlchemy (ex.: DateTime vira texto no SQLite)
+        processors = [(i, table.c[column].type.dialect_impl(dialect).bind_processor(dialect))
+                      for i, column in enumerate(columns)]
+        processors = [(i, process) for i, process in processors if process is not None]
+        if processors:
+            converted = []
+            for row in rows:
+                row = list(row)
+                for i, process in processors:
+                    row[i] = process(row[i])
+                converted.append(tuple(row))
+            rows = converted
+        placeholder = {'qmark': '?', 'numeric': ':{}', 'named': ':p{}'}.get(dialect.paramstyle, '%s')
+        if dialect.paramstyle == 'named':
+            rows = [{f'p{i}': value for i, value in enumerate(row, 1)} for row in rows]
+        values = ', '.join(placeholder.format(i) for i in range(1, len(columns) + 1))
+        self.conn.exec_driver_sql(f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({values})", rows)
+
+    def _copy(self, table, columns, rows):
+        statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        cursor = self.conn.connection.dbapi_connection.cursor()
+        try:
+            if self.driver == 'psycopg2':
+                buffer = io.StringIO()
+                # None vira campo vazio sem aspas, que o COPY em CSV lê como NULL
+                csv.writer(buffer).writerows(rows)
+                buffer.seek(0)
+                cursor.copy_expert(statement, buffer)
+            else:
+                with cursor.copy(statement) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+        finally:
+            cursor.close()
+
+def generate(engine, companies=1000, departments=10000, users=250000, memberships=5.0, dashboards=50000,
+             admin_ratio=0.02, password='Seed@1234', seed=42, log=print):
+    """Fill an empty database with deterministic multi-tenant data; returns the row counts"""
+    try:
+        from passwords import hash_password
+    except ImportError:
+        from werkzeug.security import generate_password_hash as hash_password
+    if departments < companies:
+        raise ValueError("departments must be at least the number of companies")
+    rng = random.Random(seed)
+    # Datas relativas ao início do dia (UTC): a mesma semente gera os mesmos dados ao longo do dia
+    now = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    password_hash = hash_password(password)
+    counts = {}
+
+    with engine.begin() as conn:
+        for table in TABLES[:-1]:
+            if conn.execute(select(func.count()).select_from(table)).scalar():
+                raise SeedError(f"Table {table.name} already has rows; seed an empty database")
+        writer = _TableWriter(conn)
+
+        # Índices secundários recriados depois da carga: montar o índice de uma vez é bem mais
+        # rápido que mantê-lo linha a linha (a chave primária e o e-mail único continuam)
+        indexes = [index for table in TABLES for index in table.indexes
+                   if inspect(conn).has_index(table.name, index.name)]
+        for index in indexes:
+            index.drop(conn)
+
+        def write(table, columns, rows):
+            start = time.perf_counter()
+            writer.write(table, columns, rows)
+            counts[table.name] = counts.get(table.name, 0) + len(rows)
+            return time.perf_counter() - start
+
+        # Empresas, com o tamanho relativo (peso) de cada uma
+        company_weights = _skewed_weights(rng, companies)
+        company_cumulative = list(itertools.accumulate(company_weights))
+        rows = []
+        for c in range(1, companies + 1):
+            created = _timestamp(rng, now)
+            name = f'{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)} {c:05d}'
+            rows.append((c, name, None, rng.random() > 0.03, created, created))
+        write(Company.__table__, ('id', 'name', 'description', 'is_active', 'created_at', 'updated_at'), rows)
+
+        # Departamentos distribuídos pelo peso das empresas (ids contíguos por empresa)
+        company_departments = {}
+        rows = []
+        department_id = 0
+        for c, count in enumerate(_allocate(rng, departments, company_weights), start=1):
+            first = department_id + 1
+            for i in range(count):
+                department_id += 1
+                created = _timestamp(rng, now)
+                name = DEPARTMENTS[i % len(DEPARTMENTS)] + (f' {i // len(DEPARTMENTS) + 1}' if i >= len(DEPARTMENTS) else '')
+                rows.append((department_id, name, None, rng.random() > 0.05, c, created, created))
+            company_departments[c] = range(first, department_id + 1)
+        write(Department.__table__,
+              ('id', 'name', 'description', 'is_active', 'company_id', 'created_at', 'updated_at'), rows)
+
+        # Dashboards: alguns departamentos concentram a maioria
+        rows = []
+        department_weights = _skewed_weights(rng, departments)
+        for b, d in enumerate(rng.choices(range(1, departments + 1), weights=department_weights, k=dashboards), start=1):
+            created = _timestamp(rng, now)
+            rows.append((b, f'{rng.choice(REPORTS)} {b:06d}', None,
+                         f'https://app.powerbi.com/view?r=seed{seed}-{b}', rng.random() > 0.1, d, created, created))
+            if len(rows) >= CHUNK:
+                write(Dashboard.__table__, ('id', 'name', 'description', 'power_bi_link', 'is_active',
+                                            'department_id', 'created_at', 'updated_at'), rows)
+                rows = []
+        write(Dashboard.__table__, ('id', 'name', 'description', 'power_bi_link', 'is_active',
+                                    'department_id', 'created_at', 'updated_at'), rows)
+
+        # Usuários e vínculos, em blocos (os vínculos de cada bloco depois dos usuários)
+        user_columns = ('id', 'name', 'email', 'password_hash', 'role', 'company_id', 'created_at', 'updated_at',
+                        'last_login', 'failed_login_attempts', 'is_locked')
+        user_time = member_time = 0.0
+        companies_range = range(1, companies + 1)
+        extra_memberships = max(0.0, memberships - 1)
+        user_rows = [(1, 'System Administrator', 'master@example.com', password_hash, UserRole.MASTER, None,
+                      now, now, None, 0, False)]
+        member_rows = []
+        user_companies = []
+        for u in range(2, users + 1):
+            if not user_companies:
+                user_companies = rng.choices(companies_range, cum_weights=company_cumulative, k=CHUNK)
+            company_id = user_companies.pop()
+            role = UserRole.ADMIN if rng.random() < admin_ratio else UserRole.USER
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            created = _timestamp(rng, now)
+            last_login = _timestamp(rng, now, days=90) if rng.random() < 0.7 else None
+            user_rows.append((u, f'{first} {last}', f'{first.lower()}.{last.lower()}.{u}@tenant{company_id}.example.com',
+                              password_hash, role, company_id, created, created, last_login, 0, False))
+            if stores_memberships(role):
+                available = company_departments[company_id]
+                count = 1 + int(rng.expovariate(1 / extra_memberships)) if extra_memberships else 1
+                for d in rng.sample(available, min(count, len(available))):
+                    member_rows.append((u, d))
+            if len(user_rows) >= CHUNK:
+                user_time += write(User.__table__, user_columns, user_rows)
+                member_time += write(user_department, ('user_id', 'department_id'), member_rows)
+                user_rows, member_rows = [], []
+                log(f"{u:,} users, {counts['user_department']:,} memberships")
+        user_time += write(User.__table__, user_columns, user_rows)
+        member_time += write(user_department, ('user_id', 'department_id'), member_rows)
+
+        start = time.perf_counter()
+        for index in indexes:
+            index.create(conn)
+        log(f"{len(indexes)} indexes rebuilt in {time.perf_counter() - start:.1f} s")
+
+        if conn.dialect.name == 'postgresql':
+            # Os ids foram gravados explicitamente; a sequência continua depois do maior
+            for table in ('companies', 'departments', 'users', 'dashboards'):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            conn.execute(text('ANALYZE'))
+            conn.commit()
+    log(f"write time: users {user_time:.1f} s, user_department {member_time:.1f} s "
+        f"({counts.get('user_department', 0) / member_time if member_time else 0:,.0f} rows/s)")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='default: DATABASE_URL')
+    parser.add_argument('--companies', type=int, default=1000)
+    parser.add_argument('--departments', type=int, default=10000, help='total, spread over the companies')
+    parser.add_argument('--users', type=int, default=250000)
+    parser.add_argument('--memberships', type=float, default=5.0, help='average departments per common user')
+    parser.add_argument('--dashboards', type=int, default=50000)
+    parser.add_argument('--admin-ratio', type=float, default=0.02)
+    parser.add_argument('--password', default='Seed@1234', help='password of every generated user')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    import migrate
+    from app import create_app, db
+    overrides = {'SQLALCHEMY_DATABASE_URI': args.database_url} if args.database_url else {}
+    app = create_app(**overrides)
+    with app.app_context():
+        migrate.upgrade(db.engine)
+        start = time.perf_counter()
+        try:
+            counts = generate(db.engine, args.companies, args.departments, args.users, args.memberships,
+                              args.dashboards, args.admin_ratio, args.password, args.seed)
+        except (SeedError, ValueError) as e:
+            parser.exit(1, f"{e}\n")
+        print(', '.join(f'{count:,} {table}' for table, count in counts.items())
+              + f" in {time.perf_counter() - start:.1f} s")
+        print(f"Master: master@example.com / {args.password}")
+
+if __name__ == '__main__':
+    main()
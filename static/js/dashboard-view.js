@@ -0,0 +1,68 @@
+// Tela de visualização do Power BI (dashboard/view.html)
+(function() {
+    // Prevent right-click
+    document.addEventListener('contextmenu', function(e) {
+        e.preventDefault();
+    });
+
+    document.addEventListener('keydown', function(e) {
+        // Escape volta para a lista de dashboards
+        if (e.key === 'Escape') {
+            window.location.href = '/dashboard';
+            return;
+        }
+        // Prevent F12, Ctrl+Shift+I, Ctrl+Shift+J, Ctrl+U
+        if (
+            e.keyCode === 123 ||
+            (e.ctrlKey && e.shiftKey && e.keyCode === 73) ||
+            (e.ctrlKey && e.shiftKey && e.keyCode === 74) ||
+            (e.ctrlKey && e.keyCode === 85)
+        ) {
+            e.preventDefault();
+        }
+    });
+
+    // Relatórios com token de embed (links reportEmbed)
+    var container = document.getElementById('powerbi-report');
+    if (!container || !window.powerbi) {
+        return;
+    }
+    var models = window['powerbi-client'].models;
+    var report = null;
+
+    function fetchToken() {
+        return fetch(container.dataset.tokenUrl, {credentials: 'same-origin'}).then(function(response) {
+            if (!response.ok) {
+                throw new Error('Embed token request failed: ' + response.status);
+            }
+            return response.json();
+        });
+    }
+
+    // Pedir um novo token (já renovado pelo servidor) um minuto antes do vencimento
+    function scheduleRefresh(expiresIn) {
+        setTimeout(function() {
+            fetchToken().then(function(data) {
+                report.setAccessToken(data.token);
+                scheduleRefresh(data.expiresIn);
+            }).catch(function() {
+                scheduleRefresh(120);
+            });
+        }, Math.max(expiresIn - 60, 30) * 1000);
+    }
+
+    fetchToken().then(function(data) {
+        report = window.powerbi.embed(container, {
+            type: 'report',
+            id: data.reportId,
+            embedUrl: data.embedUrl,
+            accessToken: data.token,
+            tokenType: models.TokenType.Embed,
+            settings: {panes: {filters: {visible: false}}}
+        });
+        scheduleRefresh(data.expiresIn);
+    }).catch(function(error) {
+        container.textContent = 'Unable to load the dashboard.';
+        console.error(error);
+    });
+})();
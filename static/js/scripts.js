@@ -245,14 +245,14 @@ document.addEventListener('DOMContentLoaded', function() {
   });
   
   // Confirmation dialogs for delete actions
-  const deleteButtons = document.querySelectorAll('[data-confirm]');
-  deleteButtons.forEach(button => {
-    button.addEventListener('click', function(e) {
-      const confirmMessage = this.getAttribute('data-confirm');
-      if (!confirm(confirmMessage || 'Are you sure you want to delete this item?')) {
-        e.preventDefault();
-      }
-    });
+  // (delegado no document para cobrir linhas carregadas via API)
+  document.addEventListener('click', function(e) {
+    const button = e.target.closest('[data-confirm]');
+    if (!button) return;
+    const confirmMessage = button.getAttribute('data-confirm');
+    if (!confirm(confirmMessage || 'Are you sure you want to delete this item?')) {
+      e.preventDefault();
+    }
   });
   
   // Toggle password visibility
@@ -14,6 +14,9 @@ function setupTableFilters() {
         const filterRow = document.createElement('tr');
         filterRow.className = 'filter-row';
         
+        // Tabelas com data-api-url são filtradas e paginadas no servidor
+        const serverSide = Boolean(table.dataset.apiUrl);
+        
         // Adicionar um campo de input para cada coluna
         headers.forEach((header, index) => {
             const cell = document.createElement('td');
@@ -25,6 +28,12 @@ function setupTableFilters() {
                 return;
             }
             
+            // No modo servidor, apenas colunas com data-filter podem ser filtradas
+            if (serverSide && !header.dataset.filter) {
+                filterRow.appendChild(cell);
+                return;
+            }
+            
             // Criar campo de filtro
             const input = document.createElement('input');
             input.type = 'text';
@@ -33,12 +42,22 @@ function setupTableFilters() {
             input.dataset.index = index;
             
             // Adicionar evento de filtro
-            input.addEventListener('input', () => filterTable(table));
+            if (serverSide) {
+                input.dataset.filter = header.dataset.filter;
+                input.addEventListener('input', () => scheduleServerFilter(table));
+            } else {
+                input.addEventListener('input', () => filterTable(table));
+            }
             
             cell.appendChild(input);
             filterRow.appendChild(cell);
         });
         
+        if (serverSide) {
+            setupServerSorting(table, headers);
+            setupLoadMore(table);
+        }
+        
         // Inserir a linha de filtros após o cabeçalho
         thead.appendChild(filterRow);
         
@@ -50,7 +69,11 @@ function setupTableFilters() {
             table.querySelectorAll('.filter-input').forEach(input => {
                 input.value = '';
             });
-            filterTable(table);
+            if (serverSide) {
+                loadServerPage(table, false);
+            } else {
+                filterTable(table);
+            }
         });
         
         // Inserir o botão antes da tabela
@@ -89,5 +112,92 @@ function filterTable(table) {
     });
 }
 
+/**
+ * Monta a URL da API com filtros, ordenação e cursor da tabela
+ */
+function buildListingUrl(table, append) {
+    const params = new URLSearchParams();
+    table.querySelectorAll('.filter-input').forEach(input => {
+        if (input.value.trim() !== '') {
+            params.set(input.dataset.filter, input.value.trim());
+        }
+    });
+    if (table.dataset.sort) {
+        params.set('sort', table.dataset.sort);
+    }
+    if (append && table.dataset.next) {
+        params.set('after', table.dataset.next);
+    }
+    return `${table.dataset.apiUrl}?${params.toString()}`;
+}
+
+/**
+ * Busca uma página no servidor; append=true adiciona ao final da tabela
+ */
+function loadServerPage(table, append) {
+    const tbody = table.querySelector('tbody');
+    const requestId = (table._requestId || 0) + 1;
+    table._requestId = requestId;
+    
+    fetch(buildListingUrl(table, append), { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(data => {
+            // Ignorar respostas de buscas já substituídas por outra mais recente
+            if (requestId !== table._requestId) {
+                return;
+            }
+            if (append) {
+                tbody.insertAdjacentHTML('beforeend', data.html);
+            } else {
+                tbody.innerHTML = data.html;
+            }
+            table.dataset.next = data.next || '';
+            updateLoadMore(table);
+        })
+        .catch(error => console.error('Error loading table page:', error));
+}
+
+/**
+ * Aguarda o usuário parar de digitar antes de consultar o servidor
+ */
+function scheduleServerFilter(table) {
+    clearTimeout(table._filterTimer);
+    table._filterTimer = setTimeout(() => loadServerPage(table, false), 300);
+}
+
+/**
+ * Ordenação no servidor ao clicar nos cabeçalhos com data-sort
+ */
+function setupServerSorting(table, headers) {
+    headers.filter(header => header.dataset.sort).forEach(header => {
+        header.style.cursor = 'pointer';
+        header.addEventListener('click', () => {
+            const field = header.dataset.sort;
+            table.dataset.sort = table.dataset.sort === field ? `-${field}` : field;
+            loadServerPage(table, false);
+        });
+    });
+}
+
+/**
+ * Botão "Carregar mais" para buscar a próxima página
+ */
+function setupLoadMore(table) {
+    const button = document.createElement('button');
+    button.type = 'button';
+    button.className = 'btn btn-sm btn-outline-primary mt-2 load-more';
+    button.textContent = 'Carregar mais';
+    button.addEventListener('click', () => loadServerPage(table, true));
+    table.parentNode.insertBefore(button, table.nextSibling);
+    table._loadMore = button;
+    updateLoadMore(table);
+}
+
+function updateLoadMore(table) {
+    if (table._loadMore) {
+        table._loadMore.style.display = table.dataset.next ? '' : 'none';
+    }
+}
+
 // Executar quando o DOM estiver carregado
 document.addEventListener('DOMContentLoaded', setupTableFilters);
\ No newline at end of file
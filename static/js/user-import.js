@@ -0,0 +1,93 @@
+// Importação de usuários em lote: envia o arquivo e lê o progresso em NDJSON
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.getElementById('userImportForm');
+    if (!form) return;
+
+    const report = document.getElementById('importReport');
+    const progress = document.getElementById('importProgress');
+    const status = document.getElementById('importStatus');
+    const errorsTable = document.getElementById('importErrors');
+    const errorsBody = errorsTable.querySelector('tbody');
+    const stageLabels = { validate: 'Validating', hash: 'Hashing passwords', insert: 'Creating users' };
+
+    function addErrorRow(event) {
+        const tr = document.createElement('tr');
+        const messages = Object.entries(event.errors)
+            .map(([field, errors]) => field + ': ' + errors.join(' '))
+            .join('; ');
+        [event.row, event.email, messages].forEach(function(value) {
+            const td = document.createElement('td');
+            td.textContent = value;
+            tr.appendChild(td);
+        });
+        errorsBody.appendChild(tr);
+        errorsTable.classList.remove('d-none');
+    }
+
+    function handleEvent(event) {
+        if (event.event === 'progress') {
+            const pct = event.total ? Math.round(100 * event.done / event.total) : 100;
+            progress.style.width = pct + '%';
+            progress.textContent = pct + '%';
+            status.textContent = stageLabels[event.stage] + ': ' + event.done + ' / ' + event.total;
+        } else if (event.event === 'error') {
+            addErrorRow(event);
+        } else if (event.event === 'done') {
+            progress.style.width = '100%';
+            if (event.error) {
+                progress.classList.add('bg-danger');
+                status.textContent = 'Import failed, no users were created: ' + event.error;
+            } else if (event.dry_run) {
+                status.textContent = event.valid + ' valid rows, ' + event.failed + ' with errors (nothing was created).';
+            } else {
+                progress.classList.add('bg-success');
+                status.textContent = event.created + ' users created, ' + event.failed + ' rows with errors.';
+            }
+        }
+    }
+
+    form.addEventListener('submit', async function(e) {
+        e.preventDefault();
+        const button = form.querySelector('button[type="submit"]');
+        button.disabled = true;
+        report.classList.remove('d-none');
+        errorsBody.innerHTML = '';
+        errorsTable.classList.add('d-none');
+        progress.className = 'progress-bar';
+        progress.style.width = '0%';
+        status.textContent = 'Uploading...';
+
+        try {
+            const response = await fetch(form.action, {
+                method: 'POST',
+                body: new FormData(form),
+                credentials: 'same-origin'
+            });
+            if (!response.ok) {
+                const body = await response.json().catch(() => ({}));
+                const errors = Object.values(body.errors || {}).flat();
+                status.textContent = errors.join(' ') || ('Import failed (' + response.status + ').');
+                progress.classList.add('bg-danger');
+                return;
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(Boolean).forEach(line => handleEvent(JSON.parse(line)));
+            }
+            if (buffer.trim()) handleEvent(JSON.parse(buffer));
+        } catch (err) {
+            status.textContent = 'Import failed: ' + err.message;
+            progress.classList.add('bg-danger');
+        } finally {
+            button.disabled = false;
+        }
+    });
+});
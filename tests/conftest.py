@@ -0,0 +1,118 @@
+"""
+Fixtures compartilhadas dos testes
+
+Cada teste recebe uma aplicação nova com um banco SQLite temporário já
+migrado. Os caches de processo (índice de acesso, usuário autenticado,
+fragmentos e páginas) são globais do módulo e são esvaziados a cada teste,
+já que os ids se repetem entre bancos.
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from sqlalchemy import event
+from app import create_app, db
+import migrate
+from access import access_index
+from fragments import dashboard_pages, fragment_cache
+from models import User, Company, Department, Dashboard, UserRole
+from user_cache import user_cache
+
+PASSWORD = 'Test@1234'
+
+TEST_CONFIG = {
+    'TESTING': True,
+    'WTF_CSRF_ENABLED': False,
+    'RATELIMIT_ENABLED': False,
+    'VIEW_EVENTS_ENABLED': False,
+    'COMPRESSION_ENABLED': False,
+    # Hash barato: os testes não medem o custo da política de senhas
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    'PASSWORD_HASH_WORKERS': 0,
+}
+
+def reset_caches():
+    access_index._entries.clear()
+    user_cache._backend = None
+    fragment_cache._backend = None
+    dashboard_pages.clear()
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Factory of migrated apps on a temporary SQLite file, with config overrides"""
+    apps = []
+
+    def build(**overrides):
+        url = 'sqlite:///' + str(tmp_path / f'test{len(apps)}.db')
+        application = create_app(SQLALCHEMY_DATABASE_URI=url, **{**TEST_CONFIG, **overrides})
+        with application.app_context():
+            migrate.upgrade(db.engine, log=lambda message: None)
+        apps.append(application)
+        return application
+
+    reset_caches()
+    yield build
+    for application in apps:
+        with application.app_context():
+            db.session.remove()
+            db.engine.dispose()
+    reset_caches()
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def login(client, user_id):
+    """Log a test client in as user_id without going through /login"""
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+def create_user(email, role=UserRole.USER, company=None, departments=(), password=PASSWORD):
+    user = User(name=email.split('@')[0], email=email, role=role, company_id=company.id if company else None)
+    user.set_password(password)
+    user.departments.extend(departments)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+def create_company(name, departments=1, dashboards_per_department=1):
+    """Company with its departments and dashboards; returns (company, departments)"""
+    company = Company(name=name)
+    db.session.add(company)
+    db.session.flush()
+    created = []
+    for d in range(departments):
+        department = Department(name=f'{name} D{d}', company_id=company.id)
+        db.session.add(department)
+        db.session.flush()
+        for b in range(dashboards_per_department):
+            db.session.add(Dashboard(name=f'{name} D{d} B{b}', power_bi_link='https://app.powerbi.com/view?r=x',
+                                     department_id=department.id))
+        created.append(department)
+    db.session.flush()
+    return company, created
+
+@contextmanager
+def count_queries(engine):
+    """Count (and keep) the SQL statements executed on engine inside the block"""
+    counter = {'queries': 0, 'statements': []}
+
+    def count(conn, cursor, statement, *args):
+        counter['queries'] += 1
+        counter['statements'].append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
@@ -0,0 +1,43 @@
+"""
+Minificador de JavaScript embutido (build_assets.minify_js sem o rjsmin)
+"""
+import sys
+import pytest
+from build_assets import minify_js
+
+@pytest.fixture(autouse=True)
+def without_rjsmin(monkeypatch):
+    # None em sys.modules faz o import levantar ImportError
+    monkeypatch.setitem(sys.modules, 'rjsmin', None)
+
+def test_removes_whole_line_comments():
+    source = (
+        '/* header\n'
+        '   comment */\n'
+        'var a = 1;\n'
+        '\n'
+        '    // line comment\n'
+        '    /* one-liner */\n'
+        '    var b = 2;\n'
+    )
+    assert minify_js(source) == 'var a = 1;\nvar b = 2;\n'
+
+def test_keeps_code_between_comments():
+    # Antes, /\*.*?\*/ ia do primeiro /* até o último */ e apagava init() e run()
+    source = (
+        '/* setup */ init();\n'
+        'run();\n'
+        '/* done */\n'
+    )
+    assert minify_js(source) == '/* setup */ init();\nrun();\n'
+
+def test_keeps_code_after_multiline_comment():
+    source = (
+        '/* starts\n'
+        '   here */ var c = 3;\n'
+        'var d = 4; /* trailing */\n'
+    )
+    assert minify_js(source) == '/* starts\nhere */ var c = 3;\nvar d = 4; /* trailing */\n'
+
+def test_keeps_unterminated_comment():
+    assert minify_js('/* open\nvar e = 5;\n') == '/* open\nvar e = 5;\n'
@@ -0,0 +1,59 @@
+"""
+ETag da grade de dashboards e o corpo servido do cache de fragmentos
+
+As alterações são gravadas direto no banco (sem o evento de flush da sessão
+deste processo), como se outro worker tivesse editado o dashboard: a versão
+local dos fragmentos não muda.
+"""
+import os
+from sqlalchemy import update
+from app import db
+import conditional
+from fragments import fragment_cache
+from models import Dashboard, Department, UserRole
+from conftest import create_company, create_user, login
+
+def setup_master(app):
+    with app.app_context():
+        company, departments = create_company('Tenant', departments=2)
+        master = create_user('master@example.com', UserRole.MASTER, company)
+        db.session.commit()
+        return master.id, departments[0].id, departments[0].dashboards[0].id
+
+def rename(app, model, row_id, name):
+    with app.app_context():
+        db.session.execute(update(model).where(model.id == row_id).values(name=name))
+        db.session.commit()
+
+def test_body_follows_etag_when_fragment_version_is_stale(app, client):
+    master_id, department_id, dashboard_id = setup_master(app)
+    login(client, master_id)
+
+    for url in ['/dashboard', f'/dashboard/department/{department_id}']:
+        first = client.get(url)
+        version = fragment_cache.version
+        rename(app, Dashboard, dashboard_id, f'Renamed {url}')
+        assert fragment_cache.version == version
+
+        second = client.get(url)
+        assert second.headers['ETag'] != first.headers['ETag']
+        assert f'Renamed {url}' in second.get_data(as_text=True)
+        # O navegador revalida com a ETag nova: 304 e fica com o corpo novo
+        again = client.get(url, headers={'If-None-Match': second.headers['ETag']})
+        assert again.status_code == 304
+
+def test_renamed_department_changes_the_grid(app, client):
+    master_id, department_id, _ = setup_master(app)
+    login(client, master_id)
+    first = client.get('/dashboard')
+
+    rename(app, Department, department_id, 'Renamed department')
+    second = client.get('/dashboard')
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert 'Renamed department' in second.get_data(as_text=True)
+
+def test_release_is_stable_across_workers():
+    if not (os.environ.get('RELEASE') or os.environ.get('VERCEL_GIT_COMMIT_SHA')):
+        # Mesmo código e templates: mesmo valor em qualquer processo, sem depender da hora
+        assert conditional.RELEASE == conditional.source_fingerprint()
+    assert conditional.source_fingerprint() == conditional.source_fingerprint()
@@ -0,0 +1,53 @@
+"""
+Acesso a um dashboard verificado no banco, não no índice de acesso em cache
+
+Os dashboards são movidos ou excluídos direto no banco, como se outro worker
+tivesse feito a alteração; o índice de acesso deste processo continua quente.
+"""
+import pytest
+from sqlalchemy import delete, update
+from app import db
+from models import Dashboard, UserRole
+from conftest import create_company, create_user, login
+
+@pytest.fixture(params=[UserRole.USER, UserRole.ADMIN])
+def scenario(request, app, client):
+    """(dashboard id, department of the same company, department of another company)"""
+    with app.app_context():
+        company, departments = create_company('Tenant', departments=2)
+        _, others = create_company('Other')
+        member_of = departments[:1] if request.param == UserRole.USER else ()
+        user = create_user('user@example.com', request.param, company, member_of)
+        db.session.commit()
+        result = (departments[0].dashboards[0].id, departments[1].id, others[0].id, request.param)
+        user_id = user.id
+    login(client, user_id)
+    return result
+
+def move(app, dashboard_id, department_id):
+    with app.app_context():
+        db.session.execute(update(Dashboard).where(Dashboard.id == dashboard_id).values(department_id=department_id))
+        db.session.commit()
+
+def test_moved_dashboard_is_forbidden(app, client, scenario):
+    dashboard_id, same_company, other_company, role = scenario
+    assert client.get('/dashboard').status_code == 200  # índice de acesso em cache
+    assert client.get(f'/dashboard/view/{dashboard_id}').status_code == 200
+
+    move(app, dashboard_id, same_company)
+    # Usuário comum só vê os próprios departamentos; admin, toda a empresa
+    expected = 403 if role == UserRole.USER else 200
+    assert client.get(f'/dashboard/view/{dashboard_id}').status_code == expected
+
+    move(app, dashboard_id, other_company)
+    assert client.get(f'/dashboard/view/{dashboard_id}').status_code == 403
+    assert client.get(f'/api/dashboards/{dashboard_id}/embed-token').status_code == 403
+
+def test_deleted_dashboard_is_not_found(app, client, scenario):
+    dashboard_id = scenario[0]
+    assert client.get(f'/dashboard/view/{dashboard_id}').status_code == 200
+
+    with app.app_context():
+        db.session.execute(delete(Dashboard).where(Dashboard.id == dashboard_id))
+        db.session.commit()
+    assert client.get(f'/dashboard/view/{dashboard_id}').status_code == 404
@@ -0,0 +1,186 @@
+"""
+Varredura dos links dos dashboards (dashboard_health.sweep) contra um servidor local
+
+O servidor imita os links do Power BI: 200, 404, resposta chunked, um link
+que não responde dentro do timeout e uma resposta que não é HTTP.
+"""
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from sqlalchemy import select
+from app import db
+import dashboard_health
+from dashboard_health import HealthChecker, sweep
+from models import Dashboard, DashboardHealth
+from conftest import create_company
+
+TIMEOUT = 0.3
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.count(self.path)
+        kind = self.path.strip('/').split('/')[0]
+        if kind == 'hang':
+            time.sleep(TIMEOUT * 3)
+        if kind == 'garbage':
+            # Resposta que não é HTTP, com a conexão mantida aberta
+            self.wfile.write(b'garbage\r\n\r\n')
+            return
+        if kind == 'chunked':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for part in (b'<html>', b'report', b'</html>'):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(part), part))
+            self.wfile.write(b'0\r\n\r\n')
+            return
+        body = b'<html>report</html>'
+        self.send_response(404 if kind == 'missing' else 200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.requests = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, path):
+        with self._lock:
+            self.requests[path] += 1
+
+    def handle_error(self, request, client_address):
+        # O cliente fecha a conexão do link "hang" no timeout
+        pass
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def add_dashboards(stub, paths, inactive=()):
+    """One active dashboard per path (and inactive ones); returns {path: [dashboard ids]}"""
+    company, departments = create_company('Tenant', dashboards_per_department=0)
+    ids = {}
+    for i, path in enumerate(list(paths) + list(inactive)):
+        dashboard = Dashboard(name=f'Dashboard {i}', power_bi_link=stub.url(path),
+                              department_id=departments[0].id, is_active=path not in inactive)
+        db.session.add(dashboard)
+        db.session.flush()
+        ids.setdefault(path, []).append(dashboard.id)
+    db.session.commit()
+    return ids
+
+def health_rows():
+    return {row.dashboard_id: row for row in db.session.execute(select(DashboardHealth)).scalars()}
+
+@pytest.fixture
+def health_app(make_app):
+    return make_app(DASHBOARD_HEALTH_TIMEOUT=TIMEOUT, DASHBOARD_HEALTH_TTL=900)
+
+def test_sweep_records_status_latency_and_error(health_app, stub):
+    with health_app.app_context():
+        ids = add_dashboards(stub, ['/ok/1', '/missing/1', '/chunked/1', '/hang/1'], inactive=['/ok/2'])
+        summary = sweep()
+        rows = health_rows()
+
+    assert summary['dashboards'] == 4
+    assert summary['checked'] == 4
+    assert summary['failed'] == 2
+    assert '/ok/2' not in stub.requests
+    assert ids['/ok/2'][0] not in rows
+
+    ok = rows[ids['/ok/1'][0]]
+    assert (ok.ok, ok.status_code, ok.error, ok.url) == (True, 200, None, stub.url('/ok/1'))
+    assert 0 <= ok.latency_ms < TIMEOUT * 1000
+
+    missing = rows[ids['/missing/1'][0]]
+    assert (missing.ok, missing.status_code, missing.error) == (False, 404, 'HTTP 404')
+    assert missing.latency_ms is not None
+
+    chunked = rows[ids['/chunked/1'][0]]
+    assert (chunked.ok, chunked.status_code, chunked.error) == (True, 200, None)
+
+    hang = rows[ids['/hang/1'][0]]
+    assert (hang.ok, hang.status_code, hang.latency_ms) == (False, None, None)
+    assert hang.error == f'timeout after {TIMEOUT}s'
+
+def test_duplicate_links_are_checked_once(health_app, stub):
+    with health_app.app_context():
+        ids = add_dashboards(stub, ['/ok/1', '/ok/1', '/ok/1', '/missing/1'])
+        summary = sweep()
+        rows = health_rows()
+
+    assert (summary['checked'], summary['urls']) == (4, 2)
+    assert stub.requests == {'/ok/1': 1, '/missing/1': 1}
+    assert {(rows[i].ok, rows[i].status_code) for i in ids['/ok/1']} == {(True, 200)}
+
+def test_recent_results_are_reused(health_app, stub):
+    with health_app.app_context():
+        ids = add_dashboards(stub, ['/ok/1', '/missing/1'])
+        sweep()
+        first = {i: (row.checked_at, row.latency_ms) for i, row in health_rows().items()}
+        stub.requests.clear()
+
+        # Dentro do TTL: nenhuma requisição
+        assert sweep()['checked'] == 0
+        assert not stub.requests
+
+        # Um dashboard novo com um link já verificado herda o resultado
+        new_id = add_dashboards(stub, ['/ok/1'])['/ok/1'][0]
+        summary = sweep()
+        rows = health_rows()
+        assert (summary['checked'], summary['reused']) == (0, 1)
+        assert not stub.requests
+        assert (rows[new_id].checked_at, rows[new_id].latency_ms) == first[ids['/ok/1'][0]]
+
+        # Link alterado: verificado de novo mesmo dentro do TTL
+        db.session.get(Dashboard, new_id).power_bi_link = stub.url('/missing/2')
+        db.session.commit()
+        assert sweep()['checked'] == 1
+        assert stub.requests == {'/missing/2': 1}
+
+        # TTL vencido: todos são verificados de novo
+        stub.requests.clear()
+        health_app.config['DASHBOARD_HEALTH_TTL'] = 0
+        assert sweep()['checked'] == 3
+        assert stub.requests == {'/ok/1': 1, '/missing/1': 1, '/missing/2': 1}
+
+def test_failed_requests_close_their_connections(stub, monkeypatch):
+    opened = []
+    connect = dashboard_health.HostPool.connect
+
+    async def recording_connect(pool):
+        connection = await connect(pool)
+        opened.append(connection[1])
+        return connection
+
+    monkeypatch.setattr(dashboard_health.HostPool, 'connect', recording_connect)
+    urls = [stub.url('/hang/1'), stub.url('/garbage/1'), stub.url('/ok/1')]
+    results = HealthChecker(timeout=TIMEOUT, per_host=3).run(urls)
+
+    assert results[stub.url('/hang/1')].error == f'timeout after {TIMEOUT}s'
+    assert results[stub.url('/garbage/1')].error.startswith('invalid status line')
+    assert results[stub.url('/ok/1')].ok
+    assert len(opened) == 3
+    # Timeout e resposta inválida: conexão fechada, não deixada aberta para a próxima varredura
+    assert all(writer.is_closing() for writer in opened)
@@ -0,0 +1,110 @@
+"""
+Falhas do provedor de tokens de embed chegam às rotas como EmbedTokenError
+(503), nunca como exceções genéricas (500)
+"""
+import threading
+import time
+import pytest
+import routes
+from app import db
+from embed_tokens import EmbedToken, EmbedTokenError, EmbedTokenService, PowerBIProvider, TokenProvider
+from models import UserRole
+from conftest import create_company, create_user, login
+
+EMBED_LINK = 'https://app.powerbi.com/reportEmbed?reportId=report-1&groupId=workspace-1'
+
+class FakeProvider(TokenProvider):
+    """Tokens valid for lifetime seconds; raises error instead when set"""
+
+    def __init__(self, lifetime=3600, error=None):
+        self.lifetime = lifetime
+        self.error = error
+        self.release = threading.Event()
+        self.release.set()
+
+    def generate(self, workspace_id, report_id):
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return EmbedToken(f'token-{report_id}', None, 'https://app.powerbi.com/reportEmbed',
+                          time.time() + self.lifetime)
+
+class PayloadProvider(PowerBIProvider):
+    """PowerBIProvider answering every request with a fixed payload"""
+
+    def __init__(self, payload):
+        super().__init__('tenant', 'client', 'secret')
+        self.payload = payload
+
+    def _request(self, url, data, headers):
+        return dict(self.payload)
+
+@pytest.mark.parametrize('payload', [
+    {'access_token': 'aad'},
+    {'access_token': 'aad', 'token': 'embed'},
+    {'access_token': 'aad', 'token': 'embed', 'expiration': 'tomorrow'},
+])
+def test_malformed_generate_token_response(payload):
+    with pytest.raises(EmbedTokenError):
+        PayloadProvider(payload).generate('workspace-1', 'report-1')
+
+def test_malformed_azure_ad_response():
+    with pytest.raises(EmbedTokenError):
+        PayloadProvider({'expires_in': 3600}).access_token()
+
+def test_unexpected_provider_error_is_wrapped(app):
+    with app.app_context():
+        service = EmbedTokenService(FakeProvider(error=KeyError('token')))
+        with pytest.raises(EmbedTokenError):
+            service.get('workspace-1', 'report-1')
+
+def test_follower_timeout_is_wrapped(make_app):
+    app = make_app(EMBED_TOKEN_TIMEOUT=0.05)
+    provider = FakeProvider()
+    provider.release.clear()
+    with app.app_context():
+        service = EmbedTokenService(provider)
+        service._config()
+    leader = threading.Thread(target=service._fetch, args=(('workspace-1', 'report-1'),))
+    leader.start()
+    try:
+        while ('workspace-1', 'report-1') not in service._inflight:
+            time.sleep(0.001)
+        with pytest.raises(EmbedTokenError):
+            service._fetch(('workspace-1', 'report-1'))
+    finally:
+        provider.release.set()
+        leader.join()
+
+def test_new_token_survives_eviction(make_app):
+    app = make_app(EMBED_TOKEN_CACHE_SIZE=1, EMBED_TOKEN_MIN_VALIDITY=0)
+    with app.app_context():
+        service = EmbedTokenService(FakeProvider(lifetime=3600))
+        service.get('workspace-1', 'long-lived')
+        # O novo token vence antes do que já está em cache, mas é o que acabou de ser pedido
+        service._provider.lifetime = 60
+        token = service.get('workspace-1', 'short-lived')
+    assert list(service._entries) == [('workspace-1', 'short-lived')]
+    assert service._entries[('workspace-1', 'short-lived')].token is token
+
+def test_route_returns_503_on_provider_failure(app, client, monkeypatch):
+    with app.app_context():
+        company, departments = create_company('Tenant')
+        master = create_user('master@example.com', UserRole.MASTER, company)
+        dashboard = departments[0].dashboards[0]
+        dashboard.power_bi_link = EMBED_LINK
+        db.session.commit()
+        master_id, dashboard_id = master.id, dashboard.id
+    monkeypatch.setattr(routes, 'embed_tokens', EmbedTokenService(FakeProvider(error=ValueError('bad'))))
+    login(client, master_id)
+
+    response = client.get(f'/api/dashboards/{dashboard_id}/embed-token')
+    assert response.status_code == 503
+    assert response.get_json() == {'error': 'Power BI token service unavailable'}
+
+def test_provider_must_implement_generate():
+    class Incomplete(TokenProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
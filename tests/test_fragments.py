@@ -0,0 +1,61 @@
+"""
+Versão do cache de fragmentos: muda no commit de gravações em Company,
+Department ou Dashboard, nunca no flush nem num rollback
+"""
+from app import db
+from fragments import fragment_cache
+from models import Dashboard, User
+from conftest import create_company
+
+def setup_dashboard(app):
+    with app.app_context():
+        _, departments = create_company('Tenant')
+        db.session.commit()
+        return departments[0].dashboards[0].id
+
+def test_version_changes_on_commit_not_on_flush(app):
+    dashboard_id = setup_dashboard(app)
+    with app.app_context():
+        version = fragment_cache.version
+        db.session.get(Dashboard, dashboard_id).name = 'Renamed'
+        db.session.flush()
+        # Flush sem commit: outro request ainda lê os dados antigos e não pode guardá-los sob a versão nova
+        assert fragment_cache.version == version
+        db.session.commit()
+        assert fragment_cache.version == version + 1
+
+        # Commit sem novas gravações não muda de novo
+        db.session.commit()
+        assert fragment_cache.version == version + 1
+
+def test_rolled_back_flush_keeps_version(app):
+    dashboard_id = setup_dashboard(app)
+    with app.app_context():
+        version = fragment_cache.version
+        db.session.get(Dashboard, dashboard_id).name = 'Discarded'
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+        assert fragment_cache.version == version
+        assert db.session.get(Dashboard, dashboard_id).name != 'Discarded'
+
+def test_savepoint_rollback_keeps_earlier_writes(app):
+    dashboard_id = setup_dashboard(app)
+    with app.app_context():
+        version = fragment_cache.version
+        db.session.get(Dashboard, dashboard_id).name = 'Kept'
+        db.session.flush()
+        with db.session.begin_nested() as savepoint:
+            db.session.get(Dashboard, dashboard_id).description = 'Discarded'
+            db.session.flush()
+            savepoint.rollback()
+        db.session.commit()
+        assert fragment_cache.version == version + 1
+
+def test_other_models_keep_version(app):
+    setup_dashboard(app)
+    with app.app_context():
+        version = fragment_cache.version
+        db.session.add(User(name='Someone', email='someone@example.com', password_hash='x', role='user'))
+        db.session.commit()
+        assert fragment_cache.version == version
@@ -0,0 +1,76 @@
+"""
+Cursores de paginação (?after=) adulterados
+
+O cursor vem da URL; um valor que não bate com a coluna de ordenação é
+ignorado (primeira página), em vez de chegar à comparação no banco.
+"""
+import base64
+import json
+import pytest
+from app import db
+from models import UserRole
+from conftest import create_company, create_user, login
+
+APIS = ['/api/users', '/api/companies', '/api/departments/list', '/api/dashboards']
+PAGES = ['/users', '/companies', '/departments', '/dashboards/manage']
+
+def cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+TAMPERED = [
+    cursor([{'a': 1}, 1]),
+    cursor([[1, 2], 1]),
+    cursor([None, 1]),
+    cursor([True, 1]),
+    cursor([2 ** 70, 1]),
+    cursor(['Tenant', 2 ** 70]),
+    cursor(['Tenant', '1']),
+    cursor({'a': 1, 'b': 2}),
+    cursor('x'),
+    'not base64!',
+]
+
+@pytest.fixture
+def master_client(app, client):
+    with app.app_context():
+        company, _ = create_company('Tenant', departments=3, dashboards_per_department=2)
+        master = create_user('master@example.com', UserRole.MASTER, company)
+        for i in range(3):
+            create_user(f'user{i}@example.com', UserRole.USER, company)
+        db.session.commit()
+        master_id = master.id
+    login(client, master_id)
+    return client
+
+@pytest.mark.parametrize('after', TAMPERED)
+@pytest.mark.parametrize('url', APIS)
+def test_tampered_cursor_returns_first_page(master_client, url, after):
+    for sort in ('name', 'id', '-id'):
+        response = master_client.get(f'{url}?limit=2&sort={sort}&after={after}')
+        assert response.status_code == 200, (sort, after)
+        expected = master_client.get(f'{url}?limit=2&sort={sort}').get_json()
+        assert response.get_json()['items'] == expected['items']
+
+@pytest.mark.parametrize('url', PAGES)
+def test_tampered_cursor_on_pages(master_client, url):
+    for after in TAMPERED:
+        assert master_client.get(f'{url}?sort=id&after={after}').status_code == 200
+
+@pytest.mark.parametrize('sort', ['name', 'id'])
+def test_cursor_of_another_sort_is_ignored(master_client, sort):
+    # Cursor de ?sort=name (texto) reutilizado com ?sort=id (inteiro) e vice-versa
+    other = 'id' if sort == 'name' else 'name'
+    after = master_client.get(f'/api/users?limit=2&sort={other}').get_json()['next']
+    response = master_client.get(f'/api/users?limit=2&sort={sort}&after={after}')
+    assert response.status_code == 200
+    assert response.get_json()['items'] == master_client.get(f'/api/users?limit=2&sort={sort}').get_json()['items']
+
+def test_valid_cursor_pages_through(master_client):
+    seen = []
+    url = '/api/users?limit=2&sort=-name'
+    while url:
+        page = master_client.get(url).get_json()
+        seen += [item['name'] for item in page['items']]
+        url = page['next'] and f"/api/users?limit=2&sort=-name&after={page['next']}"
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == 4
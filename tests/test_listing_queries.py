@@ -0,0 +1,52 @@
+"""
+As páginas de administração executam um número de consultas que não depende
+da quantidade de linhas (sem N+1 nas relações das listagens)
+"""
+import pytest
+from app import db
+from models import Department, Dashboard, UserRole
+from conftest import count_queries, create_company, create_user, login
+
+PAGES = ['/users', '/departments', '/dashboards/manage']
+
+def add_rows(company, start, count):
+    """count departments in company, each with 2 dashboards and 2 member users"""
+    for d in range(start, start + count):
+        department = Department(name=f'Department {d:03d}', company_id=company.id)
+        db.session.add(department)
+        db.session.flush()
+        for b in range(2):
+            db.session.add(Dashboard(name=f'Dashboard {d:03d}-{b}', power_bi_link='https://app.powerbi.com/view?r=x',
+                                     department_id=department.id))
+            create_user(f'user{d}-{b}@example.com', UserRole.USER, company, [department])
+    db.session.commit()
+
+def page_queries(client, path):
+    client.get(path).close()  # aquecimento: consultas únicas por processo não entram na conta
+    with count_queries(db.engine) as counter:
+        response = client.get(path)
+        # Corpo lido dentro do bloco: páginas em streaming consultam durante a renderização
+        response.get_data()
+        response.close()
+    assert response.status_code == 200
+    return counter['queries']
+
+@pytest.mark.parametrize('role', [UserRole.MASTER, UserRole.ADMIN])
+def test_admin_pages_run_a_constant_number_of_queries(make_app, role):
+    # Sem caches: mede as consultas de cada request, não o acerto no cache
+    app = make_app(USER_CACHE_TTL=0, ACCESS_INDEX_TTL=0, FRAGMENT_CACHE_TTL=0)
+    client = app.test_client()
+    with app.app_context():
+        company, _ = create_company('Tenant', departments=0)
+        create_company('Other', departments=2)
+        viewer = create_user('viewer@example.com', role, None if role == UserRole.MASTER else company)
+        db.session.commit()
+        login(client, viewer.id)
+
+        add_rows(company, 0, 2)
+        small = {path: page_queries(client, path) for path in PAGES}
+        # Mais que uma página (ADMIN_PAGE_SIZE) de usuários, departamentos e dashboards
+        add_rows(company, 2, 60)
+        large = {path: page_queries(client, path) for path in PAGES}
+
+    assert small == large
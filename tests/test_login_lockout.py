@@ -0,0 +1,87 @@
+"""
+Bloqueio por tentativas de login falhas sob concorrência (login_attempts.py)
+"""
+import threading
+from sqlalchemy import update
+from app import db
+from login_attempts import reset_failed_logins
+from models import User
+from conftest import PASSWORD, count_queries, create_user
+
+LOCKED_MESSAGE = 'Too many failed login attempts'
+
+def post_login(client, password):
+    response = client.post('/login', data={'email': 'user@example.com', 'password': password})
+    return response.status_code, response.get_data(as_text=True)
+
+def load_user(app):
+    with app.app_context():
+        user = db.session.execute(db.select(User).filter_by(email='user@example.com')).scalar_one()
+        return user.failed_login_attempts, user.is_locked
+
+def test_concurrent_failures_lock_at_exactly_the_limit(app):
+    with app.app_context():
+        create_user('user@example.com')
+        db.session.commit()
+    limit = app.config['MAX_FAILED_LOGIN_ATTEMPTS']
+
+    threads, attempts = 16, 4
+    barrier = threading.Barrier(threads)
+    responses = []
+    lock = threading.Lock()
+
+    def hammer():
+        client = app.test_client()
+        barrier.wait()
+        for _ in range(attempts):
+            result = post_login(client, 'Wrong@1234')
+            with lock:
+                responses.append(result)
+
+    workers = [threading.Thread(target=hammer) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(responses) == threads * attempts
+    assert all(status == 200 for status, _ in responses)
+    # Exatamente uma tentativa (a de número `limit`) bloqueou a conta
+    assert sum(LOCKED_MESSAGE in body for _, body in responses) == 1
+    assert load_user(app) == (limit, True)
+
+    status, body = post_login(app.test_client(), PASSWORD)
+    assert status == 200 and 'Account is locked' in body
+
+def test_failures_below_the_limit_are_reset_by_a_successful_login(app):
+    with app.app_context():
+        create_user('user@example.com')
+        db.session.commit()
+    client = app.test_client()
+    for _ in range(app.config['MAX_FAILED_LOGIN_ATTEMPTS'] - 1):
+        post_login(client, 'Wrong@1234')
+
+    status, _ = post_login(client, PASSWORD)
+    assert status == 302
+    assert load_user(app) == (0, False)
+
+def test_lock_after_the_user_was_loaded_refuses_the_login(app):
+    with app.app_context():
+        user = create_user('user@example.com')
+        user.failed_login_attempts = 4
+        db.session.commit()
+        # Bloqueio gravado por outro request depois que este carregou o usuário
+        db.session.execute(update(User).where(User.id == user.id).values(failed_login_attempts=5, is_locked=True)
+                           .execution_options(synchronize_session=False))
+        assert user.failed_login_attempts == 4
+        assert reset_failed_logins(user) is False
+    assert load_user(app) == (5, True)
+
+def test_login_without_previous_failures_writes_nothing(app):
+    with app.app_context():
+        user = create_user('user@example.com')
+        db.session.commit()
+        with count_queries(db.engine) as counter:
+            assert reset_failed_logins(user) is True
+    assert not [s for s in counter['statements'] if s.lstrip().upper().startswith('UPDATE')]
+    assert load_user(app) == (0, False)
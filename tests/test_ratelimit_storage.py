@@ -0,0 +1,42 @@
+"""
+SQLStorage (ratelimit_storage.py): contadores com gravação em lote e sem
+consultas ao banco no caminho do request depois da primeira leitura
+"""
+import pytest
+from ratelimit_storage import SQLStorage
+from conftest import count_queries
+
+@pytest.fixture
+def storage_url(tmp_path):
+    return 'sqlalchemy+sqlite:///' + str(tmp_path / 'limits.db')
+
+def selects(counter):
+    return [s for s in counter['statements'] if s.lstrip().upper().startswith('SELECT')]
+
+def test_missing_key_is_read_once(storage_url):
+    storage = SQLStorage(storage_url, flush_interval=60)
+    storage.get('missing')
+    with count_queries(storage.engine) as counter:
+        for _ in range(100):
+            assert storage.get('missing') == 0
+            storage.get_expiry('missing')
+    assert selects(counter) == []
+
+def test_sliding_window_reads_each_key_once_per_window(storage_url):
+    storage = SQLStorage(storage_url, flush_interval=60)
+    with count_queries(storage.engine) as counter:
+        allowed = [storage.acquire_sliding_window_entry('login/1.2.3.4', 5, 3600) for _ in range(20)]
+    assert allowed == [True] * 5 + [False] * 15
+    # Janela anterior (vazia) e atual: um SELECT cada, não um por tentativa
+    assert len(selects(counter)) == 2
+
+def test_workers_share_counts_after_flush(storage_url):
+    first = SQLStorage(storage_url, flush_interval=60)
+    second = SQLStorage(storage_url, flush_interval=60)
+    for _ in range(3):
+        first.incr('key', 60)
+    first.flush()
+    assert second.get('key') == 3
+    second.incr('key', 60)
+    second.flush()
+    assert second.get('key') == 4
@@ -0,0 +1,92 @@
+"""
+Listagens completas (?all=1) de usuários e dashboards
+
+O pico de memória do modo streamed não deve crescer com o número de linhas;
+o link "Show all" mantém os filtros e a ordenação da página atual.
+"""
+import re
+import tracemalloc
+from html import unescape
+from urllib.parse import parse_qs, urlsplit
+import pytest
+from sqlalchemy import insert
+from app import db
+from models import Dashboard, User, UserRole, user_department
+from conftest import create_company, create_user, login
+
+LISTINGS = ['/users?all=1', '/dashboards/manage?all=1']
+
+def seed_listing(app, rows):
+    """Master user plus rows users and rows dashboards in one department; returns the master id"""
+    with app.app_context():
+        company, departments = create_company('Tenant', dashboards_per_department=0)
+        master = create_user('master@example.com', UserRole.MASTER, company)
+        department_id = departments[0].id
+        for start in range(0, rows, 10000):
+            ids = range(start, min(start + 10000, rows))
+            db.session.execute(insert(User), [
+                {'name': f'User {i:06d}', 'email': f'user{i}@example.com', 'password_hash': 'x',
+                 'role': UserRole.USER, 'company_id': company.id} for i in ids
+            ])
+            db.session.execute(insert(Dashboard), [
+                {'name': f'Dashboard {i:06d}', 'power_bi_link': 'https://app.powerbi.com/view?r=x',
+                 'department_id': department_id} for i in ids
+            ])
+        db.session.execute(insert(user_department).from_select(
+            ['user_id', 'department_id'],
+            db.select(User.id, db.literal(department_id)).where(User.id != master.id)
+        ))
+        db.session.commit()
+        return master.id
+
+def streamed_peak(client, url):
+    """Peak traced memory while the response is generated, and its size"""
+    tracemalloc.start()
+    try:
+        response = client.get(url, buffered=False)
+        assert response.status_code == 200
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, size
+
+@pytest.mark.slow
+def test_streamed_listing_memory_is_flat(make_app):
+    peaks = {}
+    for rows in (1000, 100000):
+        app = make_app()
+        master_id = seed_listing(app, rows)
+        client = app.test_client()
+        login(client, master_id)
+        for url in LISTINGS:
+            client.get(url).close()  # aquece caches e templates
+            peaks[url, rows] = streamed_peak(client, url)
+
+    for url in LISTINGS:
+        small_peak, small_size = peaks[url, 1000]
+        large_peak, large_size = peaks[url, 100000]
+        assert large_size > 50 * small_size
+        # 100x mais linhas (dezenas de MB de HTML) sem o pico acompanhar
+        assert large_peak < 2 * small_peak, (url, small_peak, large_peak)
+
+def show_all_link(html):
+    match = re.search(r'<a href="([^"]+)" class="small">Show all</a>', html)
+    assert match, 'Show all link not rendered'
+    return parse_qs(urlsplit(unescape(match.group(1))).query)
+
+@pytest.mark.parametrize('url', ['/users', '/dashboards/manage'])
+def test_show_all_keeps_filters_and_sort(make_app, url):
+    app = make_app(ADMIN_PAGE_SIZE=1)
+    master_id = seed_listing(app, 5)
+    client = app.test_client()
+    login(client, master_id)
+
+    first = client.get(f'{url}?q=0&sort=-name').get_data(as_text=True)
+    assert show_all_link(first) == {'q': ['0'], 'sort': ['-name'], 'all': ['1']}
+
+    after = re.search(r'data-next="([^"]+)"', first).group(1)
+    second = client.get(f'{url}?q=0&sort=-name&after={after}&limit=1').get_data(as_text=True)
+    # A posição da página (after/limit) não vai para a listagem completa
+    assert show_all_link(second) == {'q': ['0'], 'sort': ['-name'], 'all': ['1']}
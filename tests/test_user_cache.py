@@ -0,0 +1,107 @@
+"""
+O principal em cache acompanha alterações feitas em outro worker
+
+As alterações abaixo são gravadas direto no banco, como se tivessem sido
+feitas por outro processo: com a invalidação pelo backend compartilhado
+(o que as rotas fazem) valem no request seguinte; sem ela, na próxima
+conferência de users.updated_at (USER_CACHE_REVALIDATE). Os requests rodam
+fora do app_context do teste (cada um com o próprio g e a própria sessão).
+"""
+import time
+from sqlalchemy import delete, update
+from app import db
+from memberships import sync_user_departments
+from models import User, UserRole
+from user_cache import user_cache
+from conftest import count_queries, create_company, create_user, login
+
+def create_admin(app):
+    with app.app_context():
+        company, _ = create_company('Tenant')
+        admin = create_user('admin@example.com', UserRole.ADMIN, company)
+        db.session.commit()
+        return admin.id
+
+def demote(app, user_id, invalidate=True):
+    with app.app_context():
+        db.session.execute(update(User).where(User.id == user_id).values(role=UserRole.USER))
+        db.session.commit()
+        if invalidate:
+            user_cache.invalidate(user_id)
+
+def test_demoted_admin_loses_admin_pages(app, client):
+    admin_id = create_admin(app)
+    login(client, admin_id)
+    assert client.get('/users').status_code == 200
+
+    demote(app, admin_id)
+    assert client.get('/users').status_code == 403
+
+def test_deleted_user_is_logged_out(app, client):
+    admin_id = create_admin(app)
+    login(client, admin_id)
+    assert client.get('/dashboard').status_code == 200
+
+    with app.app_context():
+        db.session.execute(delete(User).where(User.id == admin_id))
+        db.session.commit()
+        user_cache.invalidate(admin_id)
+    response = client.get('/dashboard')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+def test_removed_membership_revokes_dashboard_access(app, client):
+    with app.app_context():
+        company, departments = create_company('Tenant', departments=2)
+        user = create_user('user@example.com', UserRole.USER, company, departments)
+        db.session.commit()
+        user_id, kept_id = user.id, departments[0].id
+        dashboard_id = departments[1].dashboards[0].id
+    login(client, user_id)
+    assert client.get(f'/dashboard/view/{dashboard_id}').status_code == 200
+
+    with app.app_context():
+        sync_user_departments(user_id, [kept_id])
+        db.session.commit()
+        user_cache.invalidate(user_id)
+    assert client.get(f'/dashboard/view/{dashboard_id}').status_code == 403
+
+def test_change_without_invalidation_is_seen_after_revalidation(make_app):
+    app = make_app(USER_CACHE_REVALIDATE=0.2)
+    client = app.test_client()
+    admin_id = create_admin(app)
+    login(client, admin_id)
+    assert client.get('/users').status_code == 200
+
+    demote(app, admin_id, invalidate=False)
+    # Dentro do intervalo o snapshot em cache ainda vale; depois, users.updated_at é conferido
+    assert client.get('/users').status_code == 200
+    time.sleep(0.25)
+    assert client.get('/users').status_code == 403
+
+def test_cache_hit_runs_no_user_query(app, client):
+    admin_id = create_admin(app)
+    login(client, admin_id)
+    client.get('/dashboard')
+
+    with app.app_context():
+        engine = db.engine
+    with count_queries(engine) as counter:
+        assert client.get('/dashboard').status_code == 200
+    assert [s for s in counter['statements'] if 'FROM users' in s] == []
+
+def test_revalidation_reads_only_the_row_version(make_app):
+    app = make_app(USER_CACHE_REVALIDATE=0)
+    client = app.test_client()
+    admin_id = create_admin(app)
+    login(client, admin_id)
+    client.get('/dashboard')
+
+    with app.app_context():
+        engine = db.engine
+    # Sem carregar company/departments: só a versão da linha, pela chave primária
+    with count_queries(engine) as counter:
+        assert client.get('/dashboard').status_code == 200
+    user_statements = [s for s in counter['statements'] if 'FROM users' in s]
+    assert len(user_statements) == 1
+    assert user_statements[0].startswith('SELECT users.updated_at')
@@ -0,0 +1,139 @@
+"""
+Visualizações de dashboards (view_events.py): buffer em memória, gravação em
+lote, totais por hora (INSERT ... ON CONFLICT) e relatório de mais vistos
+"""
+import datetime
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+import routes
+import view_events as view_events_module
+from app import db
+from models import Dashboard, UserRole, dashboard_view_events, dashboard_view_hourly
+from view_events import ViewEventRecorder, most_viewed
+from conftest import create_company, create_user, login
+
+@pytest.fixture
+def recorder(monkeypatch):
+    # Um recorder por teste: o global guarda a aplicação do primeiro request
+    recorder = ViewEventRecorder()
+    monkeypatch.setattr(routes, 'view_events', recorder)
+    return recorder
+
+@pytest.fixture
+def events_app(make_app):
+    return make_app(VIEW_EVENTS_ENABLED=True, VIEW_EVENTS_FLUSH_INTERVAL=3600)
+
+def setup_dashboards(app):
+    """Master user and three dashboards (the last one in another company); returns their ids"""
+    with app.app_context():
+        company, departments = create_company('Tenant', departments=2)
+        _, others = create_company('Other')
+        master = create_user('master@example.com', UserRole.MASTER, company)
+        admin = create_user('admin@example.com', UserRole.ADMIN, company)
+        db.session.commit()
+        dashboards = [departments[0].dashboards[0].id, departments[1].dashboards[0].id, others[0].dashboards[0].id]
+        return master.id, admin.id, dashboards
+
+def raw_events(app):
+    with app.app_context():
+        return db.session.execute(select(func.count()).select_from(dashboard_view_events)).scalar()
+
+def hourly(app):
+    with app.app_context():
+        rows = db.session.execute(select(
+            dashboard_view_hourly.c.dashboard_id, dashboard_view_hourly.c.hour, dashboard_view_hourly.c.views
+        )).all()
+    return {(dashboard_id, hour): views for dashboard_id, hour, views in rows}
+
+def hour(when):
+    return when.replace(minute=0, second=0, microsecond=0)
+
+def test_views_are_buffered_and_written_in_one_batch(events_app, recorder):
+    master_id, _, (first, second, _) = setup_dashboards(events_app)
+    client = events_app.test_client()
+    login(client, master_id)
+    for dashboard_id in (first, first, first, second):
+        assert client.get(f'/dashboard/view/{dashboard_id}').status_code == 200
+
+    # Nada gravado no request
+    assert raw_events(events_app) == 0
+    recorder.flush()
+    assert raw_events(events_app) == 4
+    now = hour(datetime.datetime.utcnow())
+    assert hourly(events_app) == {(first, now): 3, (second, now): 1}
+
+    # O buffer foi esvaziado: gravar de novo não soma nada
+    recorder.flush()
+    assert raw_events(events_app) == 4
+    assert hourly(events_app) == {(first, now): 3, (second, now): 1}
+
+def test_rollup_accumulates_across_batches(events_app, recorder):
+    _, _, (first, second, _) = setup_dashboards(events_app)
+    now = datetime.datetime.utcnow().replace(minute=30)
+    earlier = now - datetime.timedelta(hours=1)
+    with events_app.test_request_context():
+        recorder.record(first, when=now)
+        recorder.record(first, when=now.replace(minute=5))
+        recorder.flush()
+        recorder.record(first, when=now.replace(minute=59))
+        recorder.record(first, when=earlier)
+        recorder.record(second, when=earlier)
+        recorder.flush()
+
+    assert raw_events(events_app) == 5
+    assert hourly(events_app) == {
+        (first, hour(now)): 3,
+        (first, hour(earlier)): 1,
+        (second, hour(earlier)): 1,
+    }
+
+def test_failed_batch_is_retried_and_counted_once(events_app, recorder, monkeypatch):
+    _, _, (first, _, _) = setup_dashboards(events_app)
+    write_events = view_events_module.write_events
+
+    def failing_write(conn, events):
+        # Eventos e totais já enviados; a falha desfaz a transação inteira
+        write_events(conn, events)
+        raise OperationalError('INSERT', {}, Exception('connection lost'))
+
+    with events_app.test_request_context():
+        recorder.record(first)
+        recorder.record(first)
+        monkeypatch.setattr(view_events_module, 'write_events', failing_write)
+        with pytest.raises(OperationalError):
+            recorder.flush()
+        assert raw_events(events_app) == 0
+
+        monkeypatch.setattr(view_events_module, 'write_events', write_events)
+        recorder.flush()
+        recorder.flush()
+
+    assert raw_events(events_app) == 2
+    assert sum(hourly(events_app).values()) == 2
+
+def test_most_viewed(events_app, recorder):
+    master_id, admin_id, (first, second, other) = setup_dashboards(events_app)
+    now = datetime.datetime.utcnow()
+    with events_app.test_request_context():
+        for dashboard_id, hours_ago in [(second, 0), (second, 1), (first, 2), (other, 0), (first, 72), (first, 73)]:
+            recorder.record(dashboard_id, when=now - datetime.timedelta(hours=hours_ago))
+        recorder.flush()
+
+        # 24h: o primeiro dashboard só tem uma visualização recente
+        rows = [(dashboard.id, views) for dashboard, views, _ in most_viewed(1)]
+        assert rows == [(second, 2), (first, 1), (other, 1)]
+        # 7d: as visualizações de três dias atrás contam
+        rows = most_viewed(7)
+        assert [(dashboard.id, views) for dashboard, views, _ in rows] == [(first, 3), (second, 2), (other, 1)]
+        assert rows[1][2] == hour(now)
+        # Empresa do admin: sem o dashboard da outra empresa
+        company_id = db.session.get(Dashboard, first).department.company_id
+        assert [dashboard.id for dashboard, _, _ in most_viewed(7, company_id=company_id)] == [first, second]
+
+    client = events_app.test_client()
+    login(client, admin_id)
+    page = client.get('/reports/most-viewed?period=7d')
+    assert page.status_code == 200
+    html = page.get_data(as_text=True)
+    assert 'Tenant D0 B0' in html and 'Other D0 B0' not in html
@@ -0,0 +1,207 @@
+"""
+Cache do usuário autenticado (principal)
+
+Evita a consulta completa à tabela users (e os lazy loads de company/departments
+do menu lateral) em cada request autenticado. Por padrão usa um LRU com TTL em
+memória do processo; com USER_CACHE_URL (redis://...) os workers compartilham
+o mesmo cache e as invalidações valem para todos.
+
+Um acerto no cache não consulta o banco. As rotas que alteram um usuário (ou
+departamentos e empresas) invalidam a entrada pelo backend; com Redis isso vale
+para todos os workers no request seguinte.
+
+Cada snapshot guarda também a versão da linha (users.updated_at), conferida no
+máximo a cada USER_CACHE_REVALIDATE segundos com uma busca pela chave primária.
+Isso cobre alterações que não passam pelas rotas e, com o cache só em memória,
+limita a esse intervalo o tempo em que outro worker ainda vê um usuário
+rebaixado, excluído ou com vínculos alterados.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+from app import db
+from models import User, RoleMixin
+
+CachedCompany = namedtuple('CachedCompany', ['id', 'name'])
+CachedDepartment = namedtuple('CachedDepartment', ['id', 'name', 'is_active'])
+
+def row_version(updated_at):
+    """Comparable version of a users row (also stored in JSON by the Redis backend)"""
+    return updated_at.isoformat() if updated_at else None
+
+class CachedUser(RoleMixin, UserMixin):
+    """Read-only snapshot of the authenticated user used as current_user"""
+
+    def __init__(self, id, name, email, role, company_id, company, departments, version=None):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.role = role
+        self.company_id = company_id
+        self.company = CachedCompany(*company) if company else None
+        self.departments = [CachedDepartment(*d) for d in departments]
+        self.version = version
+
+    @classmethod
+    def from_user(cls, user):
+        company = (user.company.id, user.company.name) if user.company else None
+        departments = [(d.id, d.name, bool(d.is_active)) for d in user.departments]
+        return cls(user.id, user.name, user.email, user.role, user.company_id, company, departments,
+                   row_version(user.updated_at))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'email': self.email,
+            'role': self.role,
+            'company_id': self.company_id,
+            'company': list(self.company) if self.company else None,
+            'departments': [list(d) for d in self.departments],
+            'version': self.version,
+        }
+
+    def __repr__(self):
+        return f'<CachedUser {self.email}>'
+
+class MemoryBackend:
+    """In-process LRU with per-entry TTL"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return data
+
+    def set(self, user_id, data, ttl):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + ttl, data)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class RedisBackend:
+    """Shared backend for any Redis-protocol server (requires the redis package)"""
+
+    PREFIX = 'hidash:user:'
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.generation_key = self.PREFIX + 'generation'
+
+    def _key(self, user_id):
+        return f'{self.PREFIX}{user_id}'
+
+    def get(self, user_id):
+        # Geração e entrada na mesma ida ao servidor; clear() invalida tudo trocando a geração
+        generation, raw = self.client.mget(self.generation_key, self._key(user_id))
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        if entry.get('generation') != int(generation or 0):
+            return None
+        return entry['data']
+
+    def set(self, user_id, data, ttl):
+        generation = int(self.client.get(self.generation_key) or 0)
+        payload = json.dumps({'generation': generation, 'data': data})
+        self.client.setex(self._key(user_id), int(ttl), payload)
+
+    def delete(self, user_id):
+        self.client.delete(self._key(user_id))
+
+    def clear(self):
+        self.client.incr(self.generation_key)
+
+class UserCache:
+    """Loads the authenticated principal from the cache, falling back to the database"""
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._create_backend()
+        return self._backend
+
+    def _create_backend(self):
+        url = current_app.config.get('USER_CACHE_URL')
+        if url:
+            try:
+                return RedisBackend(url)
+            except ImportError:
+                logging.warning("USER_CACHE_URL is set but the redis package is not installed; using in-process cache")
+        return MemoryBackend(current_app.config.get('USER_CACHE_SIZE', 10000))
+
+    def get(self, user_id):
+        """Return a CachedUser for the id, or None if the user does not exist"""
+        config = current_app.config
+        ttl = config.get('USER_CACHE_TTL', 300)
+        if ttl:
+            data = self.backend.get(user_id)
+            if data is not None:
+                data = dict(data)
+                # Relógio de parede: checked_at é compartilhado entre processos pelo Redis
+                now = time.time()
+                if now - data.pop('checked_at', 0) < config.get('USER_CACHE_REVALIDATE', 10):
+                    return CachedUser(**data)
+                # Busca só da versão da linha pela chave primária; snapshot defasado é recarregado
+                row = db.session.execute(select(User.updated_at).where(User.id == user_id)).first()
+                if row is None:
+                    self.backend.delete(user_id)
+                    return None
+                if row_version(row[0]) == data.get('version'):
+                    self.backend.set(user_id, dict(data, checked_at=now), ttl)
+                    return CachedUser(**data)
+
+        user = User.query.options(
+            joinedload(User.company),
+            selectinload(User.departments)
+        ).filter_by(id=user_id).first()
+        if user is None:
+            return None
+
+        principal = CachedUser.from_user(user)
+        if ttl:
+            self.backend.set(user_id, dict(principal.to_dict(), checked_at=time.time()), ttl)
+        return principal
+
+    def invalidate(self, user_id):
+        """Drop the cached principal of one user"""
+        self.backend.delete(user_id)
+
+    def clear(self):
+        """Drop every cached principal (e.g. after a department or company change)"""
+        self.backend.clear()
+
+user_cache = UserCache()
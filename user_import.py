@@ -0,0 +1,258 @@
+"""
+Importação de usuários em lote (CSV ou JSON)
+
+Cada linha é validada com as regras do UserForm (ImportedUserForm), com as
+mesmas restrições de empresa, papel e departamentos da tela add_user. Os
+e-mails existentes e os departamentos das empresas envolvidas são carregados
+em poucas consultas, as senhas são geradas num pool de processos e os
+usuários e vínculos user_department são inseridos em lotes numa única
+transação. Linhas inválidas não são importadas e aparecem no relatório.
+
+O progresso é produzido como uma sequência de eventos (dicionários), usada
+tanto pela rota /api/users/import (NDJSON em streaming) quanto pela linha
+de comando:
+
+    python user_import.py usuarios.csv
+    python user_import.py usuarios.json --dry-run
+
+Colunas: name, email, password, role (master/admin/user, padrão user),
+company_id e department_ids (separados por ";" no CSV ou lista no JSON).
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import re
+import sys
+from flask import current_app
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import MultiDict
+from app import db
+from forms import ImportedUserForm
+from memberships import stores_memberships
+from models import User, Company, Department, UserRole, user_department
+from passwords import hash_passwords
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('name', 'email', 'password', 'role', 'company_id', 'department_ids')
+
+ROLE_CHOICES = [
+    (UserRole.MASTER, 'Master'),
+    (UserRole.ADMIN, 'Administrator'),
+    (UserRole.USER, 'User')
+]
+
+class UserImportError(ValueError):
+    """The uploaded file could not be read as CSV or JSON rows"""
+
+def read_rows(data, filename=''):
+    """Parse CSV or JSON content into a list of row dicts"""
+    if isinstance(data, bytes):
+        try:
+            data = data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise UserImportError('The file must be UTF-8 encoded.')
+
+    if filename.lower().endswith('.json') or data.lstrip().startswith(('[', '{')):
+        try:
+            rows = json.loads(data)
+        except ValueError as e:
+            raise UserImportError(f'Invalid JSON: {e}')
+        if isinstance(rows, dict):
+            rows = rows.get('users')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise UserImportError('JSON must be a list of user objects (or {"users": [...]}).')
+        return rows
+
+    reader = csv.DictReader(io.StringIO(data))
+    if not reader.fieldnames or 'email' not in [name.strip() for name in reader.fieldnames]:
+        raise UserImportError(f'CSV header must include the columns: {", ".join(FIELDS)}.')
+    return [{(key or '').strip(): value for key, value in row.items()} for row in reader]
+
+def _split_ids(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    return [part for part in re.split(r'[;|,\s]+', str(value)) if part]
+
+def _text(row, field):
+    return str(row.get(field) or '').strip()
+
+def _formdata(row, default_company_id):
+    password = str(row.get('password') or '')
+    data = MultiDict([
+        ('name', _text(row, 'name')),
+        ('email', _text(row, 'email')),
+        ('password', password),
+        ('confirm_password', password),
+        ('role', (_text(row, 'role') or UserRole.USER).lower()),
+        ('company_id', str(row.get('company_id') or default_company_id or '')),
+    ])
+    for department_id in _split_ids(row.get('department_ids')):
+        data.add('department_ids', department_id)
+    return data
+
+class UserImport:
+    """Validates and inserts a batch of users on behalf of an actor (None = master/CLI)"""
+
+    def __init__(self, actor, rows, dry_run=False):
+        self.actor = actor
+        self.rows = rows
+        self.dry_run = dry_run
+        self.batch_size = current_app.config.get('USER_IMPORT_BATCH_SIZE', 500)
+
+    @property
+    def actor_is_master(self):
+        return self.actor is None or self.actor.is_master()
+
+    def _load_context(self):
+        """Companies, departments and taken e-mails needed to validate every row"""
+        companies = select(Company.id, Company.name)
+        if not self.actor_is_master:
+            companies = companies.where(Company.id == self.actor.company_id)
+        self.company_choices = [tuple(row) for row in db.session.execute(companies.order_by(Company.name))]
+
+        self.departments = {}
+        company_ids = [company_id for company_id, _ in self.company_choices]
+        rows = db.session.execute(
+            select(Department.id, Department.name, Department.company_id)
+            .where(Department.company_id.in_(company_ids))
+        )
+        for department_id, name, company_id in rows:
+            self.departments.setdefault(company_id, []).append((department_id, name))
+
+        emails = list({_text(row, 'email') for row in self.rows} - {''})
+        self.taken_emails = set()
+        for start in range(0, len(emails), 1000):
+            self.taken_emails.update(db.session.execute(
+                select(User.email).where(User.email.in_(emails[start:start + 1000]))
+            ).scalars())
+
+        self.role_choices = ROLE_CHOICES if self.actor_is_master else ROLE_CHOICES[1:]
+
+    def _validate(self, row):
+        default_company_id = None if self.actor_is_master else self.actor.company_id
+        form = ImportedUserForm(formdata=_formdata(row, default_company_id), taken_emails=self.taken_emails)
+        form.company_id.choices = self.company_choices
+        form.role.choices = self.role_choices
+        try:
+            company_id = int(form.company_id.raw_data[0])
+        except (TypeError, ValueError, IndexError):
+            company_id = None
+        form.department_ids.choices = self.departments.get(company_id, [])
+
+        if not form.validate():
+            return None, form.errors
+        self.taken_emails.add(form.email.data)
+        return form, None
+
+    def _department_ids(self, form):
+        # Mesmas regras de add_user: só usuários comuns têm vínculos gravados
+        # (administradores e masters acessam pela regra de papel)
+        if stores_memberships(form.role.data):
+            return list(dict.fromkeys(form.department_ids.data or []))
+        return []
+
+    def run(self):
+        """Generator of progress, error and done events"""
+        total = len(self.rows)
+        self._load_context()
+
+        valid = []
+        failed = 0
+        for number, row in enumerate(self.rows, start=1):
+            form, errors = self._validate(row)
+            if errors:
+                failed += 1
+                yield {'event': 'error', 'row': number, 'email': _text(row, 'email'), 'errors': errors}
+            else:
+                valid.append(form)
+            if number % self.batch_size == 0 or number == total:
+                yield {'event': 'progress', 'stage': 'validate', 'done': number, 'total': total}
+
+        if self.dry_run or not valid:
+            yield {'event': 'done', 'created': 0, 'valid': len(valid), 'failed': failed, 'dry_run': self.dry_run}
+            return
+
+        # Hashes gerados antes de abrir a transação, para que ela dure só o tempo dos INSERTs
+        hashes = []
+        for password_hash in hash_passwords([form.password.data for form in valid]):
+            hashes.append(password_hash)
+            if len(hashes) % self.batch_size == 0 or len(hashes) == len(valid):
+                yield {'event': 'progress', 'stage': 'hash', 'done': len(hashes), 'total': len(valid)}
+
+        users_table = User.__table__
+        insert_users = insert(users_table).returning(users_table.c.id, sort_by_parameter_order=True)
+        created = 0
+        try:
+            for start in range(0, len(valid), self.batch_size):
+                batch = valid[start:start + self.batch_size]
+                user_rows = [{
+                    'name': form.name.data,
+                    'email': form.email.data,
+                    'password_hash': password_hash,
+                    'role': form.role.data,
+                    'company_id': form.company_id.data,
+                } for form, password_hash in zip(batch, hashes[start:start + self.batch_size])]
+                user_ids = db.session.execute(insert_users, user_rows).scalars().all()
+
+                memberships = [
+                    {'user_id': user_id, 'department_id': department_id}
+                    for user_id, form in zip(user_ids, batch)
+                    for department_id in self._department_ids(form)
+                ]
+                if memberships:
+                    db.session.execute(insert(user_department), memberships)
+
+                created += len(batch)
+                yield {'event': 'progress', 'stage': 'insert', 'done': created, 'total': len(valid)}
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.exception("Bulk user import failed")
+            yield {'event': 'done', 'created': 0, 'valid': len(valid), 'failed': failed,
+                   'dry_run': False, 'error': str(e.orig if getattr(e, 'orig', None) else e)}
+            return
+
+        yield {'event': 'done', 'created': created, 'valid': len(valid), 'failed': failed, 'dry_run': False}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='CSV or JSON file ("-" for stdin)')
+    parser.add_argument('--dry-run', action='store_true', help='validate without creating users')
+    args = parser.parse_args()
+
+    if args.path == '-':
+        data, filename = sys.stdin.read(), ''
+    else:
+        with open(args.path, 'rb') as f:
+            data, filename = f.read(), args.path
+
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        try:
+            rows = read_rows(data, filename)
+        except UserImportError as e:
+            sys.exit(f'error: {e}')
+
+        result = None
+        for event in UserImport(None, rows, dry_run=args.dry_run).run():
+            if event['event'] == 'progress':
+                print(f"{event['stage']}: {event['done']}/{event['total']}", file=sys.stderr)
+            elif event['event'] == 'error':
+                messages = '; '.join(f'{field}: {" ".join(errors)}' for field, errors in event['errors'].items())
+                print(f"row {event['row']} ({event['email']}): {messages}")
+            else:
+                result = event
+
+    print(json.dumps(result))
+    if result.get('error') or result['failed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,13 @@
 import re
-from flask import abort, flash
+from flask import (
+    abort, before_render_template, current_app, flash, render_template, stream_with_context, template_rendered
+)
 from flask_login import current_user
+from sqlalchemy import select
 from models import User, Company, Department, Dashboard, UserRole
 from app import db
+from access import access_index, department_scope
+from queries import dashboard_query
 
 def check_master_access():
     """Check if user is a master, otherwise abort with 403"""
@@ -24,48 +29,34 @@ def check_company_access(company_id):
 
 def check_department_access(department_id):
     """Check if user has access to the department"""
-    department = Department.query.get(department_id)
-    if not department:
-        return False
-    
     if current_user.is_master():
-        return True
-    if current_user.is_admin() and current_user.company_id == department.company_id:
-        return True
+        return db.session.get(Department, department_id) is not None
     
-    # Verificar se o usuário comum tem este departamento associado
-    if current_user.is_common_user():
-        for user_dept in current_user.departments:
-            if user_dept.id == department_id:
-                return True
-    
-    return False
+    # Admins e usuários comuns consultam o índice de acesso pré-computado
+    return department_id in access_index.get(current_user).department_ids
 
 def check_dashboard_access(dashboard_id):
     """Check if user has access to the dashboard"""
-    dashboard = Dashboard.query.get(dashboard_id)
-    if not dashboard:
-        return False
-    
     if current_user.is_master():
-        return True
-    
-    if current_user.is_admin() and current_user.company_id == dashboard.department.company_id:
-        return True
+        return db.session.get(Dashboard, dashboard_id) is not None
     
-    # Check if user is in the department that has this dashboard
-    user_department_ids = [d.id for d in current_user.departments]
-    if dashboard.department_id in user_department_ids:
-        return True
-    
-    return False
+    # Sempre no banco (índice por dashboard_id): o índice de acesso não vê dashboards
+    # movidos ou excluídos em outro worker
+    return db.session.execute(
+        select(Dashboard.id).where(
+            Dashboard.id == dashboard_id,
+            Dashboard.department_id.in_(department_scope(current_user))
+        )
+    ).first() is not None
 
 def get_accessible_companies():
     """Get companies accessible to the current user"""
     if current_user.is_master():
         return Company.query.all()
     elif current_user.is_admin():
-        return [current_user.company] if current_user.company else []
+        # current_user é um snapshot em cache; buscar a entidade Company real
+        company = db.session.get(Company, current_user.company_id) if current_user.company_id else None
+        return [company] if company else []
     return []
 
 def get_accessible_departments():
@@ -76,58 +67,46 @@ def get_accessible_departments():
     if current_user.is_admin():
         return Department.query.filter_by(company_id=current_user.company_id).all()
     
-    return current_user.departments
+    department_ids = access_index.get(current_user).department_ids
+    return Department.query.filter(Department.id.in_(department_ids)).all()
 
 def get_accessible_dashboards():
     """Get dashboards accessible to the current user"""
     if current_user.is_master():
-        return Dashboard.query.all()
-    
-    if current_user.is_admin():
-        department_ids = [d.id for d in Department.query.filter_by(company_id=current_user.company_id).all()]
-        return Dashboard.query.filter(Dashboard.department_id.in_(department_ids)).all()
+        return dashboard_query().all()
     
-    # For regular users, return dashboards from their departments
-    department_ids = [d.id for d in current_user.departments]
-    return Dashboard.query.filter(Dashboard.department_id.in_(department_ids)).all()
+    # Admins e usuários comuns: filtro pelos departamentos (índice em dashboards.department_id),
+    # sem enviar a lista de ids de dashboards na consulta
+    return dashboard_query().filter(Dashboard.department_id.in_(department_scope(current_user))).all()
 
-def get_power_bi_iframe(power_bi_link):
+def get_power_bi_iframe(power_bi_link, token_url=None):
     """Generate secure iframe HTML for Power BI dashboard"""
     # Aceitar qualquer URL válido do Power BI
     # Exemplo: https://app.powerbi.com/view?r=eyJrIjoiYTdiNmQxNWEtMzQ3YS00OTU0LTkwNWQtM2RjMGM5ZDA3YmYxIiwidCI6IjQwNmQxM2ZmLTZmN2UtNGQ0Ni05NjUxLTU4NGJjMDE0ZWQxNyJ9
-    
-    # Create a secure iframe with proper attributes for fullscreen
-    iframe_html = f"""
-    <iframe 
-        title="Power BI Dashboard" 
-        width="100%" 
-        height="100%" 
-        src="{power_bi_link}" 
-        frameborder="0" 
-        allowFullScreen="true" 
-        sandbox="allow-scripts allow-same-origin allow-forms allow-popups"
-        style="pointer-events: auto;"
-        oncontextmenu="return false;"
-    >
-    </iframe>
-    <script>
-        // Prevent right-click
-        document.addEventListener('contextmenu', function(e) {{
-            e.preventDefault();
-        }});
-        
-        // Prevent keyboard shortcuts
-        document.addEventListener('keydown', function(e) {{
-            // Prevent F12, Ctrl+Shift+I, Ctrl+Shift+J, Ctrl+U
-            if (
-                e.keyCode === 123 || 
-                (e.ctrlKey && e.shiftKey && e.keyCode === 73) || 
-                (e.ctrlKey && e.shiftKey && e.keyCode === 74) || 
-                (e.ctrlKey && e.keyCode === 85)
-            ) {{
-                e.preventDefault();
-            }}
-        }});
-    </script>
-    """
-    return iframe_html
+    # Com token_url (links reportEmbed), static/js/dashboard-view.js busca o token de embed e
+    # monta o relatório com o powerbi-client; o bloqueio de menu de contexto/atalhos fica no mesmo arquivo
+    return render_template('dashboard/_embed.html', power_bi_link=power_bi_link, token_url=token_url)
+
+def stream_template(template_name, **context):
+    """Render a template incrementally, in chunks of about ADMIN_STREAM_CHUNK_SIZE characters"""
+    app = current_app._get_current_object()
+    template = app.jinja_env.get_template(template_name)
+    app.update_template_context(context)
+    chunk_size = app.config.get('ADMIN_STREAM_CHUNK_SIZE', 16384)
+
+    def generate():
+        # Mesmos sinais do render_template (usados por instrumentation.py)
+        before_render_template.send(app, _async_wrapper=app.ensure_sync, template=template, context=context)
+        # Juntar os pedaços do Jinja em blocos maiores (menos escritas e melhor compressão)
+        buffer, size = [], 0
+        for piece in template.stream(context):
+            buffer.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield ''.join(buffer)
+        template_rendered.send(app, _async_wrapper=app.ensure_sync, template=template, context=context)
+
+    return stream_with_context(generate())
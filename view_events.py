@@ -0,0 +1,249 @@
+"""
+Registro de visualizações de dashboards
+
+view_dashboard é a rota mais acessada, então a visualização não é gravada no
+request: record() só acrescenta o evento a um buffer em memória do worker, e
+uma thread em segundo plano grava o lote a cada VIEW_EVENTS_FLUSH_INTERVAL
+segundos ou quando o buffer chega a VIEW_EVENTS_FLUSH_SIZE eventos.
+
+Cada gravação, numa única transação:
+
+- insere os eventos em dashboard_view_events (executemany; no PostgreSQL o
+  SQLAlchemy envia INSERTs com várias linhas);
+- soma os eventos por (dashboard, hora) e incrementa dashboard_view_hourly
+  com INSERT ... ON CONFLICT DO UPDATE.
+
+O relatório de mais vistos lê apenas os totais por hora, então o custo
+depende do número de dashboards e do período, não do número de eventos.
+
+Com VIEW_EVENTS_FILE definido, os lotes são anexados a um arquivo JSON Lines
+local em vez do banco (um write por lote) e carregados depois com o comando
+load, que renomeia o arquivo antes de ler (os workers criam um novo no lote
+seguinte).
+
+Em serverless o buffer vive enquanto a instância está ativa: eventos ainda
+não gravados quando a instância é congelada podem ser perdidos.
+
+Uso:
+    python view_events.py load /var/log/hidash/views.jsonl
+    python view_events.py prune --days 180   # remove eventos antigos (os totais por hora ficam)
+"""
+import argparse
+import atexit
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from models import Dashboard, dashboard_view_events, dashboard_view_hourly
+from queries import company_department_ids, dashboard_query
+
+logger = logging.getLogger(__name__)
+
+# Períodos do relatório de mais vistos (parâmetro period -> dias)
+REPORT_PERIODS = {'24h': 1, '7d': 7, '30d': 30, '90d': 90}
+LOAD_BATCH = 10000
+
+def _hour(when):
+    return when.replace(minute=0, second=0, microsecond=0)
+
+def write_events(conn, events):
+    """Insert (dashboard_id, user_id, viewed_at) events and add them to the hourly rollups"""
+    if not events:
+        return
+    conn.execute(insert(dashboard_view_events), [
+        {'dashboard_id': dashboard_id, 'user_id': user_id, 'viewed_at': viewed_at}
+        for dashboard_id, user_id, viewed_at in events
+    ])
+    totals = Counter((dashboard_id, _hour(viewed_at)) for dashboard_id, _, viewed_at in events)
+    rows = [{'dashboard_id': dashboard_id, 'hour': hour, 'views': views}
+            for (dashboard_id, hour), views in totals.items()]
+
+    table = dashboard_view_hourly
+    if conn.dialect.name in ('postgresql', 'sqlite'):
+        from sqlalchemy.dialects import postgresql, sqlite
+        dialect = postgresql if conn.dialect.name == 'postgresql' else sqlite
+        stmt = dialect.insert(table)
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.dashboard_id, table.c.hour],
+            set_={'views': table.c.views + stmt.excluded.views},
+        ), rows)
+        return
+    for row in rows:
+        result = conn.execute(
+            update(table)
+            .where(table.c.dashboard_id == row['dashboard_id'], table.c.hour == row['hour'])
+            .values(views=table.c.views + row['views'])
+        )
+        if result.rowcount == 0:
+            conn.execute(insert(table).values(**row))
+
+def append_to_file(path, events):
+    """Append events as JSON lines with a single write"""
+    data = ''.join(
+        json.dumps({'d': dashboard_id, 'u': user_id, 't': viewed_at.isoformat()}) + '\n'
+        for dashboard_id, user_id, viewed_at in events
+    ).encode()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+def read_file(path):
+    """Events of a file written by append_to_file; incomplete lines are skipped"""
+    with open(path) as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+                yield item['d'], item.get('u'), datetime.datetime.fromisoformat(item['t'])
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Skipping invalid view event line in %s", path)
+
+class ViewEventRecorder:
+    """Buffers dashboard views per worker and writes them in batches"""
+
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._app = None
+        self.dropped = 0
+
+    def record(self, dashboard_id, user_id=None, when=None):
+        app = current_app._get_current_object()
+        if not app.config.get('VIEW_EVENTS_ENABLED', True):
+            return
+        # A thread de gravação usa a aplicação do request que registrou a visualização
+        self._app = app
+        with self._lock:
+            self._events.append((dashboard_id, user_id, when or datetime.datetime.utcnow()))
+            size = len(self._events)
+        self._start_worker()
+        # Apenas quem cruza o limite dispara a gravação antecipada
+        if size == app.config.get('VIEW_EVENTS_FLUSH_SIZE', 1000):
+            threading.Thread(target=self._flush_logged, daemon=True).start()
+
+    def _start_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='view-events-flush', daemon=True)
+                    self._worker.start()
+                    atexit.register(self._flush_logged)
+
+    def _run(self):
+        while True:
+            time.sleep(self._app.config.get('VIEW_EVENTS_FLUSH_INTERVAL', 10))
+            self._flush_logged()
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except (SQLAlchemyError, OSError):
+            logger.exception("Failed to write dashboard view events")
+
+    def flush(self):
+        """Write every buffered event to the database (or VIEW_EVENTS_FILE)"""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events or self._app is None:
+                return
+            path = self._app.config.get('VIEW_EVENTS_FILE')
+            try:
+                if path:
+                    append_to_file(path, events)
+                else:
+                    with self._app.app_context():
+                        with db.engine.begin() as conn:
+                            write_events(conn, events)
+            except (SQLAlchemyError, OSError):
+                self._requeue(events)
+                raise
+
+    def _requeue(self, events):
+        # Devolver o lote para a próxima tentativa, sem crescer além de VIEW_EVENTS_MAX_BUFFER
+        limit = self._app.config.get('VIEW_EVENTS_MAX_BUFFER', 100000)
+        with self._lock:
+            self._events = events + self._events
+            overflow = len(self._events) - limit
+            if overflow > 0:
+                del self._events[:overflow]
+                self.dropped += overflow
+        if overflow > 0:
+            logger.warning("Dropped %d buffered dashboard view events", overflow)
+
+view_events = ViewEventRecorder()
+
+def most_viewed(days, limit=50, company_id=None):
+    """[(dashboard, views, last_hour)] of the last `days` days, most viewed first"""
+    since = _hour(datetime.datetime.utcnow()) - datetime.timedelta(days=days) + datetime.timedelta(hours=1)
+    table = dashboard_view_hourly
+    totals = (
+        select(table.c.dashboard_id, func.sum(table.c.views).label('views'), func.max(table.c.hour).label('last_hour'))
+        .where(table.c.hour >= since)
+        .group_by(table.c.dashboard_id)
+        .subquery()
+    )
+    query = (
+        dashboard_query()
+        .join(totals, totals.c.dashboard_id == Dashboard.id)
+        .add_columns(totals.c.views, totals.c.last_hour)
+    )
+    if company_id is not None:
+        query = query.filter(Dashboard.department_id.in_(company_department_ids(company_id)))
+    return query.order_by(totals.c.views.desc(), Dashboard.id).limit(limit).all()
+
+def load(path):
+    """Move a JSON lines file aside and write its events; returns the number loaded"""
+    loading = f'{path}.{int(time.time())}.loading'
+    os.replace(path, loading)
+    count = 0
+    batch = []
+    for event in read_file(loading):
+        batch.append(event)
+        if len(batch) >= LOAD_BATCH:
+            with db.engine.begin() as conn:
+                write_events(conn, batch)
+            count += len(batch)
+            batch = []
+    with db.engine.begin() as conn:
+        write_events(conn, batch)
+    count += len(batch)
+    os.remove(loading)
+    return count
+
+def prune(days):
+    """Delete raw events older than `days` days (hourly rollups are kept)"""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    with db.engine.begin() as conn:
+        return conn.execute(delete(dashboard_view_events).where(dashboard_view_events.c.viewed_at < cutoff)).rowcount
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    load_parser = commands.add_parser('load', help='write the events of VIEW_EVENTS_FILE files to the database')
+    load_parser.add_argument('paths', nargs='+')
+    prune_parser = commands.add_parser('prune', help='delete old raw events')
+    prune_parser.add_argument('--days', type=int, default=180)
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        if args.command == 'load':
+            for path in args.paths:
+                print(f"{path}: {load(path)} events loaded")
+        else:
+            print(f"{prune(args.days)} events older than {args.days} days deleted")
+
+if __name__ == '__main__':
+    main()